@@ -0,0 +1,229 @@
+"""
+Sentinel Compiled Sanitizer
+Line-drop + redaction sanitizer compiled into two regex programs.
+
+The original sanitizer lowercased every line, tested it against each drop
+marker with `in`, then ran one `re.sub` per redaction rule — about a dozen
+passes per line. Here:
+
+    • drop markers  → one literal alternation, searched over the whole
+                      lowercased prompt; a hit drops its line and the search
+                      resumes at the next line
+    • redactions    → one alternation searched over the whole prompt; the
+                      rule that matched indexes the replacement-token table
+
+and the output is assembled in a single walk over the edits, equal to
+
+    "\\n".join(kept lines with redactions applied).strip()
+
+(when every line break is "\\n", unedited text is copied in whole runs).
+
+Semantics are those of the per-line original: a redaction never spans a line
+break, and the result equals applying the rules one after another as long as
+no two rules can match overlapping text and no replacement token can be
+matched by a later rule (true for the gateway's rules). Redaction patterns
+must not match the empty string or use anchors, `\\b` or lookaround.
+
+Case-insensitive rules over an ASCII prompt are matched case-sensitively
+against the shared lowercase text: same matches, but `re` can then skip ahead
+on the rules' first characters instead of trying every branch at every offset.
+"""
+
+from __future__ import annotations
+
+import re
+from bisect import bisect_right
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+from engine.prepared_prompt import PreparedPrompt, line_spans_of, prepare
+
+__all__ = [
+    "SanitizeResult",
+    "CompiledSanitizer",
+]
+
+_DISPATCH_CACHE_SIZE = 4096      # distinct matched strings remembered per program
+
+
+class SanitizeResult(NamedTuple):
+    text: str
+    redactions: List[Tuple[int, int, str]]   # (start, end, token) in the original prompt
+    dropped: List[Tuple[int, int]]           # (start, end) of dropped lines
+
+
+class _Program:
+    __slots__ = ("search", "finditer", "rules", "rule_of")
+
+    def __init__(self, patterns: Sequence[str], flags: int):
+        combined = re.compile("|".join(f"(?:{p})" for p in patterns), flags)
+        self.search = combined.search
+        self.finditer = combined.finditer
+        self.rules = tuple(re.compile(p, flags) for p in patterns)
+        self.rule_of: Dict[str, int] = {}         # matched text → rule index
+
+    def dispatch(self, matched: str) -> int:
+        """First rule that matches the whole text — the alternation branch that won."""
+        for r, rule in enumerate(self.rules):
+            if rule.fullmatch(matched):
+                return r
+        raise AssertionError(f"no redaction rule matches {matched!r}")
+
+
+class CompiledSanitizer:
+    def __init__(
+        self,
+        drop_markers: Sequence[str],
+        redactions: Sequence[Tuple[str, str]],
+        flags: int = 0,
+    ):
+        """
+        drop_markers: lowercase literals; a line whose lowercase form contains
+                      any of them is dropped.
+        redactions:   (pattern, replacement token) pairs, in priority order.
+        """
+        self.drop_markers = tuple(drop_markers)
+        self.redactions = tuple(redactions)
+        self.tokens = tuple(token for _, token in self.redactions)
+        for p, _ in self.redactions:
+            if re.compile(p, flags).fullmatch(""):
+                raise ValueError(f"Redaction pattern matches the empty string: {p!r}")
+
+        self._drop = (
+            re.compile("|".join(re.escape(m) for m in self.drop_markers))
+            if self.drop_markers
+            else None
+        )
+        patterns = [p for p, _ in self.redactions]
+        self._program = _Program(patterns, flags) if patterns else None
+        # Lowercase-text variant: only sound when lowercasing the pattern is a no-op
+        self._lower_program: Optional[_Program] = None
+        if patterns and flags & re.IGNORECASE and all(p.isascii() and p == p.lower() for p in patterns):
+            self._lower_program = _Program(patterns, flags & ~re.IGNORECASE)
+
+    # ---------------- scanning ----------------
+
+    def _dropped_lines(self, pp: PreparedPrompt, spans) -> Set[int]:
+        if self._drop is None:
+            return set()
+        lower = pp.lower
+        if not pp.is_ascii:
+            # Lowercasing never adds or removes line breaks, so line i of
+            # `lower` is line i of the text, lowercased — only offsets move
+            spans = line_spans_of(lower)
+        starts = spans[::2]
+        search = self._drop.search
+        dropped: Set[int] = set()
+        pos = 0
+        while True:
+            m = search(lower, pos)
+            if m is None:
+                return dropped
+            i = bisect_right(starts, m.start()) - 1
+            dropped.add(i)
+            pos = spans[2 * i + 1]          # rest of this line is already decided
+
+    def _redaction_matches(
+        self, subject: str, program: _Program, spans, dropped: Set[int]
+    ) -> List[Tuple[int, int, int]]:
+        """(start, end, rule index) of every redaction, as a per-line scan would find them."""
+        starts, ends = spans[::2], spans[1::2]
+        n_lines = len(starts)
+        rule_of = program.rule_of
+        found: List[Tuple[int, int, int]] = []
+        i = 0
+        pos = 0
+        while True:
+            for m in program.finditer(subject, pos):
+                start, end = m.span()
+                while i + 1 < n_lines and starts[i + 1] <= start:
+                    i += 1
+                if start >= ends[i] or i in dropped or end > ends[i]:
+                    break                               # needs the slow path below
+                matched = m.group()
+                r = rule_of.get(matched)
+                if r is None:
+                    r = program.dispatch(matched)
+                    if len(rule_of) < _DISPATCH_CACHE_SIZE:
+                        rule_of[matched] = r
+                found.append((start, end, r))
+            else:
+                return found
+
+            # Inside a line break, in a dropped line, or ran across a line break:
+            # per-line semantics only see this line up to its end
+            if start < ends[i] and i not in dropped:
+                m = program.search(subject, start, ends[i])
+                if m is not None:
+                    start, end = m.span()
+                    found.append((start, end, program.dispatch(m.group())))
+                    pos = end
+                    continue
+            if i + 1 >= n_lines:
+                return found
+            pos = starts[i + 1]
+
+    # ---------------- public API ----------------
+
+    def sanitize(self, prompt: Union[str, PreparedPrompt], spans: bool = False) -> SanitizeResult:
+        """
+        Sanitized text (possibly empty), plus redaction / dropped-line spans
+        in original-prompt coordinates when `spans` is set.
+        """
+        pp = prepare(prompt)
+        text = pp.text
+        line_spans = pp.line_spans
+        dropped = self._dropped_lines(pp, line_spans)
+
+        matches: List[Tuple[int, int, int]] = []
+        if self._program is not None:
+            if pp.is_ascii and self._lower_program is not None:
+                matches = self._redaction_matches(pp.lower, self._lower_program, line_spans, dropped)
+            else:
+                matches = self._redaction_matches(text, self._program, line_spans, dropped)
+
+        tokens = self.tokens
+        line_starts, line_ends = line_spans[::2], line_spans[1::2]
+        out: List[str] = []
+        append = out.append
+
+        if len(text) - (sum(line_ends) - sum(line_starts)) == text.count("\n"):
+            # Only "\n" line breaks: everything between edits is copied as one
+            # slice; a dropped line goes together with its line break
+            n_lines = len(line_starts)
+            edits = sorted(
+                [(s, e, tokens[r]) for s, e, r in matches]
+                + [
+                    (line_starts[i], line_starts[i + 1] if i + 1 < n_lines else len(text), "")
+                    for i in dropped
+                ]
+            )
+            last = 0
+            for start, end, replacement in edits:
+                append(text[last:start])
+                append(replacement)
+                last = end
+            append(text[last:])
+        else:
+            k, n_matches = 0, len(matches)
+            for i, (start, end) in enumerate(zip(line_starts, line_ends)):
+                if i in dropped:
+                    continue
+                last = start
+                while k < n_matches and matches[k][0] < end:
+                    m_start, m_end, r = matches[k]
+                    append(text[last:m_start])
+                    append(tokens[r])
+                    last = m_end
+                    k += 1
+                append(text[last:end])
+                append("\n")
+
+        # A trailing "\n" is whitespace, so strip() gives the same result as join
+        cleaned = "".join(out).strip()
+        if not spans:
+            return SanitizeResult(cleaned, [], [])
+        return SanitizeResult(
+            cleaned,
+            [(s, e, tokens[r]) for s, e, r in matches],
+            [(line_starts[i], line_ends[i]) for i in sorted(dropped)],
+        )
@@ -0,0 +1,123 @@
+"""
+Sentinel Keyword Matcher
+Aho-Corasick automaton for finding every keyword of a large set in one pass.
+
+The heuristics engine used to run `kw in lower` once per keyword, which costs
+O(keywords × prompt length). The automaton is built once at import time and
+then walks the prompt a single time, so the per-prompt cost depends on the
+prompt length only — not on how many keywords are loaded.
+
+For tiny keyword sets the C-level substring scan is still cheaper than a
+Python-level walk, so `KeywordMatcher` keeps the plain loop below
+`AUTOMATON_MIN_KEYWORDS` entries. Both strategies return identical results.
+"""
+
+from __future__ import annotations
+
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+__all__ = [
+    "AUTOMATON_MIN_KEYWORDS",
+    "KeywordMatcher",
+]
+
+# Below this many keywords the per-keyword substring scan wins (see
+# benchmarks/bench_keywords.py for the crossover on a typical prompt).
+AUTOMATON_MIN_KEYWORDS = 200
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern substring matcher.
+
+    Keywords keep their insertion order: `find()` returns the ids of the
+    matched keywords sorted by that order, i.e. exactly what looping over the
+    keyword list with `kw in text` would produce.
+    """
+
+    __slots__ = ("keywords", "use_automaton", "_goto", "_fail", "_out")
+
+    def __init__(self, keywords: Iterable[str], use_automaton: bool | None = None):
+        self.keywords: Tuple[str, ...] = tuple(keywords)
+        if use_automaton is None:
+            use_automaton = len(self.keywords) >= AUTOMATON_MIN_KEYWORDS
+        self.use_automaton = use_automaton
+
+        self._goto: List[Dict[str, int]] = []
+        self._fail: List[int] = []
+        self._out: List[Tuple[int, ...]] = []
+        if use_automaton:
+            self._build()
+
+    # ---------------- construction ----------------
+
+    def _build(self) -> None:
+        goto: List[Dict[str, int]] = [{}]
+        out: List[List[int]] = [[]]
+
+        # 1) Trie of all keywords
+        for idx, kw in enumerate(self.keywords):
+            state = 0
+            for ch in kw:
+                nxt = goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(goto)
+                    goto[state][ch] = nxt
+                    goto.append({})
+                    out.append([])
+                state = nxt
+            out[state].append(idx)
+
+        # 2) Failure links (BFS), merging outputs along the failure chain so
+        #    the scan never has to follow dictionary-suffix links.
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                target = goto[f].get(ch, 0)
+                fail[nxt] = target if target != nxt else 0
+                if out[fail[nxt]]:
+                    out[nxt].extend(out[fail[nxt]])
+
+        self._goto = goto
+        self._fail = fail
+        self._out = [tuple(o) for o in out]
+
+    # ---------------- matching ----------------
+
+    def find(self, text: str) -> List[int]:
+        """Return ids (insertion order) of every keyword occurring in `text`."""
+        if not self.use_automaton:
+            return [i for i, kw in enumerate(self.keywords) if kw in text]
+
+        goto = self._goto
+        fail = self._fail
+        out = self._out
+        found = set(out[0])  # empty keywords match everywhere, like `"" in text`
+        state = 0
+        for ch in text:
+            nxt = goto[state].get(ch)
+            while nxt is None and state:
+                state = fail[state]
+                nxt = goto[state].get(ch)
+            if nxt is None:
+                state = 0
+                continue
+            state = nxt
+            if out[state]:
+                found.update(out[state])
+        return sorted(found)
+
+    def find_keywords(self, text: str) -> List[str]:
+        """Like `find()`, but returns the keyword strings."""
+        kws = self.keywords
+        return [kws[i] for i in self.find(text)]
+
+    def __len__(self) -> int:
+        return len(self.keywords)
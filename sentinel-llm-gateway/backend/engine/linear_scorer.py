@@ -0,0 +1,239 @@
+"""
+Sentinel Linear Scorer
+Native inference path for the HashingVectorizer + LogisticRegression model.
+
+Going through the sklearn objects for one prompt builds a sparse matrix,
+validates it, normalizes it and runs a sparse × dense product — far more
+work than the model itself. This module reproduces the vectorizer exactly:
+
+    • lowercase + token_pattern tokenization, word n-grams (`_word_ngrams`)
+    • MurmurHash3 (x86, 32-bit, seed 0) of each UTF-8 feature, index
+      `abs(h) % n_features` (with sklearn's special case for h = -2**31)
+    • optional alternate sign, binary counts and l1/l2 row normalization
+
+and scores straight from the flat weight array:
+
+    p = sigmoid(Σ w[idx] · x[idx] + b)
+
+Feature → (index, sign) lookups are memoized, so hashing cost is paid once
+per distinct token. Given a PreparedPrompt, its shared tokens are used and
+the hashed row is cached on it for any later stage.
+"""
+
+from __future__ import annotations
+
+import json
+import math
+import re
+import struct
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Sequence, Tuple, Union
+
+import numpy as np
+
+from engine.model_artifact import ARTIFACT_FORMAT, META_FILE
+from engine.prepared_prompt import TOKEN_PATTERN, PreparedPrompt
+
+__all__ = [
+    "murmurhash3_32",
+    "LinearScorer",
+]
+
+HASH_CACHE_SIZE = 1 << 17
+
+_M32 = 0xFFFFFFFF
+
+
+# ========================= HASHING ========================= #
+
+def murmurhash3_32(data: bytes, seed: int = 0) -> int:
+    """Signed 32-bit MurmurHash3_x86_32, same as sklearn.utils.murmurhash3_32."""
+    c1, c2 = 0xCC9E2D51, 0x1B873593
+    h = seed & _M32
+    n = len(data)
+    nblocks = n >> 2
+
+    for k in struct.unpack_from(f"<{nblocks}I", data):
+        k = (k * c1) & _M32
+        k = ((k << 15) | (k >> 17)) & _M32
+        k = (k * c2) & _M32
+        h ^= k
+        h = ((h << 13) | (h >> 19)) & _M32
+        h = (h * 5 + 0xE6546B64) & _M32
+
+    tail = nblocks << 2
+    rem = n & 3
+    k = 0
+    if rem == 3:
+        k ^= data[tail + 2] << 16
+    if rem >= 2:
+        k ^= data[tail + 1] << 8
+    if rem >= 1:
+        k ^= data[tail]
+        k = (k * c1) & _M32
+        k = ((k << 15) | (k >> 17)) & _M32
+        k = (k * c2) & _M32
+        h ^= k
+
+    h ^= n
+    h ^= h >> 16
+    h = (h * 0x85EBCA6B) & _M32
+    h ^= h >> 13
+    h = (h * 0xC2B2AE35) & _M32
+    h ^= h >> 16
+    return h - (1 << 32) if h & 0x80000000 else h
+
+
+# ========================= SCORER ========================= #
+
+class LinearScorer:
+    def __init__(
+        self,
+        coef: np.ndarray,
+        intercept: float,
+        *,
+        n_features: int,
+        ngram_range: Sequence[int] = (1, 1),
+        token_pattern: str = TOKEN_PATTERN,
+        lowercase: bool = True,
+        alternate_sign: bool = True,
+        binary: bool = False,
+        norm: str | None = "l2",
+    ):
+        if norm not in ("l1", "l2", None):
+            raise ValueError(f"Unsupported norm: {norm!r}")
+        self.coef = np.asarray(coef).reshape(-1)         # stays a memmap view if given one
+        self.intercept = float(intercept)
+        self.n_features = int(n_features)
+        self.min_n, self.max_n = (int(n) for n in ngram_range)
+        self.lowercase = lowercase
+        self.alternate_sign = alternate_sign
+        self.binary = binary
+        self.norm = norm
+        self._tokenize = re.compile(token_pattern).findall
+        # PreparedPrompt.tokens is only usable if we'd tokenize the same way
+        self._shared_tokens = lowercase and token_pattern == TOKEN_PATTERN
+        self._feature = lru_cache(maxsize=HASH_CACHE_SIZE)(self._hash_feature)
+
+    @classmethod
+    def from_artifact(cls, directory: Path) -> "LinearScorer":
+        """Build from a `models/linear/` artifact; weights are memory-mapped."""
+        directory = Path(directory)
+        meta = json.loads((directory / META_FILE).read_text())
+        if meta.get("format") != ARTIFACT_FORMAT:
+            raise ValueError(f"Unsupported model artifact format: {meta.get('format')!r}")
+        v = meta["vectorizer"]
+        if v.get("analyzer", "word") != "word" or v.get("strip_accents") is not None:
+            raise ValueError("LinearScorer only supports analyzer='word' without strip_accents")
+
+        coef = np.load(directory / "coef.npy", mmap_mode="r")
+        intercept = np.load(directory / "intercept.npy")
+        if coef.shape[0] != 1:
+            raise ValueError("LinearScorer only supports binary classifiers")
+        return cls(
+            coef[0],
+            float(intercept[0]),
+            n_features=v["n_features"],
+            ngram_range=v["ngram_range"],
+            token_pattern=v["token_pattern"],
+            lowercase=v["lowercase"],
+            alternate_sign=v["alternate_sign"],
+            binary=v.get("binary", False),
+            norm=v["norm"],
+        )
+
+    # ---------------- feature extraction ----------------
+
+    def _hash_feature(self, feature: str) -> Tuple[int, int]:
+        h = murmurhash3_32(feature.encode("utf-8"))
+        n = self.n_features
+        if h == -2147483648:
+            idx = (2147483647 - (n - 1)) % n
+        else:
+            idx = abs(h) % n
+        sign = -1 if (self.alternate_sign and h < 0) else 1
+        return idx, sign
+
+    def _tokens(self, text: Union[str, PreparedPrompt]) -> List[str]:
+        if isinstance(text, PreparedPrompt):
+            if self._shared_tokens:
+                return text.tokens
+            text = text.head_lower if self.lowercase else text.head
+        elif self.lowercase:
+            text = text.lower()
+        return self._tokenize(text)
+
+    def _features(self, text: Union[str, PreparedPrompt]) -> Iterator[str]:
+        # Streamed in sklearn's `_word_ngrams` order; n-gram strings are never held in a list
+        tokens = self._tokens(text)
+        min_n, max_n = self.min_n, self.max_n
+        if min_n == 1:
+            yield from tokens
+            min_n += 1
+        n_tokens = len(tokens)
+        join = " ".join
+        for n in range(min_n, min(max_n + 1, n_tokens + 1)):
+            for i in range(n_tokens - n + 1):
+                yield join(tokens[i:i + n])
+
+    def vectorize(self, text: Union[str, PreparedPrompt]) -> Dict[int, float]:
+        """Sparse row as {feature index: value}, identical to HashingVectorizer."""
+        if isinstance(text, PreparedPrompt):
+            counts = text.cached_vector(self)
+            if counts is None:
+                counts = self._vectorize(text)
+                text.cache_vector(self, counts)
+            return counts
+        return self._vectorize(text)
+
+    def _vectorize(self, text: Union[str, PreparedPrompt]) -> Dict[int, float]:
+        feature = self._feature
+        counts: Dict[int, float] = {}
+        for f in self._features(text):
+            idx, sign = feature(f)
+            counts[idx] = counts.get(idx, 0) + sign
+        if self.binary:
+            # sklearn keeps entries whose signed counts cancel out and sets them to 1 too
+            counts = dict.fromkeys(counts, 1.0)
+        return counts
+
+    # ---------------- scoring ----------------
+
+    def decision_function(self, text: Union[str, PreparedPrompt]) -> float:
+        return self.decision_from_row(self.vectorize(text))
+
+    def decision_from_row(self, counts: Dict[int, float]) -> float:
+        """decision_function() of an already vectorized row."""
+        if not counts:
+            return self.intercept
+
+        idx = np.fromiter(counts.keys(), dtype=np.intp, count=len(counts))
+        val = np.fromiter(counts.values(), dtype=np.float64, count=len(counts))
+        if self.norm == "l2":
+            scale = math.sqrt(float(val @ val))
+        elif self.norm == "l1":
+            scale = float(np.abs(val).sum())
+        else:
+            scale = 1.0
+        dot = float(self.coef.take(idx) @ val)
+        if scale:
+            dot /= scale
+        return dot + self.intercept
+
+    def predict_proba(self, text: Union[str, PreparedPrompt]) -> float:
+        """Probability of the positive (malicious) class."""
+        return self.proba_from_row(self.vectorize(text))
+
+    def proba_from_row(self, counts: Dict[int, float]) -> float:
+        z = self.decision_from_row(counts)
+        if z >= 0:
+            return 1.0 / (1.0 + math.exp(-z))
+        e = math.exp(z)
+        return e / (1.0 + e)
+
+    def predict_proba_many(self, texts: Sequence[Union[str, PreparedPrompt]]) -> List[float]:
+        return [self.predict_proba(t) for t in texts]
+
+    def cache_info(self) -> Any:
+        return self._feature.cache_info()
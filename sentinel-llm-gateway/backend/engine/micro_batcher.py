@@ -0,0 +1,145 @@
+"""
+Sentinel Micro-Batcher
+Coalesces concurrent single-prompt ML scoring calls into vectorized batches.
+
+Callers `await batcher.score(prompt)`; a background task collects queued
+prompts until `max_batch_size` items are waiting or `max_wait_ms` has passed
+since the first one arrived, then scores the whole group with one call to
+`score_batch` (e.g. `ml_injection_scores`, or a coroutine function that
+offloads it to an executor).
+
+Queue depth and batch size are recorded in `utils.metrics` histograms, so
+the two knobs can be tuned for throughput vs. p99 latency; given the app's
+MetricsRegistry they are exported on /metrics as well.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import inspect
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from utils.metrics import Histogram, MetricsRegistry
+
+__all__ = [
+    "MicroBatcher",
+]
+
+BATCH_SIZE_BUCKETS = (1, 2, 4, 8, 16, 32, 64, 128, 256)
+QUEUE_DEPTH_BUCKETS = (0, 1, 2, 4, 8, 16, 32, 64, 128, 256, 512)
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        score_batch: Callable[[List[Any]], Any],
+        max_batch_size: int = 32,
+        max_wait_ms: float = 5.0,
+        metrics: Optional[MetricsRegistry] = None,
+    ):
+        self.score_batch = score_batch
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        histogram = metrics.histogram if metrics is not None else Histogram
+        self.batch_sizes = histogram(
+            "sentinel_microbatch_size", "Prompts per micro-batch ML call.",
+            buckets=BATCH_SIZE_BUCKETS, scale=1,
+        )
+        self.queue_depths = histogram(
+            "sentinel_microbatch_queue_depth", "Prompts already queued when one is enqueued.",
+            buckets=QUEUE_DEPTH_BUCKETS, scale=1,
+        )
+        self._batch_size = self.batch_sizes.labels()
+        self._queue_depth = self.queue_depths.labels()
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._arrived: Optional[asyncio.Event] = None
+        self._task: Optional[asyncio.Task] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # ---------------- public API ----------------
+
+    async def score(self, prompt: Any) -> float:
+        queue = self._ensure_started()
+        fut = self._loop.create_future()
+        self._queue_depth.observe(queue.qsize())
+        queue.put_nowait((prompt, fut))
+        self._arrived.set()
+        return await fut
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_batch_size": self.max_batch_size,
+            "max_wait_ms": self.max_wait * 1000.0,
+            "queue_depth": self.queue_depth,
+            "queue_depth_at_enqueue": self.queue_depths.snapshot(),
+            "batch_size": self.batch_sizes.snapshot(),
+        }
+
+    async def close(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+        self._task = None
+        self._queue = None
+        self._loop = None
+
+    # ---------------- internals ----------------
+
+    def _ensure_started(self) -> asyncio.Queue:
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._arrived = asyncio.Event()
+            self._task = loop.create_task(self._run(self._queue))
+        return self._queue
+
+    async def _collect(self, queue: asyncio.Queue) -> List[Tuple[Any, asyncio.Future]]:
+        batch = [await queue.get()]
+        deadline = self._loop.time() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            try:
+                batch.append(queue.get_nowait())
+                continue
+            except asyncio.QueueEmpty:
+                pass
+            remaining = deadline - self._loop.time()
+            if remaining <= 0:
+                break
+            # Wait on an event rather than queue.get(): a timed-out get() can
+            # swallow an item that arrived at the deadline.
+            self._arrived.clear()
+            try:
+                await asyncio.wait_for(self._arrived.wait(), remaining)
+            except asyncio.TimeoutError:
+                break
+        return batch
+
+    async def _run(self, queue: asyncio.Queue) -> None:
+        while True:
+            batch = await self._collect(queue)
+            batch = [(p, f) for p, f in batch if not f.done()]   # drop cancelled callers
+            if not batch:
+                continue
+            self._batch_size.observe(len(batch))
+            try:
+                scores = self.score_batch([p for p, _ in batch])
+                if inspect.isawaitable(scores):             # e.g. offloaded to an executor
+                    scores = await scores
+            except Exception as exc:
+                for _, fut in batch:
+                    if not fut.done():
+                        fut.set_exception(exc)
+                continue
+            for (_, fut), score in zip(batch, scores):
+                if not fut.done():
+                    fut.set_result(score)
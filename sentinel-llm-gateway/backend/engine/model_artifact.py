@@ -0,0 +1,115 @@
+"""
+Sentinel Model Artifact
+Memory-mappable on-disk format for the linear classifier.
+
+`joblib.load` of `classifier.pkl` gives every uvicorn worker its own private
+copy of the weights. This format stores the arrays as plain `.npy` files and
+opens them with `mmap_mode="r"`, so all workers on a host share one read-only
+page-cache copy:
+
+    models/linear/
+        meta.json        format version + HashingVectorizer parameters
+        coef.npy         (1, n_features) float64
+        intercept.npy    (1,) float64
+        classes.npy      (2,)
+
+The vectorizer is stateless (HashingVectorizer) and is rebuilt from
+`meta.json` instead of being unpickled.
+
+Running workers keep `coef.npy` mapped, so a save never writes into the live
+directory (truncating a mapped file kills its readers with SIGBUS): the new
+artifact is written to `linear.tmp/` and renamed into place, and the old
+directory is unlinked, not overwritten — mapped inodes stay valid.
+"""
+
+from __future__ import annotations
+
+import json
+import os
+import shutil
+from pathlib import Path
+from typing import Any, Dict, Tuple
+
+__all__ = [
+    "ARTIFACT_FORMAT",
+    "META_FILE",
+    "save_linear_artifact",
+    "load_linear_artifact",
+    "swap_in_progress",
+]
+
+ARTIFACT_FORMAT = "sentinel-linear-v1"
+META_FILE = "meta.json"
+
+_VECTORIZER_PARAMS = (
+    "n_features", "ngram_range", "alternate_sign", "norm", "lowercase",
+    "token_pattern", "analyzer", "binary", "strip_accents",
+)
+
+
+def save_linear_artifact(directory: Path, vectorizer: Any, classifier: Any) -> None:
+    """
+    Write a fitted HashingVectorizer + linear classifier pair to `directory`,
+    replacing any artifact there as a whole (see the module docstring).
+    """
+    import numpy as np
+
+    directory = Path(directory)
+
+    params = vectorizer.get_params()
+    meta: Dict[str, Any] = {
+        "format": ARTIFACT_FORMAT,
+        "vectorizer": {k: params[k] for k in _VECTORIZER_PARAMS},
+        "n_features": int(classifier.coef_.shape[1]),
+    }
+
+    tmp = directory.with_name(directory.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    np.save(tmp / "coef.npy", np.ascontiguousarray(classifier.coef_, dtype=np.float64))
+    np.save(tmp / "intercept.npy", np.asarray(classifier.intercept_, dtype=np.float64))
+    np.save(tmp / "classes.npy", np.asarray(classifier.classes_))
+    # meta.json last: its presence marks a complete artifact
+    (tmp / META_FILE).write_text(json.dumps(meta, indent=2))
+
+    if directory.exists():
+        old = directory.with_name(directory.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        os.rename(directory, old)
+        os.rename(tmp, directory)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.rename(tmp, directory)
+
+
+def swap_in_progress(directory: Path) -> bool:
+    """True while a save is renaming a new artifact over `directory`."""
+    directory = Path(directory)
+    return directory.with_name(directory.name + ".old").exists()
+
+
+def load_linear_artifact(directory: Path) -> Tuple[Any, Any]:
+    """
+    Rebuild (vectorizer, classifier) with the weight arrays memory-mapped
+    read-only. The classifier is a regular LogisticRegression, so
+    `predict_proba` works unchanged.
+    """
+    import numpy as np
+    from sklearn.feature_extraction.text import HashingVectorizer
+    from sklearn.linear_model import LogisticRegression
+
+    directory = Path(directory)
+    meta = json.loads((directory / META_FILE).read_text())
+    if meta.get("format") != ARTIFACT_FORMAT:
+        raise ValueError(f"Unsupported model artifact format: {meta.get('format')!r}")
+
+    vparams = dict(meta["vectorizer"])
+    vparams["ngram_range"] = tuple(vparams["ngram_range"])
+    vectorizer = HashingVectorizer(**vparams)
+
+    classifier = LogisticRegression()
+    classifier.coef_ = np.load(directory / "coef.npy", mmap_mode="r")
+    classifier.intercept_ = np.load(directory / "intercept.npy", mmap_mode="r")
+    classifier.classes_ = np.load(directory / "classes.npy")
+    classifier.n_features_in_ = int(meta["n_features"])
+    return vectorizer, classifier
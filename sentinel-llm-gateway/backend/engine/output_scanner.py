@@ -0,0 +1,355 @@
+"""
+Sentinel Output Scanner
+Incremental moderation of streamed LLM output (tokens, SSE deltas).
+
+Buffering a whole completion before checking it destroys time-to-first-token.
+Here every chunk is checked as it arrives and released at once, except for a
+tail that could still be the start of a match:
+
+    • one alternation of every rule (secrets, heuristic regex rules,
+      keywords) runs over the text not released yet
+    • each rule's possible leading literals (up to PREFIX_CHARS) say which
+      positions could still start a match; text is held back only from the
+      earliest such position within the last `horizon − 1` characters —
+      a clean chunk is usually released whole
+    • a match is only acted on once `horizon` characters past its start have
+      arrived, so `\\b`, longer alternatives and higher-priority rules
+      starting at the same place are settled exactly as in a one-shot scan;
+      only text that hits a rule is delayed this way
+
+`horizon` is the longest match any rule can produce plus one character of
+lookahead, capped at `lookback` for unbounded rules. Any match no longer than
+that is found even when it spans chunks; longer ones (e.g. `.*` running far)
+only within one scan. The action is per rule:
+    • redact — the match is replaced with the rule's replacement token
+    • cut    — text before the match is released and the stream ends
+    • flag   — the hit is recorded, the text passes unchanged
+
+Verbatim leaks of protected text (e.g. the system prompt) are caught as runs
+of `shingle_words` consecutive words and always cut the stream; the words of
+the run before the last one have already been released by then.
+"""
+
+from __future__ import annotations
+
+import re
+from collections import deque
+from typing import Deque, Dict, FrozenSet, Iterable, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+try:  # Python 3.11+
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_constants  # type: ignore[no-redef]
+    import sre_parse  # type: ignore[no-redef]
+
+__all__ = [
+    "ACTIONS",
+    "OutputRule",
+    "OutputHit",
+    "OutputPolicy",
+    "OutputScanner",
+]
+
+ACTIONS = ("redact", "cut", "flag")
+
+PREFIX_CHARS = 6             # leading literal chars used to find possible match starts
+CONTEXT_CHARS = 16           # released text kept for `\b` / lookbehind at the seam
+MAX_PARTIAL_WORD = 64        # longer unfinished "words" are not tracked for leaks
+_MAX_PREFIXES = 256          # beyond this a rule is treated as able to start anywhere
+
+_LITERAL = sre_constants.LITERAL
+_AT = sre_constants.AT
+_SUBPATTERN = sre_constants.SUBPATTERN
+_BRANCH = sre_constants.BRANCH
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+if hasattr(sre_constants, "POSSESSIVE_REPEAT"):
+    _REPEATS.add(sre_constants.POSSESSIVE_REPEAT)
+
+_LEADING_FLAGS = re.compile(r"^\(\?[aiLmsux]+\)")
+_SCOPED_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"), (re.ASCII, "a"))
+_WORD = re.compile(r"\w+")
+
+# Non-ASCII characters that `re.IGNORECASE` matches to an ASCII letter (the
+# full list for CPython's `re`); folded so the prefix search sees them too
+_ASCII_FOLDS = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"})
+
+
+class OutputRule(NamedTuple):
+    pattern: str
+    kind: str                        # e.g. secret | rule | keyword
+    label: str                       # reported with every hit
+    action: str                      # one of ACTIONS
+    replacement: str = "[REDACTED]"
+
+
+class OutputHit(NamedTuple):
+    kind: str
+    label: str
+    start: int                       # offsets in the stream as received
+    end: int
+    action: str
+
+
+# ========================= COMPILATION ========================= #
+
+class _Anywhere(Exception):
+    pass
+
+
+def _leading_prefixes(pattern: str, flags: int, n: int = PREFIX_CHARS) -> Optional[Set[str]]:
+    """
+    Lowercase strings of at most `n` chars, one of which starts every match
+    of `pattern`; None when a match may start with anything.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return None
+    out: Set[str] = set()
+
+    def walk(seq: list, acc: str) -> None:
+        for i, (op, av) in enumerate(seq):
+            if len(acc) >= n:
+                break
+            if op is _LITERAL:
+                acc += chr(av).lower()
+            elif op is _AT:
+                continue                            # \b, ^ … consume nothing
+            elif op is _SUBPATTERN:
+                return walk(list(av[-1]) + seq[i + 1:], acc)
+            elif op is _BRANCH:
+                for alt in av[1]:
+                    walk(list(alt) + seq[i + 1:], acc)
+                return
+            elif op in _REPEATS:
+                lo, _hi, item = av
+                if lo == 0:
+                    walk(seq[i + 1:], acc)
+                return walk(list(item) + seq[i + 1:], acc)
+            else:
+                break                               # classes, lookaround …: prefix ends here
+        if not acc:
+            raise _Anywhere
+        out.add(acc[:n])
+        if len(out) > _MAX_PREFIXES:
+            raise _Anywhere
+
+    try:
+        walk(list(parsed), "")
+    except _Anywhere:
+        return None
+    return out
+
+
+def _max_width(compiled: re.Pattern) -> int:
+    """Longest possible match of a pattern (sys.maxsize-like when unbounded)."""
+    try:
+        return sre_parse.parse(compiled.pattern, compiled.flags).getwidth()[1]
+    except Exception:
+        return sre_constants.MAXREPEAT
+
+
+def _scoped(compiled: re.Pattern) -> str:
+    """The pattern as a group that carries its own flags, to join an alternation."""
+    body = compiled.pattern
+    while True:
+        m = _LEADING_FLAGS.match(body)
+        if not m:
+            break
+        body = body[m.end():]
+    flags = "".join(ch for flag, ch in _SCOPED_FLAGS if compiled.flags & flag)
+    if compiled.flags & re.VERBOSE:
+        body += "\n"
+    return f"(?{flags}:{body})" if flags else f"(?:{body})"
+
+
+def _lower(text: str) -> str:
+    """Lowercase for the prefix search, one character per character of `text`."""
+    if text.isascii():
+        return text.lower()
+    lower = text.lower()
+    if len(lower) != len(text):
+        lower = "".join(c if len(c.lower()) != 1 else c.lower() for c in text)
+    return lower.translate(_ASCII_FOLDS)
+
+
+class OutputPolicy:
+    """Rules compiled once; `scanner()` gives the per-stream state."""
+
+    def __init__(self, rules: Sequence[OutputRule], lookback: int = 128, shingle_words: int = 8):
+        if lookback < 2:
+            raise ValueError("lookback must be at least 2")
+        self.rules = tuple(rules)
+        self.lookback = lookback
+        self.shingle_words = shingle_words
+
+        parts: List[str] = []
+        self.group_rule: Dict[int, int] = {}       # wrapper group → rule index
+        prefixes: Set[str] = set()
+        widest = 0
+        self.anywhere = False                      # some rule has no usable leading literal
+        group = 1
+        for idx, rule in enumerate(self.rules):
+            if rule.action not in ACTIONS:
+                raise ValueError(f"Unknown action {rule.action!r}; expected one of {ACTIONS}")
+            compiled = re.compile(rule.pattern)
+            if compiled.fullmatch(""):
+                raise ValueError(f"Output rule matches the empty string: {rule.pattern!r}")
+            if compiled.groupindex:
+                raise ValueError(f"Output rules cannot use named groups: {rule.pattern!r}")
+            parts.append(f"({_scoped(compiled)})")
+            self.group_rule[group] = idx
+            group += 1 + compiled.groups
+            widest = max(widest, _max_width(compiled))
+            lead = _leading_prefixes(compiled.pattern, compiled.flags)
+            if lead is None:
+                self.anywhere = True
+            else:
+                prefixes.update(lead)
+
+        self.horizon = min(lookback, widest + 1)
+        self.finditer = re.compile("|".join(parts)).finditer if parts else None
+        # Longest first so a search reports the earliest start, whichever prefix
+        self.starts = (
+            re.compile("|".join(re.escape(p) for p in sorted(prefixes, key=len, reverse=True))).search
+            if prefixes
+            else None
+        )
+        # Proper prefixes of the prefixes: a text tail equal to one of them may
+        # become a match start once the next chunk arrives
+        self.partials: FrozenSet[str] = frozenset(p[:j] for p in prefixes for j in range(1, len(p)))
+
+    def shingles(self, protected: Iterable[str]) -> FrozenSet[int]:
+        k = self.shingle_words
+        out: Set[int] = set()
+        for text in protected:
+            words = [w.lower() for w in _WORD.findall(text)]
+            out.update(hash(tuple(words[i:i + k])) for i in range(len(words) - k + 1))
+        return frozenset(out)
+
+    def scanner(self, protected: Iterable[str] = ()) -> "OutputScanner":
+        return OutputScanner(self, protected)
+
+
+# ========================= PER-STREAM STATE ========================= #
+
+class OutputScanner:
+    def __init__(self, policy: OutputPolicy, protected: Iterable[str] = ()):
+        self.policy = policy
+        self.hits: List[OutputHit] = []
+        self.cut = False
+        self.chars_in = 0
+        self._held = ""                 # received, not released yet
+        self._held_at = 0               # stream offset of _held[0]
+        self._ctx = ""                  # tail of the input before _held
+        # Leak detection over word shingles of the protected texts
+        self._shingles = policy.shingles(protected)
+        self._window: Deque[Tuple[str, int]] = deque(maxlen=policy.shingle_words)
+        self._partial = ""
+
+    @property
+    def held(self) -> int:
+        """Characters received but not released yet."""
+        return len(self._held)
+
+    def feed(self, chunk: str) -> str:
+        """Add received text; return the text that can be passed on now (possibly "")."""
+        if self.cut or not chunk:
+            return ""
+        if self._shingles and self._leaked(chunk, final=False):
+            return ""
+        self.chars_in += len(chunk)
+        return self._scan(chunk, final=False)
+
+    def finish(self) -> str:
+        """End of stream: release whatever is still held, with its hits resolved."""
+        if self.cut:
+            return ""
+        if self._shingles and self._leaked("", final=True):
+            return ""
+        return self._scan("", final=True)
+
+    # ---------------- internals ----------------
+
+    def _leaked(self, chunk: str, final: bool) -> bool:
+        base = self.chars_in - len(self._partial)
+        text = self._partial + chunk
+        words = list(_WORD.finditer(text))
+        self._partial = ""
+        if words and not final and words[-1].end() == len(text):
+            last = words.pop()                     # may continue in the next chunk
+            if len(last.group()) <= MAX_PARTIAL_WORD:
+                self._partial = last.group()
+        window = self._window
+        for w in words:
+            window.append((w.group().lower(), base + w.start()))
+            if len(window) == window.maxlen and hash(tuple(t for t, _ in window)) in self._shingles:
+                self.hits.append(OutputHit("leak", "Protected text reproduced", window[0][1], base + w.end(), "cut"))
+                self.cut = True
+                self._held = ""
+                return True
+        return False
+
+    def _scan(self, chunk: str, final: bool) -> str:
+        p = self.policy
+        ctx = self._ctx
+        text = ctx + self._held + chunk
+        off = len(ctx)
+        end = len(text)
+        if end == off:
+            return ""
+        lower = _lower(text)
+
+        def at(i: int) -> int:
+            return self._held_at + i - off
+
+        out: List[str] = []
+        pos = off                       # text[pos:] not copied to `out` yet
+        decided = off                   # text[:decided] can no longer start a match
+        hold = end
+        settled = end - (p.horizon - 1)     # a match starting before this is complete
+        if p.finditer is not None and (
+            self._held or p.anywhere or (p.starts is not None and p.starts(lower, off) is not None)
+        ):
+            for m in p.finditer(text, off):
+                s, e = m.span()
+                if not final and (s >= settled or e == end):
+                    hold = s            # later chunks may still change this match
+                    break
+                rule = p.rules[p.group_rule[m.lastindex]]
+                self.hits.append(OutputHit(rule.kind, rule.label, at(s), at(e), rule.action))
+                decided = e
+                if rule.action == "flag":
+                    continue
+                out.append(text[pos:s])
+                if rule.action == "cut":
+                    self.cut = True
+                    self._held = ""
+                    return "".join(out)
+                out.append(rule.replacement)
+                pos = e
+
+        if final:
+            hold = end
+        else:
+            boundary = max(decided, settled)
+            if hold < boundary:
+                hold = end              # longer than the lookback: not held any more
+            if p.anywhere:
+                hold = min(hold, boundary)
+            elif p.starts is not None:
+                m = p.starts(lower, boundary, hold)
+                if m is not None:
+                    hold = m.start()
+                else:
+                    for j in range(max(boundary, end - PREFIX_CHARS + 1), hold):
+                        if lower[j:end] in p.partials:
+                            hold = j
+                            break
+
+        out.append(text[pos:hold])
+        self._held_at = at(hold)
+        self._held = text[hold:]
+        self._ctx = text[max(0, hold - CONTEXT_CHARS):hold]
+        return "".join(out)
@@ -0,0 +1,135 @@
+"""
+Sentinel Prepared Prompt
+Per-request view of a prompt that every detection stage shares.
+
+Heuristics, ML and the sanitizer each used to re-derive the same things from
+the raw string: `prompt[:8000]`, `.lower()`, `splitlines()` + per-line
+`.lower()`, and a fresh tokenization inside the vectorizer. A PreparedPrompt
+computes each of these at most once, lazily, and hands out the cached value:
+
+    • text        — the prompt as received (rules and sanitizer see all of it)
+    • head        — text truncated to MAX_PROMPT_CHARS (heuristics and ML)
+    • lower       — lowercased text; shared with `head_lower` when not truncated
+    • line_spans  — flat (start, end) offsets with `str.splitlines()` semantics
+    • tokens      — default HashingVectorizer tokens of `head_lower`
+    • vector      — hashed n-gram indices, cached by the scorer that built them
+
+Stages accept either a plain string or a PreparedPrompt; `prepare()` is a
+no-op for the latter.
+"""
+
+from __future__ import annotations
+
+import re
+from array import array
+from itertools import accumulate
+from operator import add
+from typing import Any, Iterator, List, Optional, Tuple, Union
+
+__all__ = [
+    "MAX_PROMPT_CHARS",
+    "TOKEN_PATTERN",
+    "PreparedPrompt",
+    "line_spans_of",
+    "prepare",
+]
+
+MAX_PROMPT_CHARS = 8000        # same cut-off as heuristics and the ML detector
+TOKEN_PATTERN = r"(?u)\b\w\w+\b"   # HashingVectorizer default
+
+_tokenize = re.compile(TOKEN_PATTERN).findall
+
+
+def line_spans_of(text: str) -> array:
+    """Flat [start0, end0, start1, end1, …] of the lines `text.splitlines()` returns."""
+    lines = text.splitlines()
+    starts = array("l", accumulate(map(len, text.splitlines(True)), initial=0))
+    starts.pop()
+    spans = array("l", bytes(2 * len(lines) * starts.itemsize))
+    spans[::2] = starts
+    spans[1::2] = array("l", map(add, starts, map(len, lines)))
+    return spans
+
+
+class PreparedPrompt:
+    __slots__ = (
+        "text", "head", "is_ascii",
+        "_lower", "_head_lower", "_spans", "_tokens", "_vector", "_vector_owner",
+    )
+
+    def __init__(self, text: str):
+        self.text = text
+        self.head = text[:MAX_PROMPT_CHARS]      # same object when not truncated
+        # ASCII lowercasing is per character, so offsets into `lower` match `text`
+        self.is_ascii = text.isascii()
+        self._lower: Optional[str] = None
+        self._head_lower: Optional[str] = None
+        self._spans: Optional[array] = None
+        self._tokens: Optional[List[str]] = None
+        self._vector: Any = None
+        self._vector_owner: Any = None
+
+    def __len__(self) -> int:
+        return len(self.text)
+
+    def __getstate__(self):
+        # Only the text crosses a process boundary; everything else is cheap to redo
+        return (self.text,)
+
+    def __setstate__(self, state):
+        self.__init__(state[0])
+
+    # ---------------- normalized text ----------------
+
+    @property
+    def head_lower(self) -> str:
+        if self._head_lower is None:
+            if self.head is self.text:
+                self._head_lower = self.lower
+            else:
+                self._head_lower = self.head.lower()
+        return self._head_lower
+
+    @property
+    def lower(self) -> str:
+        if self._lower is None:
+            self._lower = self.text.lower()
+        return self._lower
+
+    # ---------------- lines ----------------
+
+    @property
+    def line_spans(self) -> array:
+        """[start0, end0, start1, end1, …] — same lines as `text.splitlines()`."""
+        if self._spans is None:
+            self._spans = line_spans_of(self.text)
+        return self._spans
+
+    def lines(self) -> Iterator[Tuple[int, int]]:
+        spans = self.line_spans
+        return zip(spans[::2], spans[1::2])
+
+    def line_contains(self, start: int, end: int, needle: str) -> bool:
+        """`needle in text[start:end].lower()` without copying the line."""
+        if self.is_ascii:
+            return self.lower.find(needle, start, end) != -1
+        return needle in self.text[start:end].lower()
+
+    # ---------------- tokens / features ----------------
+
+    @property
+    def tokens(self) -> List[str]:
+        if self._tokens is None:
+            self._tokens = _tokenize(self.head_lower)
+        return self._tokens
+
+    def cached_vector(self, owner: Any) -> Any:
+        return self._vector if self._vector_owner is owner else None
+
+    def cache_vector(self, owner: Any, vector: Any) -> None:
+        self._vector_owner = owner
+        self._vector = vector
+
+
+def prepare(prompt: Union[str, PreparedPrompt]) -> PreparedPrompt:
+    return prompt if isinstance(prompt, PreparedPrompt) else PreparedPrompt(prompt)
@@ -0,0 +1,282 @@
+"""
+Sentinel Rule Program
+Compiles a list of `RegexRule`s into a program that avoids one full regex
+scan per rule per prompt.
+
+Two techniques, both exact (the matched rule set is identical to running
+`rule.compiled.search(prompt)` for every rule):
+
+    • Literal prefilter — each pattern is parsed and a required literal
+      (or a set of alternative literals, e.g. "ignore", "reveal", "bypass")
+      is extracted. One Aho-Corasick pass over the lowered prompt tells which
+      literals are present; a rule's regex only runs if its literal is.
+    • Merged alternations — rules without a usable literal are fused into
+      `(?flags)(?:...)|(?:...)` groups, so a prompt that matches none of
+      them costs one scan per group instead of one per rule. The groups are
+      deliberately capture-free: named captures per rule make CPython's
+      matcher slower than the individual searches they replace.
+
+The prefilter compares ASCII-lowercased literals against the lowered prompt,
+which is only a sound test for ASCII text (`re.IGNORECASE` also folds e.g.
+"ſ" to "s"). Non-ASCII prompts therefore skip the prefilter.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Optional, Sequence, Set, Tuple
+
+try:  # Python 3.11+
+    from re import _constants as sre_constants
+    from re import _parser as sre_parse
+except ImportError:  # pragma: no cover - older interpreters
+    import sre_constants  # type: ignore[no-redef]
+    import sre_parse  # type: ignore[no-redef]
+
+from engine.keyword_matcher import KeywordMatcher
+
+__all__ = [
+    "RuleProgram",
+    "required_literals",
+]
+
+MIN_LITERAL_CHARS = 3        # shorter literals filter almost nothing
+MERGE_CHUNK = 128            # rules per merged alternation group
+
+_LITERAL = sre_constants.LITERAL
+_SUBPATTERN = sre_constants.SUBPATTERN
+_BRANCH = sre_constants.BRANCH
+_REPEATS = {sre_constants.MAX_REPEAT, sre_constants.MIN_REPEAT}
+_ATOMIC = getattr(sre_constants, "ATOMIC_GROUP", None)
+if hasattr(sre_constants, "POSSESSIVE_REPEAT"):
+    _REPEATS.add(sre_constants.POSSESSIVE_REPEAT)
+_GROUPREFS = {sre_constants.GROUPREF, sre_constants.GROUPREF_EXISTS}
+_GROUPREFS.update(
+    getattr(sre_constants, n) for n in ("GROUPREF_IGNORE", "GROUPREF_LOC_IGNORE", "GROUPREF_UNI_IGNORE")
+    if hasattr(sre_constants, n)
+)
+
+_LEADING_FLAGS = re.compile(r"^\(\?[aiLmsux]+\)")
+_SCOPED_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"), (re.ASCII, "a"))
+
+# A requirement is a tuple of alternatives: at least one must occur.
+Requirement = Tuple[str, ...]
+
+
+# ========================= LITERAL EXTRACTION ========================= #
+
+def _strength(req: Optional[Requirement]) -> Tuple[int, int]:
+    if not req:
+        return (0, 0)
+    return (min(len(s) for s in req), -len(req))
+
+
+def _best(a: Optional[Requirement], b: Optional[Requirement]) -> Optional[Requirement]:
+    return b if _strength(b) > _strength(a) else a
+
+
+def _seq_requirement(items) -> Optional[Requirement]:
+    """Strongest requirement of a parsed sequence (every item must match)."""
+    best: Optional[Requirement] = None
+    run: List[str] = []
+
+    def flush():
+        nonlocal best, run
+        if run:
+            best = _best(best, ("".join(run),))
+            run = []
+
+    def walk(seq):
+        nonlocal best
+        for op, av in seq:
+            if op is _LITERAL and av < 128:
+                run.append(chr(av).lower())
+            elif op is _SUBPATTERN:
+                walk(av[-1])                     # group body is inline
+            elif _ATOMIC is not None and op is _ATOMIC:
+                walk(av)
+            elif op in _REPEATS:
+                flush()
+                lo, _hi, item = av
+                if lo >= 1:
+                    best = _best(best, _seq_requirement(item))
+            elif op is _BRANCH:
+                flush()
+                alts = [_seq_requirement(alt) for alt in av[1]]
+                if all(alts):
+                    merged = tuple(dict.fromkeys(s for alt in alts for s in alt))
+                    best = _best(best, merged)
+            else:
+                # classes, anchors, lookarounds, backrefs … end the run
+                flush()
+
+    walk(items)
+    flush()
+    return best
+
+
+def required_literals(pattern: str, flags: int = 0) -> Optional[Requirement]:
+    """
+    Literals (lowercase ASCII) of which at least one occurs in every match
+    of `pattern`, or None when no useful literal can be extracted.
+    """
+    try:
+        parsed = sre_parse.parse(pattern, flags)
+    except Exception:
+        return None
+    req = _seq_requirement(parsed)
+    if _strength(req)[0] < MIN_LITERAL_CHARS:
+        return None
+    return req
+
+
+# ========================= MERGING ========================= #
+
+def _has_groupref(items) -> bool:
+    for op, av in items:
+        if op in _GROUPREFS:
+            return True
+        if op is _SUBPATTERN and _has_groupref(av[-1]):
+            return True
+        if _ATOMIC is not None and op is _ATOMIC and _has_groupref(av):
+            return True
+        if op in _REPEATS and _has_groupref(av[2]):
+            return True
+        if op is _BRANCH and any(_has_groupref(alt) for alt in av[1]):
+            return True
+        if op in (sre_constants.ASSERT, sre_constants.ASSERT_NOT) and _has_groupref(av[1]):
+            return True
+    return False
+
+
+def _mergeable_body(compiled: re.Pattern) -> Optional[Tuple[str, str]]:
+    """(scoped flags, pattern body) if the rule can join an alternation, else None."""
+    if not isinstance(compiled.pattern, str) or compiled.flags & re.LOCALE:
+        return None
+    try:
+        parsed = sre_parse.parse(compiled.pattern, compiled.flags)
+    except Exception:
+        return None
+    if compiled.groupindex or _has_groupref(parsed):   # names/numbers would clash
+        return None
+
+    body = compiled.pattern
+    while True:
+        m = _LEADING_FLAGS.match(body)
+        if not m:
+            break
+        body = body[m.end():]
+    if re.search(r"\(\?[aiLmsux]+\)", body):
+        return None                              # stray global flags
+
+    flags = "".join(ch for flag, ch in _SCOPED_FLAGS if compiled.flags & flag)
+    if compiled.flags & re.VERBOSE:
+        body += "\n"                             # close any trailing comment
+    return flags, body
+
+
+# ========================= PROGRAM ========================= #
+
+class RuleProgram:
+    """
+    Compiled evaluation plan for a list of rules with a `.compiled` pattern.
+
+    `search(prompt, lower)` returns the indices (in list order) of every rule
+    whose pattern matches `prompt`.
+    """
+
+    def __init__(self, rules: Sequence, merge_chunk: int = MERGE_CHUNK):
+        self.rules = list(rules)
+        self._compiled = [r.compiled for r in self.rules]
+
+        literal_ids: dict = {}
+        self._filtered: List[int] = []
+        self._rules_by_literal: List[List[int]] = []    # literal id → rule indices
+        unfiltered: List[int] = []
+
+        for idx, pat in enumerate(self._compiled):
+            req = required_literals(pat.pattern, pat.flags) if isinstance(pat.pattern, str) else None
+            if req is None:
+                unfiltered.append(idx)
+                continue
+            self._filtered.append(idx)
+            for lit in req:
+                lit_id = literal_ids.setdefault(lit, len(literal_ids))
+                if lit_id == len(self._rules_by_literal):
+                    self._rules_by_literal.append([])
+                self._rules_by_literal[lit_id].append(idx)
+
+        self._literals = KeywordMatcher(literal_ids)
+
+        # Rules that always run: merge what can be merged (one alternation per
+        # flag set, flags hoisted to the front), keep the rest solo.
+        self._solo: List[int] = []
+        self._groups: List[Tuple[re.Pattern, Tuple[int, ...]]] = []
+        by_flags: Dict[str, List[Tuple[int, str]]] = {}
+        for idx in unfiltered:
+            merge = _mergeable_body(self._compiled[idx])
+            if merge is None:
+                self._solo.append(idx)
+            else:
+                by_flags.setdefault(merge[0], []).append((idx, merge[1]))
+
+        for flags, pending in by_flags.items():
+            prefix = f"(?{flags})" if flags else ""
+            for start in range(0, len(pending), merge_chunk):
+                chunk = pending[start:start + merge_chunk]
+                if len(chunk) == 1:
+                    self._solo.append(chunk[0][0])
+                    continue
+                try:
+                    merged = re.compile(prefix + "|".join(f"(?:{body})" for _, body in chunk))
+                except re.error:
+                    self._solo.extend(idx for idx, _ in chunk)
+                    continue
+                self._groups.append((merged, tuple(idx for idx, _ in chunk)))
+
+    @property
+    def stats(self) -> dict:
+        return {
+            "rules": len(self.rules),
+            "prefiltered": len(self._filtered),
+            "literals": len(self._literals),
+            "merged_groups": len(self._groups),
+            "merged_rules": sum(len(ids) for _, ids in self._groups),
+            "solo": len(self._solo),
+        }
+
+    def search(self, prompt: str, lower: Optional[str] = None) -> List[int]:
+        compiled = self._compiled
+        matched: Set[int] = set()
+
+        # 1) Prefiltered rules: regex only runs when a required literal is present
+        if self._filtered:
+            if prompt.isascii():
+                candidates: Set[int] = set()
+                by_literal = self._rules_by_literal
+                for lit_id in self._literals.find(prompt.lower() if lower is None else lower):
+                    candidates.update(by_literal[lit_id])
+            else:
+                candidates = set(self._filtered)
+            for idx in candidates:
+                if compiled[idx].search(prompt):
+                    matched.add(idx)
+
+        # 2) Merged groups: one scan when nothing in the group matches. On a
+        #    hit, every alternative is known to fail before the match start,
+        #    so the members are resolved from there on.
+        for merged, ids in self._groups:
+            m = merged.search(prompt)
+            if m is None:
+                continue
+            pos = m.start()
+            for idx in ids:
+                if compiled[idx].search(prompt, pos):
+                    matched.add(idx)
+
+        # 3) Everything else, one by one
+        for idx in self._solo:
+            if compiled[idx].search(prompt):
+                matched.add(idx)
+
+        return sorted(matched)
@@ -9,25 +9,52 @@ This module is designed to serve as:
 
 Key advantages:
     ✓ Deterministic & explainable
-    ✓ 0-latency startup (precompiled patterns)
+    ✓ 0-latency startup (precompiled patterns, or a prebuilt rules.snapshot)
     ✓ Auto-extendable (100,000+ external keywords & regex rules)
+    ✓ Live rule updates: the active RuleSet is swapped atomically, no restart
     ✓ Plays safely with any FastAPI / Vercel / reverse-proxy setup
+
+Rules come from `rules.snapshot` when it exists (written by
+`sentinel_rules.py compile`: validated, with the regex program, keyword
+automaton and max score prebuilt), else from extra_regex_rules.json and
+extra_keywords.txt plus the built-ins. A watcher thread (start_rules_watcher,
+started once by the gateway and by each of its worker processes) checks those
+files and publishes a changed rule set with one reference swap; a detection always
+runs against a single rule set, and reports its version.
 """
 
 from __future__ import annotations
 
+import hashlib
 import json
+import os
+import pickle
 import re
+import threading
+import time
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, List, Tuple
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Union
+
+from engine.keyword_matcher import KeywordMatcher
+from engine.prepared_prompt import PreparedPrompt
+from engine.rule_program import RuleProgram
 
 # What this module exposes
 __all__ = [
     "RegexRule",
     "Detection",
+    "RuleError",
+    "RuleSet",
     "REGEX_RULES",
     "BUILTIN_KEYWORDS",
+    "read_rule_sources",
+    "build_rule_set",
+    "write_snapshot",
+    "load_snapshot",
+    "current_rules",
+    "reload_rules",
+    "rules_info",
     "detect",
     "heuristic_score",
     "matched_patterns",
@@ -41,8 +68,13 @@ SUSPICIOUS_THRESHOLD = 0.35    # >= → sanitize, < → allow
 
 EXTRA_RULES_FILE = Path(__file__).resolve().parent / "extra_regex_rules.json"
 EXTRA_KEYWORDS_FILE = Path(__file__).resolve().parent / "extra_keywords.txt"
+# Compiled rule set; takes precedence over the two source files above
+RULES_SNAPSHOT_FILE = Path(__file__).resolve().parent / "rules.snapshot"
 
 MAX_PROMPT_CHARS = 8000        # truncate to avoid DoS from huge prompts
+RULES_RELOAD_INTERVAL = 30.0   # seconds between checks of the rule files
+SNAPSHOT_FORMAT = 1            # bump when RuleSet / RuleProgram / KeywordMatcher change shape
+EXTRA_KEYWORD_WEIGHT = 0.8     # default weight for external terms
 
 
 # ========================= DATA CLASSES ========================= #
@@ -61,6 +93,23 @@ class Detection:
     label: str                           # ALLOW | SUSPICIOUS | BLOCK
     matched_rules: List[Dict[str, Any]]
     matched_keywords: List[str]
+    rules_version: Optional[str] = None  # RuleSet that produced this result
+
+
+class RuleError(ValueError):
+    """Invalid rule source or snapshot."""
+
+
+class RuleSet(NamedTuple):
+    """Everything detect() needs, built together and published as one object."""
+    version: str                         # content digest of rules + keywords + weights
+    source: str                          # "snapshot" | "files"
+    regex_rules: Tuple[RegexRule, ...]
+    keywords: Dict[str, float]
+    program: RuleProgram                 # literal prefilter + merged alternations
+    matcher: KeywordMatcher              # Aho-Corasick over `keywords`
+    keyword_weights: Tuple[float, ...]
+    max_total: float                     # score normalizer: every rule and keyword matched
 
 
 # ========================= BUILT-IN RULES ========================= #
@@ -78,41 +127,6 @@ _BUILTIN_REGEX: List[Tuple[str, str, float]] = [
 ]
 
 
-def _load_extra_regex() -> List[Tuple[str, str, float]]:
-    """
-    Load additional regex rules from JSON (optional, unbounded scale).
-
-    extra_regex_rules.json format:
-        [
-          {"pattern": "...", "description": "...", "weight": 2.0},
-          ...
-        ]
-    """
-    if not EXTRA_RULES_FILE.exists():
-        return []
-    try:
-        raw = json.loads(EXTRA_RULES_FILE.read_text())
-        rules: List[Tuple[str, str, float]] = []
-        for r in raw:
-            pattern = r.get("pattern")
-            if not pattern:
-                continue
-            desc = r.get("description", "External rule")
-            weight = float(r.get("weight", 2.0))
-            rules.append((pattern, desc, weight))
-        return rules
-    except Exception:
-        # Fail closed: still use built-ins
-        return []
-
-
-# Merge & compile
-REGEX_RULES: List[RegexRule] = [
-    RegexRule(pattern=p, description=d, weight=w, compiled=re.compile(p))
-    for (p, d, w) in (_BUILTIN_REGEX + _load_extra_regex())
-]
-
-
 # ========================= KEYWORDS (SCALE TO 100K+) ========================= #
 
 _BUILTIN_KEYWORDS: Dict[str, float] = {
@@ -134,41 +148,275 @@ _BUILTIN_KEYWORDS: Dict[str, float] = {
 }
 
 
-def _load_extra_keywords() -> Dict[str, float]:
+# ========================= RULE SOURCES ========================= #
+
+def _parse_extra_regex(path: Path, errors: List[str]) -> List[Tuple[str, str, float]]:
+    """
+    Additional regex rules from JSON (optional, unbounded scale).
+
+    extra_regex_rules.json format:
+        [
+          {"pattern": "...", "description": "...", "weight": 2.0},
+          ...
+        ]
+
+    An invalid entry is skipped and reported in `errors`; the others load.
+    """
+    if not path.exists():
+        return []
+    try:
+        raw = json.loads(path.read_text())
+    except (OSError, ValueError) as e:
+        errors.append(f"{path.name}: {e}")
+        return []
+    if not isinstance(raw, list):
+        errors.append(f"{path.name}: expected a JSON list of rules")
+        return []
+    rules: List[Tuple[str, str, float]] = []
+    for i, r in enumerate(raw):
+        where = f"{path.name}[{i}]"
+        if not isinstance(r, dict) or not isinstance(r.get("pattern"), str) or not r["pattern"]:
+            errors.append(f"{where}: missing \"pattern\"")
+            continue
+        try:
+            weight = float(r.get("weight", 2.0))
+            re.compile(r["pattern"])
+        except (TypeError, ValueError, re.error) as e:
+            errors.append(f"{where}: {e}")
+            continue
+        if not weight > 0:
+            errors.append(f"{where}: weight must be > 0")
+            continue
+        rules.append((r["pattern"], str(r.get("description", "External rule")), weight))
+    return rules
+
+
+def _parse_extra_keywords(path: Path, errors: List[str]) -> Dict[str, float]:
     """
-    Load unlimited external keywords from plain text file (one per line).
+    Unlimited external keywords from a plain text file (one per line).
 
     extra_keywords.txt:
         wifi password cracking
         undetectable malware
         ...
     """
-    if not EXTRA_KEYWORDS_FILE.exists():
+    if not path.exists():
         return {}
     try:
-        additions: Dict[str, float] = {}
-        for line in EXTRA_KEYWORDS_FILE.read_text().splitlines():
-            word = line.strip().lower()
-            if word:
-                additions.setdefault(word, 0.8)  # default weight for external terms
-        return additions
-    except Exception:
+        lines = path.read_text().splitlines()
+    except (OSError, UnicodeDecodeError) as e:
+        errors.append(f"{path.name}: {e}")
         return {}
+    additions: Dict[str, float] = {}
+    for line in lines:
+        word = line.strip().lower()
+        if word:
+            additions.setdefault(word, EXTRA_KEYWORD_WEIGHT)
+    return additions
+
+
+def read_rule_sources(
+    rules_file: Path = EXTRA_RULES_FILE, keywords_file: Path = EXTRA_KEYWORDS_FILE
+) -> Tuple[List[Tuple[str, str, float]], Dict[str, float], List[str]]:
+    """Built-in + external (pattern, description, weight) rules, keywords, and the problems found."""
+    errors: List[str] = []
+    regex = _BUILTIN_REGEX + _parse_extra_regex(rules_file, errors)
+    keywords = {**_BUILTIN_KEYWORDS, **_parse_extra_keywords(keywords_file, errors)}
+    return regex, keywords, errors
+
+
+def build_rule_set(
+    regex: List[Tuple[str, str, float]], keywords: Dict[str, float], source: str = "files"
+) -> RuleSet:
+    """Compile rules and keywords into a RuleSet (the expensive part at scale)."""
+    digest = hashlib.sha256(
+        json.dumps([regex, sorted(keywords.items())], ensure_ascii=False).encode()
+    ).hexdigest()[:16]
+    rules = tuple(
+        RegexRule(pattern=p, description=d, weight=w, compiled=re.compile(p)) for (p, d, w) in regex
+    )
+    return RuleSet(
+        version=digest,
+        source=source,
+        regex_rules=rules,
+        keywords=keywords,
+        program=RuleProgram(rules),
+        matcher=KeywordMatcher(keywords),
+        keyword_weights=tuple(keywords.values()),
+        max_total=max(sum(r.weight for r in rules) + sum(keywords.values()), 1.0),  # avoid division by zero
+    )
+
+
+# ========================= SNAPSHOTS ========================= #
+
+def write_snapshot(rule_set: RuleSet, path: Path = RULES_SNAPSHOT_FILE) -> None:
+    """Pickle a compiled RuleSet; written to a temp file and renamed so readers never see a partial one."""
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        pickle.dump({"format": SNAPSHOT_FORMAT, "rules": rule_set._replace(source="snapshot")}, f,
+                    protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp, path)
+
 
+def load_snapshot(path: Path = RULES_SNAPSHOT_FILE) -> RuleSet:
+    # Trusted input, like the model pickles: only `sentinel_rules.py compile` writes it
+    with open(path, "rb") as f:
+        data = pickle.load(f)
+    if not isinstance(data, dict) or data.get("format") != SNAPSHOT_FORMAT:
+        raise RuleError(f"{path.name}: snapshot format {data.get('format') if isinstance(data, dict) else '?'} "
+                        f"≠ {SNAPSHOT_FORMAT}; re-run `sentinel_rules.py compile`")
+    return data["rules"]
 
-BUILTIN_KEYWORDS: Dict[str, float] = {**_BUILTIN_KEYWORDS, **_load_extra_keywords()}
 
+# ========================= ACTIVE RULE SET ========================= #
 
-# ========================= PRECOMPUTED MAX SCORE ========================= #
+# Replaced by a single reference assignment; detect() reads it once per call
+_rules: Optional[RuleSet] = None
+_rules_info: Dict[str, Any] = {}
 
-_MAX_REGEX = sum(r.weight for r in REGEX_RULES)
-_MAX_KEY = sum(BUILTIN_KEYWORDS.values())
-_MAX_TOTAL = max(_MAX_REGEX + _MAX_KEY, 1.0)   # avoid division by zero
+# Mirrors of _rules for callers/introspection (not read on the detection path)
+REGEX_RULES: List[RegexRule] = []
+BUILTIN_KEYWORDS: Dict[str, float] = {}
+
+_files_sig: Optional[str] = None
+_load_error: Optional[str] = None        # "<file>: <exception>" of the last failed load
+_lock = threading.Lock()                 # serializes reloads, never taken by detect()
+_watcher: Optional[threading.Thread] = None
+_watcher_stop = threading.Event()
+
+# Called with {"version", "source", "rules", "keywords", "load_ms", "errors", "error"}
+# after every reload attempt that found changed files (version None and the
+# error text when it failed; `errors` lists skipped source entries)
+on_rules_reload: Optional[Callable[[Dict[str, Any]], None]] = None
+
+
+def _sig(path: Path) -> Optional[str]:
+    try:
+        s = path.stat()
+        return f"{s.st_mtime_ns}-{s.st_size}"
+    except OSError:
+        return None
+
+
+def _rule_files() -> Tuple[str, List[Path]]:
+    if RULES_SNAPSHOT_FILE.exists():
+        return "snapshot", [RULES_SNAPSHOT_FILE]
+    return "files", [EXTRA_RULES_FILE, EXTRA_KEYWORDS_FILE]
+
+
+def reload_rules(force: bool = False) -> bool:
+    """
+    Load the rule files if they changed on disk and publish the new RuleSet
+    with one reference swap. Returns True if a new rule set went live. A
+    failed load keeps the current rules serving.
+    """
+    global _files_sig, _load_error
+    with _lock:
+        source, paths = _rule_files()
+        sig = f"{source}-" + "-".join(str(_sig(p)) for p in paths)
+        if sig == _files_sig and not force:
+            return False
+        t0 = time.perf_counter()
+        errors: List[str] = []
+        try:
+            if source == "snapshot":
+                rule_set = load_snapshot(paths[0])
+            else:
+                regex, keywords, errors = read_rule_sources()
+                rule_set = build_rule_set(regex, keywords)
+        except Exception as e:
+            _files_sig = sig                 # do not retry the same broken files every interval
+            _load_error = f"{', '.join(p.name for p in paths)}: {e!r}"
+            _notify_reload({"version": None, "source": source, "rules": 0, "keywords": 0,
+                            "load_ms": (time.perf_counter() - t0) * 1000.0, "errors": errors,
+                            "error": _load_error})
+            return False
+        load_ms = (time.perf_counter() - t0) * 1000.0
+
+        _publish(rule_set, load_ms, errors)
+        _files_sig = sig
+        _load_error = None
+
+    _notify_reload({**_rules_info, "error": None})
+    return True
+
+
+def _publish(rule_set: RuleSet, load_ms: float, errors: List[str]) -> None:
+    global _rules, _rules_info, REGEX_RULES, BUILTIN_KEYWORDS
+    _rules = rule_set                                    # atomic publish
+    REGEX_RULES, BUILTIN_KEYWORDS = list(rule_set.regex_rules), rule_set.keywords
+    _rules_info = {
+        "version": rule_set.version,
+        "source": rule_set.source,
+        "rules": len(rule_set.regex_rules),
+        "keywords": len(rule_set.keywords),
+        "load_ms": round(load_ms, 3),
+        "loaded_at": time.time(),
+        "errors": errors,
+    }
+
+
+def _notify_reload(event: Dict[str, Any]) -> None:
+    if on_rules_reload is not None:
+        try:
+            on_rules_reload(event)
+        except Exception:
+            pass
+
+
+def _watch() -> None:
+    while not _watcher_stop.wait(RULES_RELOAD_INTERVAL):
+        reload_rules()
+
+
+def start_rules_watcher() -> None:
+    """Poll the rule files every RULES_RELOAD_INTERVAL seconds (once per process)."""
+    global _watcher
+    if _watcher is not None and _watcher.is_alive():
+        return
+    _watcher_stop.clear()
+    _watcher = threading.Thread(target=_watch, name="sentinel-rules-watcher", daemon=True)
+    _watcher.start()
+
+
+def stop_rules_watcher() -> None:
+    _watcher_stop.set()
+
+
+def current_rules() -> RuleSet:
+    """
+    The active RuleSet — a plain reference read. Reloads only happen on the
+    watcher thread, which the host process starts once (start_rules_watcher).
+    """
+    return _rules
+
+
+def rules_info() -> Dict[str, Any]:
+    """Version, source, sizes, load time and skipped entries of the active rule set."""
+    return dict(_rules_info)
+
+
+def _load_fallback() -> None:
+    """
+    Serve something after a failed import-time load: the source files when
+    the snapshot failed, the built-in rules when the source files did. The
+    failure, with the file it came from, heads rules_info()["errors"].
+    """
+    if _rule_files()[0] == "snapshot":
+        regex, keywords, errors = read_rule_sources()
+    else:
+        regex, keywords, errors = list(_BUILTIN_REGEX), dict(_BUILTIN_KEYWORDS), []
+    _publish(build_rule_set(regex, keywords), 0.0, [_load_error] + errors)
+
+
+# Import-time load (invalid source entries are skipped, never the whole file)
+if not reload_rules():
+    _load_fallback()
 
 
 # ========================= CORE DETECTION ENGINE ========================= #
 
-def detect(prompt: str) -> Detection:
+def detect(prompt: Union[str, PreparedPrompt]) -> Detection:
     """
     Compute a structured detection result for a given prompt.
 
@@ -176,36 +424,44 @@ def detect(prompt: str) -> Detection:
       • Never raises in normal operation
       • Truncates extremely long prompts
       • Always returns a valid Detection object
+      • Reuses the truncated/lowercased text of a PreparedPrompt
+      • Uses one RuleSet throughout, even if a reload swaps it meanwhile
     """
-    if not prompt:
-        return Detection(0.0, "ALLOW", [], [])
+    rules = current_rules()
+    if isinstance(prompt, PreparedPrompt):
+        prompt, lower = prompt.head, prompt.head_lower
+    else:
+        # DoS safety: extremely long prompts get truncated for heuristic scan
+        if len(prompt) > MAX_PROMPT_CHARS:
+            prompt = prompt[:MAX_PROMPT_CHARS]
+        lower = prompt.lower()
 
-    # DoS safety: extremely long prompts get truncated for heuristic scan
-    if len(prompt) > MAX_PROMPT_CHARS:
-        prompt = prompt[:MAX_PROMPT_CHARS]
+    if not prompt:
+        return Detection(0.0, "ALLOW", [], [], rules.version)
 
     score = 0.0
-    lower = prompt.lower()
 
     matched_rules: List[Dict[str, Any]] = []
-    for r in REGEX_RULES:
-        if r.compiled.search(prompt):
-            score += r.weight
-            matched_rules.append(
-                {
-                    "pattern": r.pattern,
-                    "description": r.description,
-                    "weight": r.weight,
-                }
-            )
+    regex_rules = rules.regex_rules
+    for idx in rules.program.search(prompt, lower):    # ids in regex_rules order
+        r = regex_rules[idx]
+        score += r.weight
+        matched_rules.append(
+            {
+                "pattern": r.pattern,
+                "description": r.description,
+                "weight": r.weight,
+            }
+        )
 
     matched_keywords: List[str] = []
-    for kw, weight in BUILTIN_KEYWORDS.items():
-        if kw in lower:
-            score += weight
-            matched_keywords.append(kw)
+    keywords = rules.matcher.keywords
+    weights = rules.keyword_weights
+    for idx in rules.matcher.find(lower):     # ids come back in dict order
+        score += weights[idx]
+        matched_keywords.append(keywords[idx])
 
-    risk = max(0.0, min(score / _MAX_TOTAL, 1.0))
+    risk = max(0.0, min(score / rules.max_total, 1.0))
 
     if risk >= BLOCK_THRESHOLD:
         label = "BLOCK"
@@ -219,6 +475,7 @@ def detect(prompt: str) -> Detection:
         label=label,
         matched_rules=matched_rules,
         matched_keywords=matched_keywords,
+        rules_version=rules.version,
     )
 
 
@@ -246,4 +503,3 @@ def explain(prompt: str) -> str:
         f"{det.label} ({det.risk_score:.3f}) – "
         f"{len(det.matched_rules)} rule(s), {len(det.matched_keywords)} keyword(s) matched"
     )
-
@@ -1,75 +1,280 @@
 from __future__ import annotations
 
-import joblib
+import hashlib
 import time
 import threading
 from pathlib import Path
-from typing import Optional, Callable, Dict, Any
+from typing import TYPE_CHECKING, Optional, Callable, Dict, Any, List, NamedTuple, Union
+
+from engine.model_artifact import META_FILE, swap_in_progress
+from engine.prepared_prompt import PreparedPrompt
+
+# numpy, sklearn and joblib are imported by _load(), not here: importing the
+# detector (and the app) stays cheap, and the native scorer never needs sklearn
+if TYPE_CHECKING:
+    from engine.linear_scorer import LinearScorer
 
 BASE = Path(__file__).resolve().parent.parent
 VECTOR_FILE = BASE / "models" / "vectorizer.pkl"
 MODEL_FILE = BASE / "models" / "classifier.pkl"
+# Memory-mappable artifact (preferred when present): shared page cache across workers
+LINEAR_DIR = BASE / "models" / "linear"
 
 MODEL_RELOAD_INTERVAL = 30.0
 MAX_PROMPT_CHARS = 8000
 DEFAULT_SCORE = 0.0
 CLAMP = (0.0, 1.0)
 SMOOTHING = 0.05
+# Score linear artifacts with the native scorer instead of sklearn objects
+USE_NATIVE_SCORER = True
+
+class LoadedModel(NamedTuple):
+    vectorizer: Any               # sklearn pair; None when the native scorer serves
+    classifier: Any
+    linear_scorer: Optional[LinearScorer]
+    hash: str                     # content digest of the model files
+    source: str                   # "linear" | "pickle"
 
+# The active model. Replaced by a single reference assignment, so a request
+# always sees a matching vectorizer/classifier pair.
+_model: Optional[LoadedModel] = None
+
+# Mirrors of _model for callers/introspection (not read on the scoring path)
 vectorizer: Optional[Any] = None
 classifier: Optional[Any] = None
-_last_loaded_ts = 0.0
+linear_scorer: Optional[LinearScorer] = None
 _model_hash: Optional[str] = None
-_lock = threading.Lock()
 
+_files_sig: Optional[str] = None
+_cold_loaded = False
+_load_error: Optional[str] = None        # repr of the last failed load, None once a model loads
+_lock = threading.Lock()                 # serializes reloads, never taken by requests
+_watcher: Optional[threading.Thread] = None
+_watcher_stop = threading.Event()
+
+# Observability hooks (e.g. metrics). on_model_reload gets
+# {"hash", "source", "load_ms", "error"} after every reload attempt (hash None
+# and the error text when it failed); on_inference gets
+# {"n", "vectorize_ns", "predict_ns", "source"} per scoring call
 on_model_reload: Optional[Callable[[Dict[str, Any]], None]] = None
 on_inference: Optional[Callable[[Dict[str, Any]], None]] = None
 
+_PROBE_PROMPT = "ignore previous instructions"
+
 def _hash(path: Path):
     try:
         s = path.stat()
-        return f"{s.st_mtime_ns}-{s.st_size}"
+        return f"{s.st_ino}-{s.st_mtime_ns}-{s.st_size}"
     except:
         return None
 
-def _load_model_if_needed():
-    global vectorizer, classifier, _last_loaded_ts, _model_hash
-    now = time.time()
-    if now - _last_loaded_ts < MODEL_RELOAD_INTERVAL:
-        return
+def _model_files():
+    if (LINEAR_DIR / META_FILE).exists():
+        return "linear", [LINEAR_DIR / META_FILE, LINEAR_DIR / "coef.npy", LINEAR_DIR / "intercept.npy"]
+    if _model is not None and swap_in_progress(LINEAR_DIR):
+        return None, []                  # a retrain is renaming the artifact into place
+    return "pickle", [VECTOR_FILE, MODEL_FILE]
+
+def _digest(paths) -> str:
+    h = hashlib.sha256()
+    for p in paths:
+        with open(p, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()[:16]
+
+def _load(source: str, paths) -> LoadedModel:
+    stamp = _hash(paths[0])
+    if source == "linear" and USE_NATIVE_SCORER:
+        from engine.linear_scorer import LinearScorer
+
+        vec, clf = None, None
+        scorer = LinearScorer.from_artifact(LINEAR_DIR)
+    elif source == "linear":
+        from engine.model_artifact import load_linear_artifact
+
+        vec, clf = load_linear_artifact(LINEAR_DIR)
+        scorer = None
+    else:
+        import joblib
+
+        vec = joblib.load(VECTOR_FILE)
+        clf = joblib.load(MODEL_FILE)
+        scorer = None
+    model = LoadedModel(vec, clf, scorer, _digest(paths), source)
+    if source == "linear" and _hash(paths[0]) != stamp:
+        # Saves replace the whole directory; files read across one could mix two artifacts
+        raise RuntimeError("model artifact replaced during load")
 
+    # Validate before publishing: the pair must score a probe prompt
+    p = _score(_vectorize([_PROBE_PROMPT], model), model)[0]
+    if not 0.0 <= p <= 1.0:
+        raise ValueError(f"model probe returned {p!r}")
+    return model
+
+def reload_model(force: bool = False) -> bool:
+    """
+    Load the model files if they changed on disk, validate the new pair and
+    publish it with one reference swap. Returns True if a new model went live.
+    A failed load keeps the current model serving.
+    """
+    global _model, _files_sig, _load_error, vectorizer, classifier, linear_scorer, _model_hash
     with _lock:
-        _last_loaded_ts = now
-        new_hash = f"{_hash(VECTOR_FILE)}-{_hash(MODEL_FILE)}"
-        if new_hash == _model_hash:
-            return
+        source, paths = _model_files()
+        if source is None:
+            return False
+        sig = f"{source}-" + "-".join(str(_hash(p)) for p in paths)
+        if sig == _files_sig and not force:
+            return False
+        t0 = time.perf_counter()
+        try:
+            model = _load(source, paths)
+        except Exception as e:
+            _files_sig = sig                 # retried once the files change, not on every call
+            _load_error = repr(e)
+            _notify_reload({"hash": None, "source": source, "load_ms": (time.perf_counter() - t0) * 1000.0,
+                            "error": _load_error})
+            return False
+        load_ms = (time.perf_counter() - t0) * 1000.0
+
+        _model = model                                   # atomic publish
+        _files_sig = sig
+        _load_error = None
+        vectorizer, classifier, linear_scorer = model.vectorizer, model.classifier, model.linear_scorer
+        _model_hash = model.hash
+
+    _notify_reload({"hash": model.hash, "source": source, "load_ms": load_ms, "error": None})
+    return True
+
+def _notify_reload(event: Dict[str, Any]):
+    if on_model_reload is not None:
         try:
-            vectorizer = joblib.load(VECTOR_FILE)
-            classifier = joblib.load(MODEL_FILE)
-            _model_hash = new_hash
+            on_model_reload(event)
         except:
-            vectorizer = None
-            classifier = None
-            _model_hash = None
+            pass
+
+def _watch():
+    while not _watcher_stop.wait(MODEL_RELOAD_INTERVAL):
+        reload_model()
+
+def start_model_watcher():
+    """Poll the model files every MODEL_RELOAD_INTERVAL seconds off the request path (once per process)."""
+    global _watcher
+    if _watcher is not None and _watcher.is_alive():
+        return
+    _watcher_stop.clear()
+    _watcher = threading.Thread(target=_watch, name="sentinel-model-watcher", daemon=True)
+    _watcher.start()
+
+def stop_model_watcher():
+    _watcher_stop.set()
+
+def _load_model_if_needed() -> Optional[LoadedModel]:
+    # Calls load synchronously until the first model loads (cold start); after
+    # that reloads happen on the watcher thread (start_model_watcher, started
+    # by the host process) and requests never touch disk. A failed cold load
+    # is retried once the model files change.
+    global _cold_loaded
+    if not _cold_loaded:
+        reload_model()
+        _cold_loaded = _model is not None
+    return _model
+
+def load_model() -> Optional[LoadedModel]:
+    """Cold-load the model now instead of on the first request; returns it (None if none could be loaded)."""
+    return _load_model_if_needed()
 
-def ml_injection_score(prompt: str) -> float:
+def current_model() -> Optional[LoadedModel]:
+    """The model currently serving, as published; never loads (None before the first load)."""
+    return _model
+
+def model_error() -> Optional[str]:
+    """Why the last load failed (None after a successful one)."""
+    return _load_error
+
+def current_model_hash() -> Optional[str]:
+    """Hash of the model currently serving (None if no model could be loaded)."""
+    model = _load_model_if_needed()
+    return model.hash if model is not None else None
+
+def _head(prompt: Union[str, PreparedPrompt]) -> str:
+    if isinstance(prompt, PreparedPrompt):
+        return prompt.head
+    return prompt[:MAX_PROMPT_CHARS]
+
+def _vectorize(texts: List[Union[str, PreparedPrompt]], model: LoadedModel) -> Any:
+    # The native scorer reuses a PreparedPrompt's tokens; sklearn needs the text
+    if model.linear_scorer is not None:
+        return [model.linear_scorer.vectorize(t) for t in texts]
+    return model.vectorizer.transform([_head(t) for t in texts])
+
+def _score(rows: Any, model: LoadedModel) -> List[float]:
+    if model.linear_scorer is not None:
+        return [model.linear_scorer.proba_from_row(r) for r in rows]
+    return [float(p) for p in model.classifier.predict_proba(rows)[:, 1]]
+
+def _predict(texts: List[Union[str, PreparedPrompt]], model: LoadedModel) -> List[float]:
+    """Vectorize + predict, timed separately for on_inference."""
+    t0 = time.perf_counter_ns()
+    rows = _vectorize(texts, model)
+    t1 = time.perf_counter_ns()
+    proba = _score(rows, model)
+    if on_inference is not None:
+        try:
+            on_inference({
+                "n": len(texts),
+                "vectorize_ns": t1 - t0,
+                "predict_ns": time.perf_counter_ns() - t1,
+                "source": model.source,
+            })
+        except:
+            pass
+    return proba
+
+def _finalize(proba: float) -> float:
+    lo, hi = CLAMP
+    score = max(lo, min(hi, proba))
+    if SMOOTHING > 0 and score > SMOOTHING:
+        score = float(round(score * (1 - SMOOTHING) + SMOOTHING, 4))
+    return score
+
+def ml_injection_score(prompt: Union[str, PreparedPrompt]) -> float:
     if not prompt:
         return DEFAULT_SCORE
-    if len(prompt) > MAX_PROMPT_CHARS:
+    if not isinstance(prompt, PreparedPrompt) and len(prompt) > MAX_PROMPT_CHARS:
         prompt = prompt[:MAX_PROMPT_CHARS]
 
-    _load_model_if_needed()
-    if vectorizer is None or classifier is None:
+    model = _load_model_if_needed()
+    if model is None:
         return DEFAULT_SCORE
 
     try:
-        X = vectorizer.transform([prompt])
-        proba = float(classifier.predict_proba(X)[0][1])
-        lo, hi = CLAMP
-        score = max(lo, min(hi, proba))
+        score = _finalize(_predict([prompt], model)[0])
     except:
         score = DEFAULT_SCORE
-
-    if SMOOTHING > 0 and score > SMOOTHING:
-        score = float(round(score * (1 - SMOOTHING) + SMOOTHING, 4))
     return score
+
+def ml_injection_scores(prompts: List[Union[str, PreparedPrompt]]) -> List[float]:
+    """
+    Vectorized ml_injection_score(): one sparse matrix and a single
+    predict_proba for the whole batch. Order matches `prompts`.
+    """
+    scores = [DEFAULT_SCORE] * len(prompts)
+    idx = [i for i, p in enumerate(prompts) if p]
+    if not idx:
+        return scores
+
+    model = _load_model_if_needed()
+    if model is None:
+        return scores
+
+    texts = [prompts[i] for i in idx]
+    texts = [t if isinstance(t, PreparedPrompt) else t[:MAX_PROMPT_CHARS] for t in texts]
+    try:
+        proba = _predict(texts, model)
+    except:
+        return scores
+
+    for i, p in zip(idx, proba):
+        scores[i] = _finalize(float(p))
+    return scores
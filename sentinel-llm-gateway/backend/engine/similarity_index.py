@@ -0,0 +1,529 @@
+"""
+Sentinel Similarity Index
+Near-duplicate lookup of prompts against a corpus of known ones (MinHash + LSH).
+
+Most attacks are lightly edited copies of known jailbreaks: a word swapped,
+a clause added, different punctuation. Regexes miss the paraphrase, and the
+ML model costs the same for every prompt. This index answers "which known
+prompt is this closest to, and how close" in tens of microseconds:
+
+    • normalize — lowercase; runs of non-word characters → one space
+    • shingles  — every SHINGLE_BYTES-byte window of the UTF-8 text, hashed
+                  with a vectorized rolling hash
+    • MinHash   — NUM_PERM minimums of multiply-shift hashes of the shingles;
+                  the share of equal minimums estimates Jaccard similarity
+    • LSH       — the signature cut into BANDS bands of ROWS values, each
+                  hashed to one 64-bit key; entries sharing any band key with
+                  the prompt are the candidates, found by binary search in one
+                  sorted array (a pair at Jaccard s collides with probability
+                  1 − (1 − s^ROWS)^BANDS: ~0.3 at s = 0.4, > 0.99 at s = 0.6)
+
+Only candidates are compared, so the cost does not grow with the corpus.
+Entries are labelled "attack" (known jailbreaks) or "benign" (known-good
+prompts, e.g. templated traffic), so a match can end the pipeline either way.
+
+On disk (`write_index`, `sentinel_similarity.py build`) the arrays are plain
+`.npy` files opened with mmap_mode="r", like the model artifact, so every
+worker on a host shares one page-cache copy:
+
+    models/similarity/
+        meta.json         format, MinHash parameters, entry count, version
+        signatures.npy    (n, NUM_PERM) uint32
+        band_keys.npy     (n · BANDS,) uint64, sorted
+        band_ids.npy      (n · BANDS,) uint32, entry of each key
+        labels.npy        (n,) uint8, index into LABELS
+        text_offsets.npy  (n + 1,) int64
+        texts.npy         UTF-8 text of the entries, concatenated
+
+Confirmed attacks are inserted without a rebuild: `add()` appends a line to
+a journal (JSONL next to the directory) and every process holding the index
+reads new journal lines at most JOURNAL_POLL_S later. `compact()` folds the
+journal into a new directory, swapped in by rename; processes that have the
+old one mapped keep serving from it until their next poll. `remove()`
+journals a removal the same way: the entry stops matching everywhere within
+JOURNAL_POLL_S and is dropped for good by the next `compact()`.
+"""
+
+from __future__ import annotations
+
+import fcntl
+import hashlib
+import json
+import os
+import re
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, NamedTuple, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+
+from engine.prepared_prompt import MAX_PROMPT_CHARS, PreparedPrompt
+
+__all__ = [
+    "LABELS",
+    "SIMILARITY_INDEX_DIR",
+    "Match",
+    "minhash",
+    "snippet",
+    "journal_path",
+    "write_index",
+    "SimilarityIndex",
+    "open_index",
+]
+
+# ========================= CONFIG CONSTANTS ========================= #
+
+INDEX_FORMAT = "sentinel-minhash-v1"
+META_FILE = "meta.json"
+SIMILARITY_INDEX_DIR = Path(__file__).resolve().parent.parent / "models" / "similarity"
+
+LABELS = ("attack", "benign")
+
+NUM_PERM = 128                 # MinHash values per signature
+BANDS = 32                     # LSH bands of ROWS values each
+ROWS = NUM_PERM // BANDS       # 4: a band is two uint64 words (see _band_keys)
+SHINGLE_BYTES = 5
+SEED = 20240611                # hash parameters; part of the on-disk format
+
+MAX_BUCKET = 64                # candidates taken from one band bucket
+JOURNAL_POLL_S = 1.0           # seconds between checks of the journal / directory
+SNIPPET_CHARS = 80
+
+_U64 = np.uint64
+_P = _U64(0x100000001B3)
+_rng = np.random.default_rng(SEED)
+_A = _rng.integers(0, 2**64, NUM_PERM, dtype=np.uint64, endpoint=False) | _U64(1)   # odd multipliers
+_B = _rng.integers(0, 2**64, NUM_PERM, dtype=np.uint64, endpoint=False)
+_BAND_SALT = _rng.integers(0, 2**64, BANDS, dtype=np.uint64, endpoint=False)
+_CHUNK = 2048                  # shingles per MinHash block; bounds the (NUM_PERM, chunk) temporary
+
+_NON_WORD = re.compile(r"[\W_]+")
+
+
+# ========================= MINHASH ========================= #
+
+def _mix(x: np.ndarray) -> np.ndarray:
+    # splitmix64 finalizer; uint64 arithmetic wraps
+    x = x ^ (x >> _U64(30))
+    x = x * _U64(0xBF58476D1CE4E5B9)
+    x = x ^ (x >> _U64(27))
+    x = x * _U64(0x94D049BB133111EB)
+    return x ^ (x >> _U64(31))
+
+
+def normalize(text: str) -> str:
+    return _NON_WORD.sub(" ", text.lower()).strip()
+
+
+def _shingles(norm: str) -> np.ndarray:
+    """Rolling hash of every SHINGLE_BYTES-byte window (the whole text if shorter)."""
+    b = np.frombuffer(norm.encode("utf-8"), dtype=np.uint8).astype(np.uint64)
+    width = min(SHINGLE_BYTES, len(b))
+    n = len(b) - width + 1
+    h = b[:n].copy()
+    for j in range(1, width):
+        h *= _P
+        h += b[j:j + n]
+    return h
+
+
+def minhash(prompt: Union[str, PreparedPrompt]) -> Optional[np.ndarray]:
+    """(NUM_PERM,) uint32 signature of the normalized prompt; None if nothing is left of it."""
+    if isinstance(prompt, PreparedPrompt):
+        norm = _NON_WORD.sub(" ", prompt.head_lower).strip()
+    else:
+        norm = normalize(prompt[:MAX_PROMPT_CHARS])
+    if not norm:
+        return None
+    h = _shingles(norm)
+    lowest = np.full(NUM_PERM, np.iinfo(np.uint64).max, dtype=np.uint64)
+    for i in range(0, len(h), _CHUNK):
+        block = np.multiply.outer(_A, h[i:i + _CHUNK])
+        block += _B[:, None]
+        np.minimum(lowest, block.min(axis=1), out=lowest)
+    return (lowest >> _U64(32)).astype(np.uint32)
+
+
+def _band_keys(signatures: np.ndarray) -> np.ndarray:
+    """(n, BANDS) uint64 LSH keys of (n, NUM_PERM) signatures; the band number is part of the key."""
+    # A band's ROWS = 4 uint32 values, read as two uint64 words
+    words = np.ascontiguousarray(signatures, dtype=np.uint32).view(np.uint64).reshape(len(signatures), BANDS, 2)
+    keys = words[:, :, 0] * _P
+    keys ^= words[:, :, 1]
+    keys += _BAND_SALT
+    return _mix(keys)
+
+
+# ========================= ON DISK ========================= #
+
+def _save(directory: Path, name: str, array: np.ndarray) -> None:
+    np.save(directory / name, np.ascontiguousarray(array))
+
+
+def write_index(
+    directory: Path, signatures: Sequence[np.ndarray], labels: Sequence[int], texts: List[str]
+) -> Dict[str, Any]:
+    """
+    Write entries (signatures from `minhash`, label numbers, texts) as an
+    index directory and return its meta. Built next to `directory` and
+    renamed over it, so a reader opens either the old index or the new one.
+    """
+    directory = Path(directory)
+    n = len(signatures)
+    signatures = np.asarray(signatures, dtype=np.uint32).reshape(n, NUM_PERM)
+    labels = np.asarray(labels, dtype=np.uint8)
+
+    keys = _band_keys(signatures).reshape(-1)
+    order = np.argsort(keys, kind="stable")
+    encoded = [t.encode("utf-8") for t in texts]
+    offsets = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum([len(e) for e in encoded], out=offsets[1:])
+    blob = np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+    digest = hashlib.sha256(signatures.tobytes())
+    digest.update(labels.tobytes())
+    meta = {
+        "format": INDEX_FORMAT,
+        "num_perm": NUM_PERM,
+        "bands": BANDS,
+        "shingle_bytes": SHINGLE_BYTES,
+        "seed": SEED,
+        "entries": n,
+        "labels": {label: int((labels == i).sum()) for i, label in enumerate(LABELS)},
+        "version": digest.hexdigest()[:16],
+    }
+
+    tmp = directory.with_name(directory.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    _save(tmp, "signatures.npy", signatures)
+    _save(tmp, "band_keys.npy", keys[order])
+    _save(tmp, "band_ids.npy", np.repeat(np.arange(n, dtype=np.uint32), BANDS)[order])
+    _save(tmp, "labels.npy", labels)
+    _save(tmp, "text_offsets.npy", offsets)
+    _save(tmp, "texts.npy", blob)
+    # meta.json last: its presence marks a complete index
+    (tmp / META_FILE).write_text(json.dumps(meta, indent=2))
+
+    if directory.exists():
+        old = directory.with_name(directory.name + ".old")
+        shutil.rmtree(old, ignore_errors=True)
+        os.rename(directory, old)
+        os.rename(tmp, directory)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.rename(tmp, directory)
+    return meta
+
+
+def journal_path(directory: Path) -> Path:
+    return directory.with_name(directory.name + ".journal.jsonl")
+
+
+def _stamp(path: Path) -> Optional[Tuple[int, int]]:
+    try:
+        st = path.stat()
+    except FileNotFoundError:
+        return None
+    return st.st_ino, st.st_mtime_ns
+
+
+class _Base(NamedTuple):
+    """The memory-mapped part of an index; replaced whole on reopen."""
+    count: int
+    version: str
+    signatures: np.ndarray
+    keys: np.ndarray
+    ids: np.ndarray
+    labels: np.ndarray
+    offsets: np.ndarray
+    texts: np.ndarray
+    stamp: Optional[Tuple[int, int]]
+
+
+def _open_base(directory: Path) -> _Base:
+    stamp = _stamp(directory / META_FILE)
+    if stamp is None:
+        # No index built yet: start empty, the journal can still fill it
+        empty = np.zeros(0, dtype=np.uint64)
+        return _Base(0, "empty", np.zeros((0, NUM_PERM), dtype=np.uint32), empty,
+                     np.zeros(0, dtype=np.uint32), np.zeros(0, dtype=np.uint8),
+                     np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.uint8), None)
+    meta = json.loads((directory / META_FILE).read_text())
+    if meta.get("format") != INDEX_FORMAT:
+        raise ValueError(f"Unsupported similarity index format: {meta.get('format')!r}")
+    params = (meta.get("num_perm"), meta.get("bands"), meta.get("shingle_bytes"), meta.get("seed"))
+    if params != (NUM_PERM, BANDS, SHINGLE_BYTES, SEED):
+        raise ValueError(f"{directory}: built with MinHash parameters {params}; rebuild it "
+                         f"(`sentinel_similarity.py build`)")
+
+    def load(name: str) -> np.ndarray:
+        # Plain ndarray views of the mapping: slicing a np.memmap costs several times more
+        return np.asarray(np.load(directory / name, mmap_mode="r"))
+
+    return _Base(int(meta["entries"]), meta["version"], load("signatures.npy"), load("band_keys.npy"),
+                 load("band_ids.npy"), load("labels.npy"), load("text_offsets.npy"), load("texts.npy"), stamp)
+
+
+# ========================= INDEX ========================= #
+
+class Match(NamedTuple):
+    id: int
+    similarity: float              # estimated Jaccard similarity of the shingle sets
+    label: str
+    text: str
+
+    @property
+    def excerpt(self) -> str:
+        return snippet(self.text)
+
+
+class _Journal:
+    """Entries added since the directory was built; appended to in place."""
+    __slots__ = ("signatures", "labels", "texts", "buckets", "removed", "offset")
+
+    def __init__(self):
+        self.signatures: List[np.ndarray] = []
+        self.labels: List[int] = []
+        self.texts: List[str] = []
+        self.buckets: Dict[int, List[int]] = {}
+        self.removed: Set[int] = set()   # entry ids (base or journal) no longer served
+        self.offset = 0                  # bytes of the journal file read so far
+
+
+class SimilarityIndex:
+    def __init__(
+        self,
+        directory: Path = SIMILARITY_INDEX_DIR,
+        journal: Optional[Path] = None,
+        poll_s: float = JOURNAL_POLL_S,
+    ):
+        self.directory = Path(directory)
+        self.journal = Path(journal) if journal is not None else journal_path(self.directory)
+        self.poll_s = poll_s
+        self.queries = 0
+        self.matches = 0
+        self.reopens = 0
+        self._lock = threading.Lock()
+        self._next_poll = 0.0
+        self._base = _open_base(self.directory)
+        self._added = _Journal()
+        self.refresh(force=True)
+
+    def __reduce__(self):
+        # Process-pool workers reopen (and share) the mapping instead of copying the arrays
+        return open_index, (str(self.directory), str(self.journal))
+
+    @property
+    def version(self) -> str:
+        base, added = self._base, self._added
+        version = base.version
+        if added.texts:
+            version += f"+{len(added.texts)}"
+        if added.removed:
+            version += f"-{len(added.removed)}"
+        return version
+
+    def __len__(self) -> int:
+        return self._base.count + len(self._added.texts) - len(self._added.removed)
+
+    # ---------------- journal ----------------
+
+    def refresh(self, force: bool = False) -> None:
+        """Pick up a rebuilt directory and new journal lines; at most every poll_s unless forced."""
+        now = time.monotonic()
+        if not force and now < self._next_poll:
+            return
+        if not self._lock.acquire(blocking=force):
+            return                                   # another thread is refreshing
+        try:
+            self._next_poll = now + self.poll_s
+            try:
+                size = self.journal.stat().st_size
+            except FileNotFoundError:
+                size = 0
+            if _stamp(self.directory / META_FILE) != self._base.stamp or size < self._added.offset:
+                # Rebuilt or compacted: the journal lines folded in are gone from the file
+                self._base = _open_base(self.directory)
+                self._added = _Journal()
+                self.reopens += 1
+            if size > self._added.offset:
+                self._read_journal(self._added, size)
+        finally:
+            self._lock.release()
+
+    def _read_journal(self, added: _Journal, size: int) -> None:
+        with open(self.journal, "rb") as f:
+            f.seek(added.offset)
+            data = f.read(size - added.offset)
+        end = data.rfind(b"\n") + 1                  # a line still being written is read next time
+        for line in data[:end].splitlines():
+            try:
+                entry = json.loads(line)
+                if isinstance(entry, dict) and "remove" in entry:
+                    # Ids are only meaningful for the base they were numbered against
+                    if entry.get("version") == self._base.version:
+                        added.removed.add(int(entry["remove"]))
+                    continue
+                text, label = entry["text"], entry.get("label", "attack")
+            except (ValueError, KeyError, TypeError):
+                continue
+            if isinstance(text, str) and label in LABELS:
+                self._insert(added, text, label)
+        added.offset += end
+
+    def _insert(self, added: _Journal, text: str, label: str) -> None:
+        sig = minhash(text)
+        if sig is None:
+            return
+        i = self._base.count + len(added.texts)
+        # Signature first: a concurrent lookup may see the bucket entry right after
+        added.signatures.append(sig)
+        added.labels.append(LABELS.index(label))
+        added.texts.append(text[:MAX_PROMPT_CHARS])
+        for key in _band_keys(sig[None])[0].tolist():
+            added.buckets.setdefault(key, []).append(i)
+
+    def add(self, text: str, label: str = "attack") -> None:
+        """Append an entry to the journal; live here at once, in other processes within poll_s."""
+        if label not in LABELS:
+            raise ValueError(f"Unknown label {label!r}; expected one of {LABELS}")
+        self._append({"text": text, "label": label})
+
+    def remove(self, entry_id: int) -> None:
+        """
+        Journal the removal of entry `entry_id` (the id `query` reports). Ids
+        are renumbered by `compact()`; a removal journaled against an index
+        that has since been compacted is ignored.
+        """
+        self.refresh(force=True)
+        base, added = self._base, self._added
+        if not 0 <= entry_id < base.count + len(added.texts) or entry_id in added.removed:
+            raise KeyError(f"No similarity index entry #{entry_id}")
+        self._append({"remove": entry_id, "version": base.version})
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        line = (json.dumps(entry) + "\n").encode("utf-8")
+        self.journal.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.journal, "ab") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)                # serializes with compact()
+            f.write(line)
+        self.refresh(force=True)
+
+    def compact(self) -> Dict[str, Any]:
+        """Fold the journal into a rebuilt directory and empty it; returns the new meta."""
+        self.journal.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.journal, "a+b") as f:
+            fcntl.flock(f, fcntl.LOCK_EX)
+            base, added = _open_base(self.directory), _Journal()
+            self._base = base
+            self._read_journal(added, os.fstat(f.fileno()).st_size)
+            signatures = np.concatenate([base.signatures, np.asarray(added.signatures, dtype=np.uint32)
+                                         .reshape(-1, NUM_PERM)])
+            labels = np.concatenate([base.labels, np.asarray(added.labels, dtype=np.uint8)])
+            texts = [self._base_text(base, i) for i in range(base.count)] + added.texts
+            if added.removed:
+                keep = np.setdiff1d(np.arange(len(texts)), np.fromiter(added.removed, dtype=np.int64))
+                signatures, labels, texts = signatures[keep], labels[keep], [texts[i] for i in keep]
+            meta = write_index(self.directory, signatures, labels, texts)
+            f.truncate(0)
+        self.refresh(force=True)
+        return meta
+
+    # ---------------- lookup ----------------
+
+    @staticmethod
+    def _base_text(base: _Base, i: int) -> str:
+        return bytes(base.texts[base.offsets[i]:base.offsets[i + 1]]).decode("utf-8")
+
+    def nearest(self, sig: np.ndarray) -> Optional[Match]:
+        """Closest entry sharing an LSH band with signature `sig`, or None."""
+        base, added = self._base, self._added
+        keys = _band_keys(sig[None])[0]
+        best_id, best_equal = -1, -1
+
+        if base.count:
+            lo = np.searchsorted(base.keys, keys, "left")
+            hi = np.searchsorted(base.keys, keys, "right")
+            hit = np.flatnonzero(hi > lo)
+            if len(hit):
+                # Every bucket slice at once; repeats (an entry in several bands) are harmless for argmax
+                sizes = np.minimum(hi[hit] - lo[hit], MAX_BUCKET)
+                starts = np.repeat(lo[hit] - np.cumsum(sizes) + sizes, sizes)
+                ids = base.ids[starts + np.arange(len(starts))]
+                if added.removed:
+                    ids = ids[~np.isin(ids, np.fromiter(added.removed, dtype=np.int64))]
+                if len(ids):
+                    equal = np.count_nonzero(base.signatures[ids] == sig, axis=1)
+                    j = int(equal.argmax())
+                    best_id, best_equal = int(ids[j]), int(equal[j])
+
+        if added.buckets:
+            candidates = {i for key in keys.tolist() for i in added.buckets.get(key, ())}
+            for i in candidates - added.removed:
+                equal = int(np.count_nonzero(added.signatures[i - base.count] == sig))
+                if equal > best_equal:
+                    best_id, best_equal = i, equal
+
+        if best_id < 0:
+            return None
+        if best_id < base.count:
+            label, text = LABELS[base.labels[best_id]], self._base_text(base, best_id)
+        else:
+            label, text = LABELS[added.labels[best_id - base.count]], added.texts[best_id - base.count]
+        return Match(best_id, best_equal / NUM_PERM, label, text)
+
+    def query(self, prompt: Union[str, PreparedPrompt]) -> Optional[Match]:
+        """Nearest known prompt to `prompt` and its similarity; None if no entry is a candidate."""
+        self.refresh()
+        self.queries += 1
+        sig = minhash(prompt)
+        match = self.nearest(sig) if sig is not None else None
+        if match is not None:
+            self.matches += 1
+        return match
+
+    def stats(self) -> Dict[str, Any]:
+        base, added = self._base, self._added
+        counts = np.bincount(np.asarray(base.labels), minlength=len(LABELS)).tolist()
+        for label in added.labels:
+            counts[label] += 1
+        for i in added.removed:
+            counts[base.labels[i] if i < base.count else added.labels[i - base.count]] -= 1
+        return {
+            "directory": str(self.directory),
+            "version": self.version,
+            "entries": base.count + len(added.texts) - len(added.removed),
+            "journal_entries": len(added.texts),
+            "journal_removals": len(added.removed),
+            "labels": dict(zip(LABELS, counts)),
+            "num_perm": NUM_PERM,
+            "bands": BANDS,
+            "queries": self.queries,
+            "candidates_found": self.matches,
+            "reopens": self.reopens,
+        }
+
+
+def snippet(text: str) -> str:
+    text = " ".join(text.split())
+    return text if len(text) <= SNIPPET_CHARS else text[:SNIPPET_CHARS - 1] + "…"
+
+
+# One instance per (directory, journal) and process: pickled pipelines resolve to it
+_OPEN: Dict[Tuple[str, str], SimilarityIndex] = {}
+_OPEN_LOCK = threading.Lock()
+
+
+def open_index(
+    directory: Union[str, Path] = SIMILARITY_INDEX_DIR, journal: Union[str, Path, None] = None
+) -> SimilarityIndex:
+    directory = Path(directory)
+    journal = Path(journal) if journal is not None else journal_path(directory)
+    with _OPEN_LOCK:
+        key = (str(directory), str(journal))
+        if key not in _OPEN:
+            _OPEN[key] = SimilarityIndex(directory, journal)
+        return _OPEN[key]
@@ -0,0 +1,128 @@
+"""
+Sentinel Window Scanner
+Constant-memory scanning of inputs larger than MAX_PROMPT_CHARS.
+
+Heuristics and ML only look at the first MAX_PROMPT_CHARS of a prompt. For
+long documents the text is instead cut into overlapping windows as it
+streams in:
+
+    window k = text[k·stride : k·stride + window],  stride = window − overlap
+
+Any match of at most `overlap + 1` characters lies entirely inside some
+window, so patterns that straddle a window boundary are still caught; longer
+matches (e.g. `.*` spanning far) may only be seen in part.
+
+    • Windower    — chunk feed → (offset, window) pairs; holds < window + chunk
+    • WindowScan  — folds per-window verdicts into one score with `max` or
+                    `topk_mean` aggregation (top-k kept in a heap) and signals
+                    early exit once any window reaches the block threshold
+"""
+
+from __future__ import annotations
+
+import heapq
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from engine.prepared_prompt import MAX_PROMPT_CHARS
+
+__all__ = [
+    "AGGREGATIONS",
+    "Windower",
+    "WindowScan",
+]
+
+AGGREGATIONS = ("max", "topk_mean")
+
+# (offset, window text)
+Window = Tuple[int, str]
+
+
+class Windower:
+    def __init__(self, window: int = MAX_PROMPT_CHARS, overlap: int = 512):
+        if not 0 <= overlap < window:
+            raise ValueError("overlap must be in [0, window)")
+        self.window = window
+        self.overlap = overlap
+        self.stride = window - overlap
+        self.chars = 0              # characters fed so far
+        self._buf = ""
+        self._buf_start = 0
+        self._emitted = False
+
+    def feed(self, chunk: str) -> List[Window]:
+        """Append text; return every window that is now complete."""
+        out: List[Window] = []
+        # Large chunks are taken a window at a time so the buffer stays bounded
+        for i in range(0, len(chunk), self.window):
+            self._buf += chunk[i:i + self.window]
+            while len(self._buf) >= self.window:
+                out.append((self._buf_start, self._buf[:self.window]))
+                self._emitted = True
+                self._buf = self._buf[self.stride:]
+                self._buf_start += self.stride
+        self.chars += len(chunk)
+        return out
+
+    def finish(self) -> List[Window]:
+        """The final partial window, if it holds text no window has covered yet."""
+        buf, self._buf = self._buf, ""
+        if buf and (not self._emitted or len(buf) > self.overlap):
+            return [(self._buf_start, buf)]
+        return []
+
+
+class WindowScan:
+    def __init__(
+        self,
+        aggregation: str = "max",
+        top_k: int = 3,
+        block_threshold: float = 0.8,
+        keep: int = 5,
+    ):
+        if aggregation not in AGGREGATIONS:
+            raise ValueError(f"Unknown aggregation {aggregation!r}; expected one of {AGGREGATIONS}")
+        self.aggregation = aggregation
+        self.top_k = top_k if aggregation == "topk_mean" else 1
+        self.block_threshold = block_threshold
+        self.keep = max(keep, self.top_k)
+        self.windows = 0
+        self.blocked = False
+        # Min-heap of the highest-risk windows: (risk, start, end)
+        self._top: List[Tuple[float, int, int]] = []
+        self._reasons: Dict[str, None] = {}
+
+    def add(self, start: int, end: int, risk: float, reasons: Sequence[str]) -> bool:
+        """Record one window; True once the scan can stop (a window blocks)."""
+        self.windows += 1
+        for r in reasons:
+            self._reasons.setdefault(r)
+        item = (risk, start, end)
+        if len(self._top) < self.keep:
+            heapq.heappush(self._top, item)
+        elif item > self._top[0]:
+            heapq.heapreplace(self._top, item)
+        if risk >= self.block_threshold:
+            self.blocked = True
+        return self.blocked
+
+    @property
+    def reasons(self) -> List[str]:
+        return list(self._reasons)
+
+    @property
+    def max_score(self) -> float:
+        return max(self._top)[0] if self._top else 0.0
+
+    @property
+    def risk_score(self) -> float:
+        if not self._top:
+            return 0.0
+        top = heapq.nlargest(self.top_k, self._top)
+        return sum(t[0] for t in top) / len(top)
+
+    def flagged(self, n: Optional[int] = None) -> List[Dict[str, Any]]:
+        """Highest-risk windows, most risky first."""
+        return [
+            {"start": s, "end": e, "risk_score": r}
+            for r, s, e in heapq.nlargest(n or self.keep, self._top)
+        ]
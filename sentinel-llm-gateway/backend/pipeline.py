@@ -0,0 +1,488 @@
+"""
+Sentinel Detection Pipeline
+Tiered moderation pipeline used by the gateway.
+
+Stages, cheapest first:
+    • heuristics — the gateway's precompiled rule patterns plus the weighted
+                   engine in `engine/sentinel_heuristics.py`
+    • similarity — (optional) nearest known prompt in the MinHash/LSH index
+                   of `engine/similarity_index.py`
+    • ml         — learning-module risk score
+    • sanitizer  — rewrite of prompts that are risky but not blocked
+
+Each stage can end the pipeline early:
+    • heuristic_block — (opt-in) heuristic score ≥ `heuristic_block` → block without ML
+    • similar_attack  — a known attack at similarity ≥ `similarity_block` → block without ML
+    • similar_benign  — a known-benign prompt at similarity ≥ `similarity_allow`,
+                        no rule hit and heuristic score under the safe
+                        threshold → allow without ML
+    • clean           — (opt-in) no rule and no heuristic signal → allow without ML
+    • degraded        — pipelines built with ml=False (the gateway's overload
+                        mode) never run ML; the heuristic score is the risk
+    • the sanitizer only runs when the verdict can actually be SANITIZE
+
+Model output is screened while it streams by engine/output_scanner.py with
+the same secret patterns, heuristic rules and keywords (`output_rules`).
+
+Conversations are moderated turn by turn (`run_turns`): each new turn is
+also checked at its seam with the tail of the earlier turns, so a rule
+phrase split across two turns is still reported.
+
+All stages read one PreparedPrompt (engine/prepared_prompt.py), so the
+prompt is truncated, lowercased and tokenized once per request.
+
+Results carry per-stage timings (None = stage skipped) so they can be
+aggregated by `PipelineStats` in the serving process, whichever executor
+actually ran the stages.
+"""
+
+from __future__ import annotations
+
+import re
+import time
+from typing import TYPE_CHECKING, Any, Callable, Dict, List, NamedTuple, Optional, Sequence, Tuple, Union
+
+from engine import sentinel_heuristics
+from engine.compiled_sanitizer import CompiledSanitizer, SanitizeResult
+from engine.output_scanner import OutputRule
+from engine.prepared_prompt import PreparedPrompt, prepare
+from engine.sentinel_ml_detector import ml_injection_score, ml_injection_scores
+if TYPE_CHECKING:
+    from engine.similarity_index import SimilarityIndex  # numpy; only loaded when an index is configured
+
+__all__ = [
+    "STAGES",
+    "INJECTION_PATTERNS",
+    "SECRET_PATTERNS",
+    "DATA_EXFIL_PATTERNS",
+    "UNSANITIZABLE_MARKER",
+    "detect_rule_violations",
+    "sanitize_prompt",
+    "sanitize_with_spans",
+    "SEAM_CHARS",
+    "extend_carry",
+    "output_rules",
+    "Screen",
+    "PipelineResult",
+    "verdict_status",
+    "DetectionPipeline",
+    "PipelineStats",
+]
+
+STAGES = ("heuristics", "similarity", "ml", "sanitizer")
+
+
+# ========================= DETECTION RULES ========================= #
+
+INJECTION_PATTERNS = [
+    r"(?i)\bignore (all )?(previous|prior) (instructions|rules|content)\b",
+    r"(?i)\boverride (all )?(previous|prior) (instructions|rules)\b",
+    r"(?i)\breveal (your )?(system|hidden|initial) prompt\b",
+    r"(?i)\bshow (me )?(the )?(system|hidden|initial) prompt\b",
+    r"(?i)\b(jailbreak|unfiltered mode|no restrictions)\b",
+    r"(?i)\bprompt injection\b",
+    r"(?i)\bpretend to be\b.*?(developer mode|DAN)\b",
+    r"(?i)\bbypass (safety|filter|guardrails|restrictions?)\b",
+]
+
+SECRET_PATTERNS = [
+    r"(?i)\bpassword\b",
+    r"(?i)\bapi[\s\-_]?key\b",
+    r"(?i)\bsecret[\s\-_]?key\b",
+    r"(?i)\baccess[\s\-_]?token\b",
+    r"(?i)\bprivate[\s\-_]?key\b",
+]
+
+DATA_EXFIL_PATTERNS = [
+    r"(?i)\bdump\b.*\bdatabase\b",
+    r"(?i)\bextract\b.*\bsecrets?\b",
+    r"(?i)\bdump\b.*\bmemory\b",
+]
+
+# (compiled pattern, reason) — compiled once instead of a re-cache lookup per call
+_RULES: List[Tuple[re.Pattern, str]] = (
+    [(re.compile(p), f"Matched injection pattern: {p}") for p in INJECTION_PATTERNS]
+    + [(re.compile(p), f"Matched secret pattern: {p}") for p in SECRET_PATTERNS]
+    + [(re.compile(p), f"Matched data-exfil pattern: {p}") for p in DATA_EXFIL_PATTERNS]
+)
+
+
+def detect_rule_violations(prompt: Union[str, PreparedPrompt]) -> List[str]:
+    pp = prepare(prompt)
+    text = pp.text
+    reasons = [reason for pattern, reason in _RULES if pattern.search(text)]
+
+    # Simple heuristic: very long + lots of instructions
+    if len(text) > 2000 and "ignore" in pp.lower:
+        reasons.append("Heuristic: long prompt with override instruction.")
+
+    return reasons
+
+
+# ========================= SANITIZER ========================= #
+
+UNSANITIZABLE_MARKER = "__UNSANITIZABLE__"
+
+# Explicit jailbreak / override instructions: a line containing any is dropped
+_DROP_MARKERS = (
+    "ignore previous", "reveal system prompt",
+    "jailbreak", "developer mode",
+    "bypass safety", "no restrictions",
+)
+
+# Secrets: (pattern, replacement token), case-insensitive
+_REDACTIONS = (
+    (r"password", "[REDACTED_PASSWORD]"),
+    (r"api[\s\-_]?key", "[REDACTED_API_KEY]"),
+    (r"secret[\s\-_]?key", "[REDACTED_SECRET_KEY]"),
+    (r"access[\s\-_]?token", "[REDACTED_TOKEN]"),
+    (r"private[\s\-_]?key", "[REDACTED_PRIVATE_KEY]"),
+)
+
+_SANITIZER = CompiledSanitizer(_DROP_MARKERS, _REDACTIONS, flags=re.IGNORECASE)
+
+
+def sanitize_prompt(prompt: Union[str, PreparedPrompt]) -> str:
+    """
+    Very simple sanitizer:
+    - Drops lines with obvious jailbreak instructions
+    - Redacts secrets
+    - If nothing usable left → UNSANITIZABLE_MARKER
+    """
+    cleaned = _SANITIZER.sanitize(prompt).text
+
+    if not cleaned:
+        return UNSANITIZABLE_MARKER
+
+    return cleaned
+
+
+def sanitize_with_spans(prompt: Union[str, PreparedPrompt]) -> SanitizeResult:
+    """sanitize_prompt() plus the redacted and dropped spans of the original prompt."""
+    result = _SANITIZER.sanitize(prompt, spans=True)
+    if not result.text:
+        return result._replace(text=UNSANITIZABLE_MARKER)
+    return result
+
+
+# ========================= OUTPUT RULES ========================= #
+
+def output_rules(rule_action: str = "cut", keyword_action: str = "flag") -> List[OutputRule]:
+    """
+    Rules for streamed model output, in priority order: secrets are redacted
+    with the sanitizer's tokens; heuristic regex rules and keywords get
+    `rule_action` / `keyword_action`. Built from the rule set active now;
+    rebuild after a rules reload.
+    """
+    active = sentinel_heuristics.current_rules()
+    rules = [
+        OutputRule(p, "secret", f"Secret in output: {p}", "redact", token)
+        for p, (_, token) in zip(SECRET_PATTERNS, _REDACTIONS)
+    ]
+    rules += [
+        OutputRule(r.pattern, "rule", r.description, rule_action)
+        for r in active.regex_rules
+    ]
+    rules += [
+        OutputRule(f"(?i){re.escape(kw)}", "keyword", f"Keyword in output: {kw}", keyword_action)
+        for kw in active.keywords
+    ]
+    return rules
+
+
+# ========================= CONVERSATION SEAMS ========================= #
+
+# Trailing characters of earlier turns kept to catch rule phrases that
+# straddle a turn boundary; phrases longer than this are only seen in part
+SEAM_CHARS = 256
+
+
+def extend_carry(carry: str, text: str, chars: int = SEAM_CHARS) -> str:
+    """Last `chars` characters of `carry` and `text` joined by a space."""
+    tail = text[-chars:]
+    return f"{carry} {tail}"[-chars:] if carry else tail
+
+
+def _cross_turn_reasons(carry: str, head: str, seen: List[str]) -> List[str]:
+    """Rule hits on `carry + head` that neither side produces on its own."""
+    known = set(seen)
+    known.update(detect_rule_violations(carry))
+    known.update(detect_rule_violations(head))
+    return [
+        f"Cross-turn: {r}"
+        for r in detect_rule_violations(f"{carry} {head}")
+        if r not in known
+    ]
+
+
+# ========================= RESULTS ========================= #
+
+class Screen(NamedTuple):
+    """Output of the heuristics and similarity stages."""
+    reasons: List[str]
+    heuristic_score: float
+    exit: Optional[str]              # short-circuit rule that fired, if any
+    risk_score: Optional[float]      # final risk when `exit` is set
+    ns: int
+    rules_version: Optional[str] = None
+    similarity_ns: Optional[int] = None  # None → no index, or heuristics already decided
+
+
+class PipelineResult(NamedTuple):
+    # Small enough to pickle cheaply back from a process-pool worker
+    reasons: List[str]
+    risk_score: float
+    safe: Optional[str]              # sanitized prompt, if one was needed
+    exit: Optional[str]
+    timings: Tuple[Optional[int], ...]   # ns per STAGES entry; None → skipped
+    rules_version: Optional[str] = None  # heuristic RuleSet the verdict was made with
+
+
+def verdict_status(
+    reasons: List[str], risk_score: float, safe: Optional[str], safe_threshold: float, block_threshold: float
+) -> str:
+    """
+    allow | sanitize | block for an analysis under one threshold pair, as the
+    gateway decides it. `safe` is the sanitized prompt, if one was produced;
+    a risky prompt without a usable one is blocked.
+    """
+    if risk_score >= block_threshold:
+        return "block"
+    if risk_score >= safe_threshold or reasons:
+        return "block" if safe is None or safe == UNSANITIZABLE_MARKER else "sanitize"
+    return "allow"
+
+
+# ========================= PIPELINE ========================= #
+
+class DetectionPipeline:
+    def __init__(
+        self,
+        safe_threshold: float,
+        block_threshold: float,
+        *,
+        heuristic_block: Optional[float] = None,
+        skip_ml_when_clean: bool = False,
+        ml: bool = True,
+        similarity: Optional[SimilarityIndex] = None,
+        similarity_block: float = 0.8,
+        similarity_allow: Optional[float] = 0.9,
+        score: Callable[[str], float] = ml_injection_score,
+        score_batch: Callable[[List[str]], List[float]] = ml_injection_scores,
+    ):
+        self.safe_threshold = safe_threshold
+        self.block_threshold = block_threshold
+        self.heuristic_block = heuristic_block
+        self.skip_ml_when_clean = skip_ml_when_clean
+        self.ml = ml
+        self.similarity = similarity
+        self.similarity_block = similarity_block
+        self.similarity_allow = similarity_allow
+        self._score = score
+        self._score_batch = score_batch
+
+    @property
+    def policy(self) -> Tuple[Any, ...]:
+        """Everything that changes a verdict for a fixed prompt and model."""
+        similarity = (
+            (self.similarity.version, self.similarity_block, self.similarity_allow)
+            if self.similarity is not None else None
+        )
+        return (
+            self.safe_threshold, self.block_threshold, self.heuristic_block, self.skip_ml_when_clean, self.ml,
+            similarity,
+        )
+
+    def needs_sanitize(self, reasons: List[str], risk_score: float) -> bool:
+        return risk_score < self.block_threshold and (
+            risk_score >= self.safe_threshold or bool(reasons)
+        )
+
+    # ---------------- stages ----------------
+
+    def screen(self, prompt: Union[str, PreparedPrompt]) -> Screen:
+        """Heuristics and similarity stages; decide whether the ML stage is needed at all."""
+        t0 = time.perf_counter_ns()
+        pp = prepare(prompt)
+        reasons = detect_rule_violations(pp)
+        det = sentinel_heuristics.detect(pp)
+        h = det.risk_score
+
+        exit: Optional[str] = None
+        risk: Optional[float] = None
+        match = None
+        sim_ns: Optional[int] = None
+        heuristic_exit = self.heuristic_block is not None and h >= self.heuristic_block
+        ns = time.perf_counter_ns() - t0
+        if self.similarity is not None and not heuristic_exit:
+            t1 = time.perf_counter_ns()
+            match = self.similarity.query(pp)
+            sim_ns = time.perf_counter_ns() - t1
+
+        if heuristic_exit:
+            exit = "heuristic_block"
+            # Reported risk is lifted to the block threshold so the decision is a block
+            risk = max(h, self.block_threshold)
+            reasons.append(
+                f"Heuristic engine: score {h:.3f} ≥ {self.heuristic_block:.2f} – {len(det.matched_rules)} rule(s), "
+                f"{len(det.matched_keywords)} keyword(s) matched"
+            )
+        elif match is not None and match.label == "attack" and match.similarity >= self.similarity_block:
+            exit = "similar_attack"
+            risk = max(h, self.block_threshold)
+            reasons.append(
+                f"Near-duplicate of known attack #{match.id} (similarity {match.similarity:.2f}): "
+                f"{match.excerpt!r}"
+            )
+        elif (
+            match is not None and match.label == "benign" and self.similarity_allow is not None
+            and match.similarity >= self.similarity_allow and not reasons and h < self.safe_threshold
+        ):
+            exit = "similar_benign"
+            risk = h
+        elif self.skip_ml_when_clean and not reasons and h == 0.0:
+            exit = "clean"
+            risk = 0.0
+        elif not self.ml:
+            exit = "degraded"
+            risk = h
+        return Screen(reasons, h, exit, risk, ns, det.rules_version, sim_ns)
+
+    def finish(
+        self, prompt: Union[str, PreparedPrompt], screen: Screen, risk_score: Optional[float], ml_ns: Optional[int] = None
+    ) -> PipelineResult:
+        """Sanitizer stage, given the ML score (ignored if the screen exited early)."""
+        if screen.exit is not None:
+            risk_score, ml_ns = screen.risk_score, None
+
+        safe: Optional[str] = None
+        san_ns: Optional[int] = None
+        if screen.exit != "heuristic_block" and self.needs_sanitize(screen.reasons, risk_score):
+            t0 = time.perf_counter_ns()
+            safe = sanitize_prompt(prompt)
+            san_ns = time.perf_counter_ns() - t0
+        return PipelineResult(
+            screen.reasons, risk_score, safe, screen.exit, (screen.ns, screen.similarity_ns, ml_ns, san_ns),
+            screen.rules_version,
+        )
+
+    # ---------------- entry points ----------------
+
+    def run(self, prompt: Union[str, PreparedPrompt]) -> PipelineResult:
+        """Full pipeline for one prompt; every stage shares one PreparedPrompt."""
+        prompt = prepare(prompt)
+        s = self.screen(prompt)
+        if s.exit is not None:
+            return self.finish(prompt, s, None)
+        t0 = time.perf_counter_ns()
+        risk = self._score(prompt)
+        return self.finish(prompt, s, risk, time.perf_counter_ns() - t0)
+
+    def run_batch(self, prompts: Sequence[Union[str, PreparedPrompt]]) -> List[PipelineResult]:
+        """run() for many prompts with a single vectorized ML call for the survivors."""
+        prompts = [prepare(p) for p in prompts]
+        return self._complete(prompts, [self.screen(p) for p in prompts])
+
+    def run_turns(
+        self, turns: Sequence[Union[str, PreparedPrompt]], carry: str = "", carry_chars: int = SEAM_CHARS
+    ) -> Tuple[List[PipelineResult], str]:
+        """
+        run_batch() for the new turns of a conversation. `carry` is the tail
+        of the earlier turns (see extend_carry); rule phrases formed across a
+        seam are added as "Cross-turn" reasons. Returns the results and the
+        carry for the turns that follow.
+        """
+        prompts = [prepare(t) for t in turns]
+        screens: List[Screen] = []
+        for pp in prompts:
+            s = self.screen(pp)
+            if carry:
+                t0 = time.perf_counter_ns()
+                cross = _cross_turn_reasons(carry, pp.text[:carry_chars], s.reasons)
+                s = s._replace(reasons=s.reasons + cross, ns=s.ns + time.perf_counter_ns() - t0)
+            screens.append(s)
+            carry = extend_carry(carry, pp.text, carry_chars)
+        return self._complete(prompts, screens), carry
+
+    def _complete(self, prompts: List[PreparedPrompt], screens: List[Screen]) -> List[PipelineResult]:
+        """ML (one vectorized call for the screens that did not exit) and sanitizer."""
+        todo = [i for i, s in enumerate(screens) if s.exit is None]
+        risks: List[Optional[float]] = [None] * len(prompts)
+        ml_ns: Optional[int] = None
+        if todo:
+            t0 = time.perf_counter_ns()
+            scores = self._score_batch([prompts[i] for i in todo])
+            ml_ns = (time.perf_counter_ns() - t0) // len(todo)
+            for i, r in zip(todo, scores):
+                risks[i] = r
+        return [
+            self.finish(p, s, risks[i], ml_ns)
+            for i, (p, s) in enumerate(zip(prompts, screens))
+        ]
+
+    def scan_windows(self, windows: Sequence[str]) -> List[Tuple[List[str], float]]:
+        """
+        (reasons, risk) per window of a long document: heuristics per window,
+        one vectorized ML call for the windows that reach it, no sanitizer.
+        """
+        prepared = [prepare(w) for w in windows]
+        screens = [self.screen(pp) for pp in prepared]
+        todo = [i for i, s in enumerate(screens) if s.exit is None]
+        risks = [s.risk_score for s in screens]
+        if todo:
+            for i, r in zip(todo, self._score_batch([prepared[i] for i in todo])):
+                risks[i] = r
+        return [(s.reasons, r) for s, r in zip(screens, risks)]
+
+
+# ========================= STATS ========================= #
+
+class _StageStats:
+    __slots__ = ("runs", "skipped", "total_ns")
+
+    def __init__(self):
+        self.runs = 0
+        self.skipped = 0
+        self.total_ns = 0
+
+
+class PipelineStats:
+    """Per-stage run/skip counts and timings, aggregated from PipelineResults."""
+
+    def __init__(self):
+        self.requests = 0
+        self.exits: Dict[str, int] = {}
+        self._stages = [_StageStats() for _ in STAGES]
+
+    def record(self, result: PipelineResult) -> None:
+        self.requests += 1
+        if result.exit is not None:
+            self.exits[result.exit] = self.exits.get(result.exit, 0) + 1
+        for st, ns in zip(self._stages, result.timings):
+            if ns is None:
+                st.skipped += 1
+            else:
+                st.runs += 1
+                st.total_ns += ns
+
+    def snapshot(self) -> Dict[str, Any]:
+        stages: Dict[str, Any] = {}
+        for name, st in zip(STAGES, self._stages):
+            seen = st.runs + st.skipped
+            stages[name] = {
+                "runs": st.runs,
+                "skipped": st.skipped,
+                "skip_rate": st.skipped / seen if seen else 0.0,
+                "total_ms": st.total_ns / 1e6,
+                "mean_ms": st.total_ns / st.runs / 1e6 if st.runs else 0.0,
+            }
+        ml = self._stages[STAGES.index("ml")]
+        return {
+            "requests": self.requests,
+            "exits": dict(self.exits),
+            "stages": stages,
+            # What the early exits would have cost at the observed mean ML latency
+            "ml_ms_saved_est": (
+                ml.skipped * ml.total_ns / ml.runs / 1e6 if ml.runs else 0.0
+            ),
+        }
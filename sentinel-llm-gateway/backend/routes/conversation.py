@@ -0,0 +1,197 @@
+"""
+Sentinel Conversation Routes
+Incremental moderation of chat histories the client re-sends every turn.
+
+Each session keeps the digests and verdicts of the turns it has seen (see
+utils/session_store.py), so only new turns are scanned:
+    • moderate_history()        — shared with the inline proxy (routes/proxy.py)
+    • /moderate/conversation    — the history in, per-turn verdicts out
+    • /stats/sessions           — sessions held, turns reused vs. scanned
+"""
+
+from typing import Callable, List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel
+
+from engine import sentinel_heuristics, sentinel_ml_detector
+from main import (
+    SESSION_CARRY_CHARS,
+    SESSION_MAX,
+    SESSION_MAX_BYTES,
+    SESSION_SCAN_ROLES,
+    SESSION_TTL,
+    ModerateResponse,
+    _executor,
+    _pipeline,
+    check_rate_limit,
+    decide,
+    is_degraded,
+    log_decision,
+    log_rate_limited,
+    pipeline_for,
+    rate_limit_key,
+    record_result,
+)
+from pipeline import extend_carry
+from utils.session_store import SessionState, SessionStore, turn_digest
+
+__all__ = [
+    "ChatMessage",
+    "ConversationRequest",
+    "ConversationResponse",
+    "TurnVerdict",
+    "moderate_history",
+    "router",
+    "session_key",
+    "session_version",
+]
+
+router = APIRouter()
+
+
+# ---------------- SCHEMAS ----------------
+
+class ChatMessage(BaseModel):
+    role: str
+    content: str
+
+
+class ConversationRequest(BaseModel):
+    # The full history, oldest first, as re-sent by the chat client each turn
+    messages: List[ChatMessage]
+    conversation_id: Optional[str] = None
+    user_id: Optional[str] = None
+
+
+class TurnVerdict(ModerateResponse):
+    index: int
+
+
+class ConversationResponse(BaseModel):
+    # Worst verdict / highest risk over every scanned turn of the conversation
+    status: Literal["allow", "sanitize", "block"]
+    risk_score: float
+    turns_total: int
+    turns_scanned: int
+    flagged_turns: List[int]
+    turns: List[TurnVerdict]        # verdicts of the turns scanned by this request
+
+
+# ---------------- SESSIONS ----------------
+
+_sessions = SessionStore(ttl=SESSION_TTL, max_sessions=SESSION_MAX, max_bytes=SESSION_MAX_BYTES)
+
+
+def session_key(user_id: Optional[str], conversation_id: Optional[str]) -> Optional[str]:
+    # Conversations are scoped to their user; without an id, one session per user
+    if not user_id and not conversation_id:
+        return None
+    return f"{user_id or ''}\0{conversation_id or ''}"
+
+
+def session_version() -> str:
+    # Stored verdicts are only valid for the model, rules and policy that produced them
+    return (
+        f"{sentinel_ml_detector.current_model_hash()}|{sentinel_heuristics.current_rules().version}|"
+        f"{_pipeline.policy!r}"
+    )
+
+
+async def moderate_history(
+    messages: List[ChatMessage],
+    key: Optional[str],
+    route: str,
+    client_ip: str,
+    user_id: Optional[str],
+    degraded: bool = False,
+    scans_role: Callable[[str], bool] = SESSION_SCAN_ROLES.__contains__,
+) -> Tuple[SessionState, List[TurnVerdict]]:
+    """
+    Verdicts for the turns of `messages` session `key` has not seen yet
+    (all of them when `key` is None), and the session state including them.
+    Only turns whose role passes `scans_role` are scanned. Degraded verdicts
+    are returned but not checked in, so the turns are scanned in full again
+    once the gateway is back to normal.
+    """
+    digests = [turn_digest(m.role, m.content) for m in messages]
+    if key is None:
+        state = SessionState(session_version())
+    else:
+        state = _sessions.checkout(key, session_version(), b"".join(digests))
+    known = state.turns
+
+    scan = [
+        i for i in range(known, len(messages))
+        if scans_role(messages[i].role) and messages[i].content.strip()
+    ]
+    carry = state.carry
+    if carry is None:
+        # History was edited: rebuild the carry from the turns that are kept
+        carry = ""
+        for m in messages[:known]:
+            if scans_role(m.role) and m.content.strip():
+                carry = extend_carry(carry, m.content.strip(), SESSION_CARRY_CHARS)
+
+    verdicts: List[TurnVerdict] = []
+    if scan:
+        results, carry = await _executor.run(
+            pipeline_for(degraded).run_turns, [messages[i].content.strip() for i in scan], carry, SESSION_CARRY_CHARS
+        )
+        for i, result in zip(scan, results):
+            response = decide(result.reasons, result.risk_score, result.safe, result.rules_version)
+            record_result(result, response)
+            log_decision(response, route, client_ip, user_id, turn=i, turns=len(messages), known=known)
+            verdicts.append(TurnVerdict(index=i, **response.model_dump()))
+
+    by_index = {v.index: v for v in verdicts}
+    for i in range(known, len(messages)):
+        v = by_index.get(i)
+        state.append(digests[i], v.status if v else None, v.risk_score if v else 0.0)
+    state.carry = carry
+    if key is not None and not degraded:
+        _sessions.checkin(key, state, scanned=len(scan))
+    return state, verdicts
+
+
+# ---------------- ROUTES ----------------
+
+@router.post("/moderate/conversation", response_model=ConversationResponse)
+async def moderate_conversation(req: ConversationRequest, request: Request):
+    """
+    Moderate a conversation the client re-sends in full every turn. Turns this
+    session has already seen (matched by digest) keep their stored verdict;
+    only new turns are scanned, with the tail of the earlier turns carried
+    over so phrases split across turns are still caught.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+
+    try:
+        await check_rate_limit(rate_limit_key(client_ip, req.user_id))
+    except HTTPException as e:
+        log_rate_limited("/moderate/conversation", client_ip, req.user_id)
+        raise e
+
+    key = session_key(req.user_id, req.conversation_id)
+    if key is None:
+        raise HTTPException(status_code=400, detail="conversation_id or user_id is required.")
+    if not req.messages:
+        raise HTTPException(status_code=400, detail="Conversation cannot be empty.")
+
+    state, verdicts = await moderate_history(
+        req.messages, key, "/moderate/conversation", client_ip, req.user_id, is_degraded(request)
+    )
+    return ConversationResponse(
+        status=state.status(),
+        risk_score=state.max_risk(),
+        turns_total=len(req.messages),
+        turns_scanned=len(verdicts),
+        flagged_turns=state.flagged(),
+        turns=verdicts,
+    )
+
+
+@router.get("/stats/sessions")
+async def session_stats():
+    """Conversation sessions held, turns reused vs. scanned, evictions."""
+    return _sessions.stats()
@@ -0,0 +1,320 @@
+"""
+Sentinel Proxy Routes
+OpenAI-compatible inline proxy mode.
+
+Requests are moderated before they are forwarded to SENTINEL_UPSTREAM_URL
+over one shared keep-alive pool (utils/upstream.py); completions are
+screened on the way back (engine/output_scanner.py):
+    • /v1/chat/completions — every role except PROXY_SKIP_ROLES scanned,
+                             sanitized turns rewritten, blocked requests
+                             answered with an OpenAI-style error
+    • output scan          — secrets redacted, rules / keywords acted on,
+                             system-prompt reproductions cut; SSE streams
+                             are relayed event by event
+    • /stats/upstream      — requests forwarded, errors, pool limits
+"""
+
+import json
+import logging
+from typing import TYPE_CHECKING, AsyncIterator, Dict, List, Optional
+
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from starlette.background import BackgroundTask
+
+from engine.output_scanner import OutputPolicy, OutputScanner
+from main import (
+    METRICS_ENABLED,
+    OUTPUT_KEYWORD_ACTION,
+    OUTPUT_LOOKBACK,
+    OUTPUT_RULE_ACTION,
+    OUTPUT_SCAN,
+    PROXY_SKIP_ROLES,
+    UPSTREAM_API_KEY,
+    UPSTREAM_MAX_CONNECTIONS,
+    UPSTREAM_MAX_KEEPALIVE,
+    UPSTREAM_TIMEOUT,
+    UPSTREAM_URL,
+    _output_hits,
+    _request_log,
+    check_rate_limit,
+    is_degraded,
+    log_rate_limited,
+    rate_limit_key,
+)
+from pipeline import output_rules, sanitize_prompt
+from routes.conversation import ChatMessage, moderate_history, session_key
+from utils.upstream import UpstreamClient, UpstreamError
+
+if TYPE_CHECKING:
+    import httpx  # imported by UpstreamClient on first use
+
+__all__ = [
+    "aclose",
+    "message_text",
+    "openai_error",
+    "output_policy",
+    "reload_output_policy",
+    "router",
+    "scan_completion",
+    "scan_sse",
+]
+
+router = APIRouter()
+
+# Shared keep-alive pool, opened on the first forwarded request
+_upstream = UpstreamClient(
+    UPSTREAM_URL,
+    api_key=UPSTREAM_API_KEY,
+    timeout=UPSTREAM_TIMEOUT,
+    max_connections=UPSTREAM_MAX_CONNECTIONS,
+    max_keepalive=UPSTREAM_MAX_KEEPALIVE,
+)
+
+
+# ---------------- OUTPUT SCAN ----------------
+
+def make_output_policy() -> OutputPolicy:
+    return OutputPolicy(
+        output_rules(OUTPUT_RULE_ACTION, OUTPUT_KEYWORD_ACTION),
+        lookback=OUTPUT_LOOKBACK,
+    )
+
+
+# Output rules compiled once (again after a rules reload); one scanner per streamed choice
+_output_policy: Optional[OutputPolicy] = make_output_policy() if OUTPUT_SCAN else None
+
+
+def output_policy() -> Optional[OutputPolicy]:
+    """The output policy serving (None with SENTINEL_OUTPUT_SCAN=0)."""
+    return _output_policy
+
+
+def reload_output_policy() -> None:
+    # Called after a rules reload, so output rules follow the rule set
+    global _output_policy
+    if OUTPUT_SCAN:
+        _output_policy = make_output_policy()
+
+
+def log_output_hits(scanner: OutputScanner) -> None:
+    if METRICS_ENABLED:
+        for h in scanner.hits:
+            _output_hits.labels(h.kind, h.action).inc()
+    if scanner.hits:
+        _request_log.event(
+            logging.WARNING,
+            "output_cut" if scanner.cut else "output_hits",
+            hits=[f"{h.kind}:{h.action}" for h in scanner.hits],
+        )
+
+
+def scan_completion(content: bytes, protected: List[str]) -> bytes:
+    """
+    Output scan of a non-streamed chat completion (each choice's message).
+    Nothing has been sent yet, so a cut withholds the whole message.
+    """
+    try:
+        completion = json.loads(content)
+    except ValueError:
+        return content
+    for choice in completion.get("choices") or []:
+        message = choice.get("message") or {}
+        text = message.get("content")
+        if not isinstance(text, str) or not text:
+            continue
+        scanner = _output_policy.scanner(protected)
+        message["content"] = scanner.feed(text) + scanner.finish()
+        if scanner.cut:
+            choice["finish_reason"] = "content_filter"
+        log_output_hits(scanner)
+    return json.dumps(completion).encode()
+
+
+async def scan_sse(upstream: "httpx.Response", protected: List[str], n_choices: int) -> AsyncIterator[bytes]:
+    """
+    Relay an OpenAI SSE stream with every choice's `delta.content` passed
+    through its own OutputScanner. Each event goes out as soon as it arrives
+    (minus any held-back tail); a cut ends that choice with finish_reason
+    "content_filter", and the stream once every choice is done.
+    """
+    scanners: Dict[int, OutputScanner] = {}
+    done: set = set()
+    async for line in upstream.aiter_lines():
+        data = line[5:].strip() if line.startswith("data:") else None
+        if data is None or data == "[DONE]":
+            yield (line + "\n").encode()
+            continue
+        try:
+            event = json.loads(data)
+        except ValueError:
+            yield (line + "\n").encode()
+            continue
+
+        for choice in event.get("choices") or []:
+            idx = choice.get("index", 0)
+            scanner = scanners.get(idx)
+            if scanner is None:
+                scanner = scanners[idx] = _output_policy.scanner(protected)
+            delta = choice.get("delta") or {}
+            text = delta.get("content")
+            if idx in done:
+                if isinstance(text, str):
+                    delta["content"] = ""
+                choice["finish_reason"] = None
+                continue
+            if isinstance(text, str) and text:
+                delta["content"] = scanner.feed(text)
+            if choice.get("finish_reason") and not scanner.cut:
+                # Release the held-back tail with the upstream's last event
+                delta["content"] = (delta.get("content") or "") + scanner.finish()
+            if scanner.cut:
+                choice["finish_reason"] = "content_filter"
+            if choice.get("finish_reason"):
+                done.add(idx)
+                log_output_hits(scanner)
+        yield f"data: {json.dumps(event, separators=(',', ':'))}\n".encode()
+
+        if len(done) >= n_choices and all(scanners[i].cut for i in done):
+            # Every choice was cut: stop reading the upstream
+            yield b"\ndata: [DONE]\n\n"
+            return
+
+
+# ---------------- ROUTES ----------------
+
+def message_text(content) -> str:
+    # OpenAI content is a string, a list of parts, or null (tool calls)
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        return "\n".join(
+            p.get("text", "") for p in content if isinstance(p, dict) and p.get("type") == "text"
+        )
+    return ""
+
+
+def openai_error(status_code: int, message: str, type_: str, **extra) -> JSONResponse:
+    return JSONResponse(
+        status_code=status_code,
+        content={"error": {"message": message, "type": type_, **extra}},
+    )
+
+
+@router.post("/v1/chat/completions")
+async def proxy_chat_completions(request: Request):
+    """
+    OpenAI-compatible inline proxy: moderate the messages, then forward the
+    request — with sanitized turns rewritten — to SENTINEL_UPSTREAM_URL over
+    the shared connection pool. Streaming (SSE) responses are relayed as they
+    arrive. Blocked requests never reach the upstream.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+
+    try:
+        body = await request.json()
+    except ValueError:
+        return openai_error(400, "Request body must be JSON.", "invalid_request_error")
+    if not isinstance(body, dict) or not isinstance(body.get("messages"), list) or not body["messages"]:
+        return openai_error(400, "`messages` must be a non-empty list.", "invalid_request_error")
+    n_choices = 1 if body.get("n") is None else body["n"]
+    if isinstance(n_choices, bool) or not isinstance(n_choices, int) or n_choices < 1:
+        return openai_error(400, "`n` must be a positive integer.", "invalid_request_error", param="n")
+
+    user_id = body.get("user") if isinstance(body.get("user"), str) else None
+    try:
+        await check_rate_limit(rate_limit_key(client_ip, user_id))
+    except HTTPException:
+        log_rate_limited("/v1/chat/completions", client_ip, user_id)
+        return openai_error(429, "Too many requests to Sentinel from this client. Slow down.", "rate_limit_error")
+
+    if not _upstream.configured:
+        return openai_error(503, "Sentinel proxy mode has no upstream (SENTINEL_UPSTREAM_URL).", "server_error")
+
+    raw_messages = body["messages"]
+    messages = [
+        ChatMessage(role=str(m.get("role", "")), content=message_text(m.get("content")))
+        if isinstance(m, dict) else ChatMessage(role="", content="")
+        for m in raw_messages
+    ]
+    # Clients that re-send history can name the conversation to get incremental scans;
+    # proxy sessions scan other roles than /moderate/conversation, so they are kept apart
+    conversation_id = request.headers.get("x-sentinel-conversation-id")
+    key = f"proxy\0{session_key(user_id, conversation_id)}" if conversation_id else None
+    state, verdicts = await moderate_history(
+        messages, key, "/v1/chat/completions", client_ip, user_id, is_degraded(request),
+        scans_role=lambda role: role not in PROXY_SKIP_ROLES,
+    )
+
+    status = state.status()
+    if status == "block":
+        reasons = [r for v in verdicts if v.status == "block" for r in v.reasons] or [
+            "Conversation contains a previously blocked turn."
+        ]
+        _request_log.event(
+            logging.WARNING, "proxy_block", ip=client_ip, user_id=user_id, risk=state.max_risk(),
+            flagged_turns=state.flagged(),
+        )
+        return openai_error(
+            400,
+            "Request blocked by Sentinel: possible prompt injection, secret exfiltration, "
+            "or unsafe control attempt.",
+            "sentinel_blocked",
+            code="content_blocked",
+            reasons=reasons,
+            flagged_turns=state.flagged(),
+        )
+
+    if status == "sanitize":
+        # Rewrite every turn judged "sanitize" — earlier turns are re-sent raw by the client
+        safe = {v.index: v.safe_prompt for v in verdicts}
+        body = {**body, "messages": list(raw_messages)}
+        for i in state.flagged():
+            text = safe.get(i) or sanitize_prompt(messages[i].content.strip())
+            body["messages"][i] = {**raw_messages[i], "content": text}
+
+    try:
+        upstream = await _upstream.send("/chat/completions", body, request.headers)
+    except UpstreamError as e:
+        _request_log.event(logging.ERROR, "upstream_error", error=str(e))
+        return openai_error(502, "Upstream LLM API unreachable.", "upstream_error")
+
+    headers = {
+        "x-sentinel-status": status,
+        "x-sentinel-risk": f"{state.max_risk():.4f}",
+    }
+    media_type = upstream.headers.get("content-type")
+    scan_output = _output_policy is not None and upstream.status_code == 200
+    protected = [m.content for m in messages if m.role in ("system", "developer") and m.content]
+    if body.get("stream"):
+        # Relay SSE as the upstream produces it, no buffering
+        stream = (
+            scan_sse(upstream, protected, n_choices)
+            if scan_output and (media_type or "").startswith("text/event-stream")
+            else upstream.aiter_bytes()
+        )
+        return StreamingResponse(
+            stream,
+            status_code=upstream.status_code,
+            media_type=media_type,
+            headers=headers,
+            background=BackgroundTask(upstream.aclose),
+        )
+    try:
+        content = await upstream.aread()
+    finally:
+        await upstream.aclose()
+    if scan_output and (media_type or "").startswith("application/json"):
+        content = scan_completion(content, protected)
+    return Response(content=content, status_code=upstream.status_code, media_type=media_type, headers=headers)
+
+
+@router.get("/stats/upstream")
+async def upstream_stats():
+    """Proxy-mode upstream: requests forwarded, errors, pool limits."""
+    return _upstream.stats()
+
+
+async def aclose() -> None:
+    """Release the upstream connection pool (app shutdown)."""
+    await _upstream.aclose()
@@ -0,0 +1,141 @@
+"""
+Sentinel Stream Routes
+Moderation of long documents read as a stream.
+
+    • /moderate/stream — a text/plain body (chunked transfer is fine) cut
+                         into overlapping windows as it arrives
+                         (engine/window_scanner.py), ML-scored in batches;
+                         reading stops at the first window that blocks
+"""
+
+import codecs
+from typing import List, Literal, Optional, Tuple
+
+from fastapi import APIRouter, HTTPException, Request
+from pydantic import BaseModel
+
+from engine.window_scanner import Windower, WindowScan
+from main import (
+    BLOCK_THRESHOLD,
+    SAFE_THRESHOLD,
+    STREAM_AGGREGATION,
+    STREAM_BATCH_WINDOWS,
+    STREAM_OVERLAP_CHARS,
+    STREAM_TOP_K,
+    STREAM_WINDOW_CHARS,
+    _executor,
+    _request_log,
+    check_rate_limit,
+    is_degraded,
+    log_rate_limited,
+    pipeline_for,
+    rate_limit_key,
+)
+
+__all__ = [
+    "FlaggedWindow",
+    "StreamScanResponse",
+    "router",
+]
+
+router = APIRouter()
+
+
+# ---------------- SCHEMAS ----------------
+
+class FlaggedWindow(BaseModel):
+    start: int
+    end: int
+    risk_score: float
+
+
+class StreamScanResponse(BaseModel):
+    # A streamed document is never buffered, so it cannot be rewritten:
+    # medium risk is reported as "suspicious" instead of "sanitize"
+    status: Literal["allow", "suspicious", "block"]
+    risk_score: float
+    max_window_score: float
+    chars_scanned: int
+    windows_scanned: int
+    early_exit: bool
+    flagged_windows: List[FlaggedWindow]
+    reasons: List[str]
+
+
+# ---------------- ROUTES ----------------
+
+@router.post("/moderate/stream", response_model=StreamScanResponse)
+async def moderate_stream(request: Request, user_id: Optional[str] = None):
+    """
+    Scan a long text/plain body (chunked transfer is fine) in overlapping
+    windows as it arrives. Memory stays bounded by the window batch, and
+    reading stops as soon as one window reaches the block threshold.
+    """
+    client_ip = request.client.host if request.client else "unknown"
+
+    try:
+        await check_rate_limit(rate_limit_key(client_ip, user_id))
+    except HTTPException as e:
+        log_rate_limited("/moderate/stream", client_ip, user_id)
+        raise e
+
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+    windower = Windower(STREAM_WINDOW_CHARS, STREAM_OVERLAP_CHARS)
+    scan = WindowScan(STREAM_AGGREGATION, top_k=STREAM_TOP_K, block_threshold=BLOCK_THRESHOLD)
+    pending: List[Tuple[int, str]] = []
+    pipeline = pipeline_for(is_degraded(request))
+
+    async def flush() -> bool:
+        # One vectorized batch at a time; True as soon as a window blocks
+        while pending:
+            batch = pending[:STREAM_BATCH_WINDOWS]
+            del pending[:STREAM_BATCH_WINDOWS]
+            verdicts = await _executor.run(pipeline.scan_windows, [w for _, w in batch])
+            for (start, window), (reasons, risk) in zip(batch, verdicts):
+                if scan.add(start, start + len(window), risk, reasons):
+                    return True
+        return False
+
+    stopped = False
+    async for chunk in request.stream():
+        pending.extend(windower.feed(decoder.decode(chunk)))
+        if len(pending) >= STREAM_BATCH_WINDOWS and await flush():
+            stopped = True
+            break
+    if not stopped:
+        pending.extend(windower.feed(decoder.decode(b"", final=True)))
+        pending.extend(windower.finish())
+        stopped = await flush()
+
+    if scan.windows == 0 or not windower.chars:
+        raise HTTPException(status_code=400, detail="Document cannot be empty.")
+
+    risk_score = scan.risk_score
+    reasons = scan.reasons
+    if scan.blocked or risk_score >= BLOCK_THRESHOLD:
+        status = "block"
+    elif risk_score >= SAFE_THRESHOLD or reasons:
+        status = "suspicious"
+    else:
+        status = "allow"
+    _request_log.decision(
+        status,
+        route="/moderate/stream",
+        ip=client_ip,
+        user_id=user_id,
+        risk=risk_score,
+        reasons=reasons,
+        chars=windower.chars,
+        windows=scan.windows,
+        early_exit=stopped,
+    )
+    return StreamScanResponse(
+        status=status,
+        risk_score=risk_score,
+        max_window_score=scan.max_score,
+        chars_scanned=windower.chars,
+        windows_scanned=scan.windows,
+        early_exit=stopped,
+        flagged_windows=[FlaggedWindow(**w) for w in scan.flagged()],
+        reasons=reasons,
+    )
@@ -0,0 +1,386 @@
+"""
+sentinel-audit
+Offline re-run of the gateway's decision pipeline over prompt logs.
+
+Reads JSONL logs (plain or .gz), one prompt per line, and writes one verdict
+per prompt — the same DetectionPipeline and decision rule as /moderate, with
+no FastAPI, cache or rate limit in the way:
+    • streaming — input is read in batches of lines; at most 2 batches per
+                  worker are in flight, so memory does not grow with the log
+    • parallel  — batches are parsed, analyzed (one vectorized ML call per
+                  batch, through sklearn's hashing rather than the gateway's
+                  per-prompt native scorer) and serialized on a process pool
+                  across all cores; output keeps input order
+    • sweep     — several SAFE/BLOCK threshold pairs in one pass: the
+                  pipeline runs once with the widest pair (so the sanitizer
+                  runs whenever any pair could need it) and each pair's
+                  status is derived from the same analysis
+    • resumable — a progress file next to the output records, after every
+                  committed (fsynced) batch, the byte offset reached in each
+                  input and the output size; --resume seeks the inputs there
+                  and drops any output written after the last commit, and
+                  refuses to start if the output is missing or shorter
+
+Output is streaming JSONL (default) or, with pyarrow installed, Parquet: a
+directory of part files, one row group each, committed by rename. Every row
+carries the input file and byte offset of its line, so a verdict can be
+traced back to the log. Early exits and thresholds follow the gateway's
+SENTINEL_* environment unless overridden on the command line.
+
+    python sentinel_audit.py logs/*.jsonl.gz -o verdicts.jsonl \\
+        --thresholds 0.35:0.8,0.3:0.7 [--workers N] [--resume]
+"""
+
+from __future__ import annotations
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from pipeline import DetectionPipeline, verdict_status
+
+__all__ = [
+    "parse_thresholds",
+    "audit_lines",
+    "main",
+]
+
+PROGRESS_SUFFIX = ".progress.json"
+TEXT_FIELDS = ("prompt", "text")
+
+Pair = Tuple[float, float]
+
+
+def parse_thresholds(spec: str) -> List[Pair]:
+    """"0.35:0.8,0.3:0.7" → [(0.35, 0.8), (0.3, 0.7)]"""
+    pairs = []
+    for part in spec.split(","):
+        safe, _, block = part.strip().partition(":")
+        pair = (float(safe), float(block))
+        if not 0.0 <= pair[0] <= pair[1] <= 1.0:
+            raise ValueError(f"Threshold pair {part!r} must satisfy 0 ≤ safe ≤ block ≤ 1")
+        pairs.append(pair)
+    return pairs
+
+
+def status_columns(pairs: Sequence[Pair]) -> List[str]:
+    # The first pair is "status"; the others are named after their thresholds
+    return ["status"] + [f"status_{s:g}_{b:g}" for s, b in pairs[1:]]
+
+
+# ========================= WORKER ========================= #
+
+_pipeline: Optional[DetectionPipeline] = None
+_config: Dict[str, Any] = {}
+
+
+def _init_worker(config: Dict[str, Any]) -> None:
+    global _pipeline, _config
+    from engine import sentinel_ml_detector
+
+    pairs = config["pairs"]
+    _config = config
+    _pipeline = DetectionPipeline(
+        min(s for s, _ in pairs),
+        max(b for _, b in pairs),
+        heuristic_block=config["heuristic_block"],
+        skip_ml_when_clean=config["skip_ml_when_clean"],
+    )
+    # Large batches favour sklearn's hashing (C) over the native per-prompt
+    # scorer the gateway uses for latency; both give the same scores
+    sentinel_ml_detector.USE_NATIVE_SCORER = config["scorer"] == "native"
+    sentinel_ml_detector.load_model()     # load once, before the first batch
+
+
+def audit_lines(source: str, lines: Sequence[Tuple[int, bytes]]) -> Tuple[Any, Dict[str, Dict[str, int]], int]:
+    """
+    Verdicts for (byte offset, raw line) pairs of `source`. Returns the
+    serialized JSONL (or column lists for Parquet), per-column status counts
+    and the number of unreadable lines.
+    """
+    config = _config
+    pairs, keep, field = config["pairs"], config["keep"], config["field"]
+    columns = status_columns(pairs)
+
+    rows: List[Dict[str, Any]] = []
+    prompts: List[str] = []
+    errors = 0
+    for offset, raw in lines:
+        row: Dict[str, Any] = {"source": source, "offset": offset}
+        try:
+            record = json.loads(raw)
+            fields = (field,) if field else TEXT_FIELDS
+            text = next((record[f] for f in fields if isinstance(record.get(f), str)), None)
+        except (ValueError, TypeError, AttributeError):
+            record, text = None, None
+        if isinstance(record, dict):
+            for k in keep:
+                row[k] = record.get(k)
+        if text is None or not text.strip():
+            row["error"] = "unreadable line" if record is None else "no prompt"
+            errors += 1
+        else:
+            row["_prompt"] = len(prompts)
+            prompts.append(text.strip())
+        rows.append(row)
+
+    results = _pipeline.run_batch(prompts) if prompts else []
+    counts: Dict[str, Dict[str, int]] = {c: {"allow": 0, "sanitize": 0, "block": 0} for c in columns}
+    for row in rows:
+        i = row.pop("_prompt", None)
+        if i is None:
+            row.update({"risk": None, "exit": None, "reasons": None, **{c: None for c in columns}})
+            continue
+        result = results[i]
+        row["risk"] = result.risk_score
+        row["exit"] = result.exit
+        row["reasons"] = result.reasons
+        for column, (safe_t, block_t) in zip(columns, pairs):
+            status = verdict_status(result.reasons, result.risk_score, result.safe, safe_t, block_t)
+            row[column] = status
+            counts[column][status] += 1
+
+    if config["format"] == "parquet":
+        names = list(rows[0]) if rows else []
+        for row in rows:
+            names += [k for k in row if k not in names]
+        return {n: [row.get(n) for row in rows] for n in names}, counts, errors
+    payload = "".join(json.dumps(row, ensure_ascii=False, separators=(",", ":")) + "\n" for row in rows)
+    return payload.encode(), counts, errors
+
+
+# ========================= INPUT ========================= #
+
+def read_batches(path: Path, start: int, batch_lines: int) -> Iterator[Tuple[int, List[Tuple[int, bytes]]]]:
+    """(offset after the batch, [(line offset, line)]) from byte `start` on."""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rb") as f:
+        if start:
+            f.seek(start)           # gzip: an offset into the decompressed stream
+        offset = start
+        batch: List[Tuple[int, bytes]] = []
+        for line in f:
+            line_offset, offset = offset, offset + len(line)
+            if line.strip():
+                batch.append((line_offset, line))
+            if len(batch) >= batch_lines:
+                yield offset, batch
+                batch = []
+        if batch:
+            yield offset, batch
+        elif offset == start:
+            return
+        else:
+            yield offset, []
+
+
+# ========================= OUTPUT ========================= #
+
+class JsonlSink:
+    def __init__(self, path: str, resume_bytes: Optional[int]):
+        self.stdout = path == "-"
+        if self.stdout:
+            self._f = sys.stdout.buffer
+            return
+        if resume_bytes is None:
+            self._f = open(path, "wb")
+            return
+        # The committed output must still be there, whole: truncate() would pad
+        # a missing or shortened file with NUL bytes up to the recorded size
+        size = os.path.getsize(path) if os.path.exists(path) else None
+        if size is None or size < resume_bytes:
+            found = "missing" if size is None else f"{size} bytes"
+            raise RuntimeError(f"cannot resume: {path} is {found}, the progress file records {resume_bytes}")
+        self._f = open(path, "r+b")
+        # Drop whatever was written after the last commit
+        self._f.truncate(resume_bytes)
+        self._f.seek(resume_bytes)
+
+    def write(self, payload: bytes) -> None:
+        self._f.write(payload)
+
+    def commit(self) -> Dict[str, Any]:
+        self._f.flush()
+        if self.stdout:
+            return {}
+        # On disk before the progress file says so
+        os.fsync(self._f.fileno())
+        return {"output_bytes": self._f.tell()}
+
+    def close(self) -> None:
+        if not self.stdout:
+            self._f.close()
+
+
+class ParquetSink:
+    def __init__(self, path: str, resume_parts: Optional[int]):
+        try:
+            import pyarrow  # optional dependency
+            import pyarrow.parquet
+        except ImportError as e:
+            raise RuntimeError("Parquet output requires `pip install pyarrow`") from e
+        self._pa, self._pq = pyarrow, pyarrow.parquet
+        self.dir = Path(path)
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.parts = resume_parts or 0
+        for stale in self.dir.glob("*.tmp"):
+            stale.unlink()
+
+    def write(self, columns: Dict[str, List[Any]]) -> None:
+        if not columns:
+            return
+        table = self._pa.table(columns)
+        final = self.dir / f"part-{self.parts:06d}.parquet"
+        tmp = final.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            self._pq.write_table(table, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, final)
+        self.parts += 1
+
+    def commit(self) -> Dict[str, Any]:
+        return {"output_parts": self.parts}
+
+    def close(self) -> None:
+        pass
+
+
+# ========================= DRIVER ========================= #
+
+def _env_float(name: str, default: str) -> Optional[float]:
+    value = os.getenv(name, default)
+    return float(value) if value else None
+
+
+def _save_progress(path: Path, state: Dict[str, Any]) -> None:
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "w") as f:
+        f.write(json.dumps(state, indent=2))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(
+        prog="sentinel-audit", description="Re-run Sentinel's decision pipeline over JSONL prompt logs."
+    )
+    parser.add_argument("inputs", nargs="+", type=Path, help="JSONL files (.gz allowed)")
+    parser.add_argument("-o", "--output", default="-", help="JSONL file, Parquet directory, or - for stdout")
+    parser.add_argument("--format", choices=("jsonl", "parquet"), default="jsonl")
+    parser.add_argument(
+        "--thresholds",
+        default=f"{os.getenv('SENTINEL_SAFE_THRESHOLD', '0.35')}:{os.getenv('SENTINEL_BLOCK_THRESHOLD', '0.8')}",
+        help="SAFE:BLOCK pairs, comma-separated; the first one is the 'status' column",
+    )
+    parser.add_argument("--field", default=None, help="prompt field (default: prompt, then text)")
+    parser.add_argument("--keep", default="", help="comma-separated input fields copied to the output")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="processes (0 → inline)")
+    parser.add_argument("--batch-lines", type=int, default=2048)
+    parser.add_argument("--scorer", choices=("sklearn", "native"), default="sklearn",
+                        help="how linear model artifacts are scored (same scores)")
+    parser.add_argument("--resume", action="store_true", help="continue from the progress file")
+    args = parser.parse_args(argv)
+
+    pairs = parse_thresholds(args.thresholds)
+    config = {
+        "pairs": pairs,
+        "keep": [k for k in args.keep.split(",") if k],
+        "field": args.field,
+        "format": args.format,
+        "scorer": args.scorer,
+        "heuristic_block": _env_float("SENTINEL_HEURISTIC_BLOCK", ""),
+        "skip_ml_when_clean": os.getenv("SENTINEL_SKIP_ML_WHEN_CLEAN", "0") == "1",
+    }
+    if args.format == "parquet" and args.output == "-":
+        parser.error("Parquet output needs a directory (-o)")
+
+    progress_path = Path(args.output + PROGRESS_SUFFIX) if args.output != "-" else None
+    state: Dict[str, Any] = {"offsets": {}, "thresholds": pairs}
+    if args.resume:
+        if progress_path is None or not progress_path.exists():
+            parser.error("--resume needs an output file with a progress file next to it")
+        state = json.loads(progress_path.read_text())
+        if [tuple(p) for p in state["thresholds"]] != pairs:
+            parser.error(f"--thresholds differ from the interrupted run's {state['thresholds']}")
+    try:
+        if args.format == "parquet":
+            sink = ParquetSink(args.output, state.get("output_parts") if args.resume else None)
+        else:
+            sink = JsonlSink(args.output, state.get("output_bytes", 0) if args.resume else None)
+    except RuntimeError as e:
+        parser.error(str(e))
+
+    columns = status_columns(pairs)
+    totals = {c: {"allow": 0, "sanitize": 0, "block": 0} for c in columns}
+    lines = errors = 0
+    t0 = time.perf_counter()
+
+    pool = None
+    if args.workers > 0:
+        pool = ProcessPoolExecutor(args.workers, initializer=_init_worker, initargs=(config,))
+    else:
+        _init_worker(config)
+    try:
+        for path in args.inputs:
+            key = str(path)
+            start = state["offsets"].get(key, 0)
+            if start == "done":
+                continue
+            in_flight: deque = deque()
+
+            def drain(limit: int) -> None:
+                nonlocal lines, errors
+                while len(in_flight) > limit:
+                    end, n, future = in_flight.popleft()
+                    payload, counts, bad = future.result() if pool is not None else future
+                    sink.write(payload)
+                    for column, c in counts.items():
+                        for status, k in c.items():
+                            totals[column][status] += k
+                    lines += n
+                    errors += bad
+                    # Commit: output flushed up to here, then the input offset after it
+                    state.update(sink.commit())
+                    state["offsets"][key] = end
+                    if progress_path is not None:
+                        _save_progress(progress_path, state)
+
+            for end, batch in read_batches(path, start, args.batch_lines):
+                if pool is not None:
+                    in_flight.append((end, len(batch), pool.submit(audit_lines, key, batch)))
+                else:
+                    in_flight.append((end, len(batch), audit_lines(key, batch)))
+                drain(2 * max(args.workers, 1))
+            drain(0)
+            state["offsets"][key] = "done"
+            if progress_path is not None:
+                _save_progress(progress_path, state)
+    finally:
+        if pool is not None:
+            pool.shutdown(cancel_futures=True)
+        sink.close()
+
+    elapsed = time.perf_counter() - t0
+    summary = {
+        "lines": lines,
+        "errors": errors,
+        "seconds": round(elapsed, 3),
+        "lines_per_s": round(lines / elapsed, 1) if elapsed else None,
+        "thresholds": {c: f"{s:g}:{b:g}" for c, (s, b) in zip(columns, pairs)},
+        "verdicts": totals,
+    }
+    print(json.dumps(summary, indent=2), file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
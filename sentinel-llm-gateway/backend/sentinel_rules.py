@@ -0,0 +1,96 @@
+"""
+sentinel-rules
+Validate the heuristic rule sources and compile them into a snapshot.
+
+    • check   — parse extra_regex_rules.json and extra_keywords.txt and
+                report every invalid entry (bad regex, missing pattern,
+                non-positive weight); exit status 1 if there is one
+    • compile — check, then build the RuleSet (compiled patterns, literal
+                prefilter and merged alternations, keyword automaton, max
+                score) and pickle it to engine/rules.snapshot. Nothing is
+                written if any entry is invalid. The file is replaced by
+                rename, so a running gateway's rules watcher picks it up and
+                swaps it in whole within RULES_RELOAD_INTERVAL seconds
+    • show    — version and sizes of a snapshot, and how long it takes to load
+
+The version is a digest of the rules, keywords and weights: the same sources
+give the same version whether the gateway reads the snapshot or the files.
+
+    python sentinel_rules.py compile [--rules F] [--keywords F] [-o F]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import Optional, Sequence
+
+from engine.sentinel_heuristics import (
+    EXTRA_KEYWORDS_FILE,
+    EXTRA_RULES_FILE,
+    RULES_SNAPSHOT_FILE,
+    build_rule_set,
+    load_snapshot,
+    read_rule_sources,
+    write_snapshot,
+)
+
+__all__ = [
+    "main",
+]
+
+
+def _check(args) -> int:
+    regex, keywords, errors = read_rule_sources(args.rules, args.keywords)
+    for problem in errors:
+        print(f"error: {problem}", file=sys.stderr)
+    print(f"{len(regex)} regex rules, {len(keywords)} keywords, {len(errors)} error(s)")
+    return 1 if errors else 0
+
+
+def _compile(args) -> int:
+    regex, keywords, errors = read_rule_sources(args.rules, args.keywords)
+    if errors:
+        for problem in errors:
+            print(f"error: {problem}", file=sys.stderr)
+        print(f"{len(errors)} invalid entr{'y' if len(errors) == 1 else 'ies'}; no snapshot written", file=sys.stderr)
+        return 1
+    t0 = time.perf_counter()
+    rule_set = build_rule_set(regex, keywords)
+    build_s = time.perf_counter() - t0
+    write_snapshot(rule_set, args.output)
+    print(f"version {rule_set.version}: {len(rule_set.regex_rules)} regex rules, {len(rule_set.keywords)} keywords")
+    print(f"built in {build_s * 1000:.1f} ms → {args.output} ({args.output.stat().st_size / 1e6:.2f} MB)")
+    return 0
+
+
+def _show(args) -> int:
+    t0 = time.perf_counter()
+    rule_set = load_snapshot(args.snapshot)
+    load_s = time.perf_counter() - t0
+    print(f"version {rule_set.version}: {len(rule_set.regex_rules)} regex rules, {len(rule_set.keywords)} keywords, "
+          f"max score {rule_set.max_total:g}")
+    print(f"loaded in {load_s * 1000:.1f} ms from {args.snapshot} ({args.snapshot.stat().st_size / 1e6:.2f} MB)")
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="sentinel-rules", description="Validate and compile heuristic rules.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    for name, fn in (("check", _check), ("compile", _compile)):
+        cmd = commands.add_parser(name)
+        cmd.add_argument("--rules", type=Path, default=EXTRA_RULES_FILE, help="regex rules (JSON)")
+        cmd.add_argument("--keywords", type=Path, default=EXTRA_KEYWORDS_FILE, help="keywords (one per line)")
+        cmd.set_defaults(fn=fn)
+    commands.choices["compile"].add_argument("-o", "--output", type=Path, default=RULES_SNAPSHOT_FILE)
+    show = commands.add_parser("show")
+    show.add_argument("snapshot", type=Path, nargs="?", default=RULES_SNAPSHOT_FILE)
+    show.set_defaults(fn=_show)
+    args = parser.parse_args(argv)
+    return args.fn(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,150 @@
+"""
+sentinel-similarity
+Build and maintain the near-duplicate index of known prompts (engine/similarity_index.py).
+
+    • build   — MinHash every line of the attack files (and, optionally, of
+                known-benign files) and write models/similarity/; exact
+                duplicates after normalization are kept once
+    • add     — insert confirmed attacks (or --label benign prompts) through
+                the journal: a running gateway serves them within a second,
+                no rebuild
+    • remove  — stop matching entries by id (as `query` prints), also
+                through the journal
+    • compact — fold the journal into a rebuilt index directory
+    • query   — nearest entry, similarity and lookup time for each text
+    • show    — version, entry counts and open time of an index
+
+    python sentinel_similarity.py build [--attacks F]... [--benign F]... [-o DIR]
+"""
+
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from pathlib import Path
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from engine.similarity_index import (
+    LABELS,
+    SIMILARITY_INDEX_DIR,
+    SimilarityIndex,
+    minhash,
+    snippet,
+    write_index,
+)
+
+__all__ = [
+    "main",
+]
+
+DATASETS = Path(__file__).resolve().parent.parent / "datasets"
+
+
+def _build(args) -> int:
+    signatures: List[np.ndarray] = []
+    labels: List[int] = []
+    texts: List[str] = []
+    seen = set()
+    for label, files in (("attack", args.attacks), ("benign", args.benign or [])):
+        for path in files:
+            for line in path.read_text(encoding="utf-8").splitlines():
+                text = line.strip()
+                sig = minhash(text) if text else None
+                if sig is None or sig.tobytes() in seen:
+                    continue
+                seen.add(sig.tobytes())
+                signatures.append(sig)
+                labels.append(LABELS.index(label))
+                texts.append(text)
+    t0 = time.perf_counter()
+    meta = write_index(args.output, signatures, labels, texts)
+    print(f"version {meta['version']}: {meta['entries']} entries {meta['labels']}")
+    size = sum(f.stat().st_size for f in args.output.iterdir())
+    print(f"written in {(time.perf_counter() - t0) * 1000:.1f} ms → {args.output} ({size / 1e6:.2f} MB)")
+    return 0
+
+
+def _add(args) -> int:
+    index = SimilarityIndex(args.index)
+    for text in args.texts:
+        index.add(text, args.label)
+    print(f"{len(args.texts)} {args.label} entr{'y' if len(args.texts) == 1 else 'ies'} journaled "
+          f"→ {index.journal}; version {index.version}")
+    return 0
+
+
+def _remove(args) -> int:
+    index = SimilarityIndex(args.index)
+    for done, entry_id in enumerate(args.ids):
+        try:
+            index.remove(entry_id)
+        except KeyError as e:
+            print(f"{e.args[0]}; {done} removal(s) before it journaled", file=sys.stderr)
+            return 1
+    print(f"{len(args.ids)} removal{'' if len(args.ids) == 1 else 's'} journaled → {index.journal}; "
+          f"version {index.version}")
+    return 0
+
+
+def _compact(args) -> int:
+    index = SimilarityIndex(args.index)
+    folded = index.stats()["journal_entries"]
+    meta = index.compact()
+    print(f"version {meta['version']}: {meta['entries']} entries ({folded} from the journal)")
+    return 0
+
+
+def _query(args) -> int:
+    index = SimilarityIndex(args.index)
+    for text in args.texts:
+        t0 = time.perf_counter()
+        match = index.query(text)
+        us = (time.perf_counter() - t0) * 1e6
+        if match is None:
+            print(f"no candidate ({us:.0f} µs): {snippet(text)!r}")
+        else:
+            print(f"{match.similarity:.3f} {match.label} #{match.id} ({us:.0f} µs): {snippet(match.text)!r}")
+    return 0
+
+
+def _show(args) -> int:
+    t0 = time.perf_counter()
+    index = SimilarityIndex(args.index)
+    open_ms = (time.perf_counter() - t0) * 1000
+    stats = index.stats()
+    print(f"version {stats['version']}: {stats['entries']} entries {stats['labels']}, "
+          f"{stats['journal_entries']} added and {stats['journal_removals']} removed through the journal")
+    print(f"opened in {open_ms:.1f} ms from {index.directory}")
+    return 0
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(prog="sentinel-similarity", description="Near-duplicate index of known prompts.")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build")
+    build.add_argument("--attacks", type=Path, action="append", help="known attacks, one per line (repeatable)")
+    build.add_argument("--benign", type=Path, action="append", help="known-benign prompts, one per line (repeatable)")
+    build.add_argument("-o", "--output", type=Path, default=SIMILARITY_INDEX_DIR)
+    build.set_defaults(fn=_build)
+
+    for name, fn in (("add", _add), ("remove", _remove), ("compact", _compact), ("query", _query), ("show", _show)):
+        cmd = commands.add_parser(name)
+        cmd.add_argument("--index", type=Path, default=SIMILARITY_INDEX_DIR)
+        cmd.set_defaults(fn=fn)
+        if name in ("add", "query"):
+            cmd.add_argument("texts", nargs="+")
+    commands.choices["add"].add_argument("--label", choices=LABELS, default="attack")
+    commands.choices["remove"].add_argument("ids", nargs="+", type=int)
+
+    args = parser.parse_args(argv)
+    if args.command == "build" and not args.attacks:
+        args.attacks = [DATASETS / "malicious.txt"]
+    return args.fn(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
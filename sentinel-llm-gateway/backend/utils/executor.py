@@ -0,0 +1,93 @@
+"""
+Sentinel Detection Executor
+Where the CPU-bound detection pipeline runs relative to the event loop.
+
+Modes:
+    • inline  — call directly on the event loop (lowest overhead, but one
+                long prompt stalls every other request on the worker)
+    • thread  — ThreadPoolExecutor; keeps the loop responsive, though
+                pure-Python stages still contend for the GIL
+    • process — ProcessPoolExecutor; true parallelism. Each worker runs
+                `initializer` once (e.g. to load the model), and only the
+                prompt text and small result records are pickled across.
+
+With `on_wait` set, each pooled call also reports how long it waited for a
+worker (seconds, on the event loop thread) — the executor's queue delay.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import os
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Optional, Tuple
+
+__all__ = [
+    "EXECUTOR_MODES",
+    "DetectionExecutor",
+]
+
+EXECUTOR_MODES = ("inline", "thread", "process")
+
+
+def _timed(fn: Callable[..., Any], *args: Any) -> Tuple[float, Any]:
+    # Runs in the worker; time.monotonic() is one system-wide clock on Linux
+    return time.monotonic(), fn(*args)
+
+
+class DetectionExecutor:
+    def __init__(
+        self,
+        mode: str = "inline",
+        workers: Optional[int] = None,
+        initializer: Optional[Callable[[], None]] = None,
+        on_wait: Optional[Callable[[float], None]] = None,
+    ):
+        if mode not in EXECUTOR_MODES:
+            raise ValueError(f"Unknown executor mode {mode!r}; expected one of {EXECUTOR_MODES}")
+        self.mode = mode
+        self.workers = workers or os.cpu_count() or 2
+        self.initializer = initializer
+        self.on_wait = on_wait
+        self._pool: Optional[Executor] = None
+
+    def _ensure_pool(self) -> Executor:
+        if self._pool is None:
+            if self.mode == "thread":
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.workers, thread_name_prefix="sentinel-detect"
+                )
+            else:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.workers, initializer=self.initializer
+                )
+        return self._pool
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run `fn(*args)` according to the configured mode."""
+        if self.mode == "inline":
+            return fn(*args)
+        loop = asyncio.get_running_loop()
+        if self.on_wait is None:
+            return await loop.run_in_executor(self._ensure_pool(), fn, *args)
+        submitted = time.monotonic()
+        started, result = await loop.run_in_executor(self._ensure_pool(), _timed, fn, *args)
+        self.on_wait(max(0.0, started - submitted))
+        return result
+
+    async def warm(self, fn: Callable[..., Any], *args: Any) -> None:
+        """
+        Start the pool and run `fn(*args)` once per worker slot, concurrently,
+        so the first requests do not pay for process start-up and
+        `initializer` (pools start workers on demand). Inline: one call.
+        """
+        if self.mode == "inline":
+            fn(*args)
+            return
+        await asyncio.gather(*(self.run(fn, *args) for _ in range(self.workers)))
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._pool is not None:
+            self._pool.shutdown(wait=wait)
+            self._pool = None
@@ -0,0 +1,237 @@
+"""
+Sentinel Load Shedder
+Admission control for the detection routes, driven by measured queue delay.
+
+The per-client rate limiter cannot help when many legitimate clients arrive
+at once; this looks at the gateway itself. Queue delay is sampled from:
+    • the event loop — a probe task sleeps `probe_ms` and records how late it
+                       wakes up, i.e. how long a request that just arrived
+                       waits behind inline detection work
+    • the executor   — how long each detection call waited for a pool slot
+                       (DetectionExecutor's `on_wait`)
+
+Every `interval_ms` the controller takes, per source, the *minimum* delay of
+the interval (CoDel's "standing queue": a burst that drains within the
+interval does not count, a queue that never drains does), and the larger of
+the two, and moves at most one step:
+
+    normal ──▶ degraded ──▶ shed         standing delay > target
+    normal ◀── degraded ◀── shed         `recover_intervals` in a row < target / 2
+
+    • degraded — routes run detection without the ML stage (compiled
+                 heuristics and rules only); every request is still answered
+    • shed     — as degraded, and a request arriving while the delay is over
+                 target is answered 503 with Retry-After instead
+`degrade=False` leaves out the degraded step. In any mode, requests beyond
+`max_in_flight` concurrent ones are rejected.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import math
+import time
+from typing import Any, Callable, Dict, Optional, Sequence
+
+__all__ = [
+    "LOAD_MODES",
+    "Overloaded",
+    "LoadShedder",
+    "AdmissionControl",
+]
+
+LOAD_MODES = ("normal", "degraded", "shed")
+DELAY_SOURCES = ("loop", "executor")
+
+
+class Overloaded(Exception):
+    def __init__(self, mode: str, retry_after: int):
+        super().__init__(f"overloaded ({mode}); retry after {retry_after} s")
+        self.mode = mode
+        self.retry_after = retry_after
+
+
+class LoadShedder:
+    def __init__(
+        self,
+        target_ms: float = 50.0,
+        interval_ms: float = 500.0,
+        recover_intervals: int = 4,
+        max_in_flight: int = 256,
+        degrade: bool = True,
+        probe_ms: float = 10.0,
+        on_mode_change: Optional[Callable[[str, str, float], None]] = None,
+    ):
+        self.target = target_ms / 1000.0
+        self.interval = interval_ms / 1000.0
+        self.recover_intervals = recover_intervals
+        self.max_in_flight = max_in_flight
+        self.probe = probe_ms / 1000.0
+        self.on_mode_change = on_mode_change          # (old, new, standing delay)
+        self._ladder = LOAD_MODES if degrade else ("normal", "shed")
+
+        self.mode = "normal"
+        self.in_flight = 0
+        self.standing = 0.0                       # seconds, last completed interval
+        self._mins: Dict[str, float] = {}         # source → min delay this interval
+        self._interval_end = time.monotonic() + self.interval
+        self._calm = 0
+
+        self.admitted = 0
+        self.rejected = 0
+        self.changes = 0
+        self.peak_in_flight = 0
+        self._mode_since = time.monotonic()
+        self._mode_seconds = {m: 0.0 for m in self._ladder}
+
+    # ---------------- signals ----------------
+
+    def observe(self, delay: float, source: str = "executor", now: Optional[float] = None) -> None:
+        """One queue-delay sample (seconds) from `source`."""
+        now = time.monotonic() if now is None else now
+        if now >= self._interval_end:
+            self._tick(now)
+        best = self._mins.get(source)
+        if best is None or delay < best:
+            self._mins[source] = delay
+
+    def _delay(self) -> float:
+        # Standing delay of the interval so far; one source with a queue is enough
+        return max(self._mins.values()) if self._mins else self.standing
+
+    def _tick(self, now: float) -> None:
+        standing = max(self._mins.values()) if self._mins else 0.0    # no samples → idle
+        self.standing = standing
+        self._mins = {}
+        self._interval_end = now + self.interval
+        step = self._ladder.index(self.mode)
+        if standing > self.target:
+            self._calm = 0
+            if step + 1 < len(self._ladder):
+                self._set_mode(self._ladder[step + 1], now)
+        elif standing < self.target / 2:
+            self._calm += 1
+            if self._calm >= self.recover_intervals and step > 0:
+                self._calm = 0
+                self._set_mode(self._ladder[step - 1], now)
+        else:
+            self._calm = 0
+
+    def _set_mode(self, mode: str, now: float) -> None:
+        old = self.mode
+        self._mode_seconds[old] += now - self._mode_since
+        self._mode_since = now
+        self.mode = mode
+        self.changes += 1
+        if self.on_mode_change is not None:
+            try:
+                self.on_mode_change(old, mode, self.standing)
+            except Exception:
+                pass
+
+    async def run_probe(self) -> None:
+        """Event-loop lag probe; run as a background task for the app's lifetime."""
+        while True:
+            t0 = time.monotonic()
+            await asyncio.sleep(self.probe)
+            now = time.monotonic()
+            self.observe(max(0.0, now - t0 - self.probe), "loop", now)
+
+    # ---------------- admission ----------------
+
+    def retry_after(self) -> int:
+        # The soonest the controller could step back down
+        return max(1, math.ceil(self.recover_intervals * self.interval))
+
+    def admit(self, now: Optional[float] = None) -> str:
+        """Admit one request and return the mode it runs in, or raise Overloaded."""
+        now = time.monotonic() if now is None else now
+        if now >= self._interval_end:
+            self._tick(now)
+        if self.in_flight >= self.max_in_flight or (self.mode == "shed" and self._delay() > self.target):
+            self.rejected += 1
+            raise Overloaded(self.mode, self.retry_after())
+        self.in_flight += 1
+        self.admitted += 1
+        if self.in_flight > self.peak_in_flight:
+            self.peak_in_flight = self.in_flight
+        return self.mode
+
+    def release(self) -> None:
+        self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        seconds = dict(self._mode_seconds)
+        seconds[self.mode] += time.monotonic() - self._mode_since
+        return {
+            "mode": self.mode,
+            "modes": list(self._ladder),
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "max_in_flight": self.max_in_flight,
+            "standing_delay_ms": round(self.standing * 1000.0, 3),
+            "target_ms": self.target * 1000.0,
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+            "mode_changes": self.changes,
+            "seconds_in_mode": {m: round(s, 3) for m, s in seconds.items()},
+        }
+
+
+# ========================= ASGI ========================= #
+
+class AdmissionControl:
+    """
+    Pure ASGI middleware around the routes in `routes`: admit() before the
+    route runs and release() once its response is complete. Rejected requests
+    get 503 + Retry-After without reaching the route. Admitted ones carry
+    their mode in `x-sentinel-mode` and in `request.state.load_mode`.
+    """
+
+    def __init__(
+        self,
+        app,
+        shedder: LoadShedder,
+        routes: Sequence[str],
+        on_reject: Optional[Callable[[str, Overloaded], None]] = None,
+    ):
+        self.app = app
+        self.shedder = shedder
+        self.routes = frozenset(routes)
+        self._on_reject = on_reject
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.routes:
+            return await self.app(scope, receive, send)
+        try:
+            mode = self.shedder.admit()
+        except Overloaded as e:
+            if self._on_reject is not None:
+                self._on_reject(scope["path"], e)
+            body = json.dumps({"detail": "Sentinel is overloaded; retry later.", "mode": e.mode}).encode()
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-type", b"application/json"),
+                    (b"content-length", str(len(body)).encode()),
+                    (b"retry-after", str(e.retry_after).encode()),
+                    (b"x-sentinel-mode", e.mode.encode()),
+                ],
+            })
+            await send({"type": "http.response.body", "body": body})
+            return
+
+        scope.setdefault("state", {})["load_mode"] = mode
+        header = (b"x-sentinel-mode", mode.encode())
+
+        async def send_mode(message):
+            if message["type"] == "http.response.start":
+                message = {**message, "headers": [*message.get("headers", ()), header]}
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_mode)
+        finally:
+            self.shedder.release()
@@ -0,0 +1,305 @@
+"""
+Sentinel Metrics
+In-process counters, gauges and latency histograms, exported in the
+Prometheus text format (version 0.0.4) by `/metrics`.
+
+Built to stay on in production:
+    • a labelled child is resolved once (`family.labels(...)`) and kept by
+      the caller, so the hot path never hashes label values
+    • histograms take nanoseconds from `time.perf_counter_ns()` and find
+      their bucket with one bisect over integer bounds; with scale=1 they
+      count plain integers instead (batch sizes, queue depths)
+    • every update is a few integer additions with no lock: the gateway
+      records from the event loop thread, and a caller that writes one
+      child from several threads (e.g. the ML hook under the thread
+      executor) serializes those writes itself
+
+Rendering takes a snapshot of every child; it is meant for a scrape every
+few seconds, not for the request path.
+"""
+
+from __future__ import annotations
+
+import threading
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+__all__ = [
+    "CONTENT_TYPE",
+    "DEFAULT_BUCKETS",
+    "Counter",
+    "Gauge",
+    "Histogram",
+    "MetricsRegistry",
+    "RequestMetrics",
+]
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Seconds; spans a cached rate-limit check up to a slow upstream completion
+DEFAULT_BUCKETS = (
+    0.00001, 0.000025, 0.00005, 0.0001, 0.00025, 0.0005,
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _number(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+# ========================= VALUES ========================= #
+
+class _CounterValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0
+
+    def inc(self, amount: int = 1) -> None:
+        self.value += amount
+
+
+class _GaugeValue:
+    __slots__ = ("value",)
+
+    def __init__(self):
+        self.value = 0.0
+
+    def set(self, value: float) -> None:
+        self.value = value
+
+
+class _HistogramValue:
+    __slots__ = ("bounds_ns", "counts", "sum_ns", "count")
+
+    def __init__(self, bounds_ns: Tuple[int, ...]):
+        self.bounds_ns = bounds_ns
+        self.counts = [0] * (len(bounds_ns) + 1)     # last slot: +Inf
+        self.sum_ns = 0
+        self.count = 0
+
+    def observe_ns(self, ns: int, n: int = 1) -> None:
+        """Record `n` observations of `ns` nanoseconds each."""
+        self.counts[bisect_left(self.bounds_ns, ns)] += n
+        self.sum_ns += ns * n
+        self.count += n
+
+    # Histograms with scale=1 record integers as they are
+    observe = observe_ns
+
+
+# ========================= FAMILIES ========================= #
+
+class _Family:
+    kind = ""
+
+    def __init__(self, name: str, help: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        """The child for these label values (created on first use); keep it."""
+        if len(values) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {values!r}")
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            with self._lock:
+                child = self._children.setdefault(key, self._new())
+        return child
+
+    def _items(self) -> List[Tuple[Tuple[str, ...], object]]:
+        with self._lock:
+            return sorted(self._children.items())
+
+    def render(self) -> Iterator[str]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} {self.kind}"
+        for values, child in self._items():
+            yield from self._samples(values, child)
+
+    def _samples(self, values, child) -> Iterator[str]:
+        yield f"{self.name}{_labels(self.labelnames, values)} {_number(child.value)}"
+
+
+class Counter(_Family):
+    kind = "counter"
+
+    def _new(self):
+        return _CounterValue()
+
+
+class Gauge(_Family):
+    kind = "gauge"
+
+    def _new(self):
+        return _GaugeValue()
+
+
+class Histogram(_Family):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        scale: float = 1e9,
+    ):
+        # Observations are integers in bucket units × scale: 1e9 → seconds
+        # recorded as nanoseconds (observe_ns), 1 → counts (observe)
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.scale = scale
+        self._bounds_ns = tuple(int(round(b * scale)) for b in self.buckets)
+
+    def _new(self):
+        return _HistogramValue(self._bounds_ns)
+
+    def _samples(self, values, child) -> Iterator[str]:
+        counts, sum_ns, count = list(child.counts), child.sum_ns, child.count
+        cumulative = 0
+        for bound, c in zip(self.buckets + (float("inf"),), counts):
+            cumulative += c
+            le = f'le="{_number(bound)}"'
+            yield f"{self.name}_bucket{_labels(self.labelnames, values, le)} {cumulative}"
+        yield f"{self.name}_sum{_labels(self.labelnames, values)} {_number(sum_ns / self.scale)}"
+        yield f"{self.name}_count{_labels(self.labelnames, values)} {count}"
+
+    def snapshot(self, *values: str) -> Dict[str, object]:
+        """Per-bucket (non-cumulative) counts, count and sum of one child, for /stats."""
+        child = self.labels(*values)
+        labels = [_number(b) for b in self.buckets] + ["+Inf"]
+        return {
+            "buckets": dict(zip(labels, child.counts)),
+            "count": child.count,
+            "sum": child.sum_ns / self.scale,
+        }
+
+
+class MetricsRegistry:
+    def __init__(self):
+        self._families: List[_Family] = []
+        # (name, help, labelnames, read) — read() → {label values: value} at scrape time
+        self._gauge_callbacks: List[Tuple[str, str, Tuple[str, ...], Callable[[], Dict[Tuple[str, ...], float]]]] = []
+
+    def _add(self, family: _Family) -> _Family:
+        if any(f.name == family.name for f in self._families):
+            raise ValueError(f"Metric {family.name} already registered")
+        self._families.append(family)
+        return family
+
+    def counter(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._add(Counter(name, help, labelnames))
+
+    def gauge(self, name: str, help: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._add(Gauge(name, help, labelnames))
+
+    def histogram(
+        self,
+        name: str,
+        help: str,
+        labelnames: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        scale: float = 1e9,
+    ) -> Histogram:
+        return self._add(Histogram(name, help, labelnames, buckets, scale))
+
+    def gauge_callback(
+        self, name: str, help: str, labelnames: Sequence[str], read: Callable[[], Dict[Tuple[str, ...], float]]
+    ) -> None:
+        """A gauge computed at scrape time (e.g. from a component's stats())."""
+        self._gauge_callbacks.append((name, help, tuple(labelnames), read))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for family in self._families:
+            lines.extend(family.render())
+        for name, help, labelnames, read in self._gauge_callbacks:
+            lines.append(f"# HELP {name} {help}")
+            lines.append(f"# TYPE {name} gauge")
+            for values, value in sorted(read().items()):
+                lines.append(f"{name}{_labels(labelnames, values)} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+
+# ========================= ASGI ========================= #
+
+class RequestMetrics:
+    """
+    Pure ASGI middleware: latency histogram and response counter per route.
+    Paths outside `routes` are reported as "other" to bound label cardinality;
+    either instrument may be None. `on_start(route)` / `on_end(token)` bracket every request (e.g. a
+    SlowRequestProfiler) when given.
+    """
+
+    def __init__(
+        self,
+        app,
+        latency: Optional[Histogram],
+        responses: Optional[Counter],
+        routes: Sequence[str],
+        on_start: Optional[Callable[[str], object]] = None,
+        on_end: Optional[Callable[[object], None]] = None,
+    ):
+        self.app = app
+        self.routes = frozenset(routes)
+        self._latency = latency
+        self._responses = responses
+        # Children resolved on first use: route → histogram, (route, status) → counter
+        self._timers: Dict[str, _HistogramValue] = {}
+        self._counts: Dict[Tuple[str, int], _CounterValue] = {}
+        self._on_start = on_start
+        self._on_end = on_end
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        route = scope["path"] if scope["path"] in self.routes else "other"
+        status = 500
+        token = self._on_start(route) if self._on_start is not None else None
+        t0 = time.perf_counter_ns()
+
+        async def send_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_status)
+        finally:
+            if self._latency is not None:
+                timer = self._timers.get(route)
+                if timer is None:
+                    timer = self._timers[route] = self._latency.labels(route)
+                timer.observe_ns(time.perf_counter_ns() - t0)
+            if self._responses is not None:
+                counter = self._counts.get((route, status))
+                if counter is None:
+                    counter = self._counts[route, status] = self._responses.labels(route, str(status))
+                counter.inc()
+            if token is not None:
+                self._on_end(token)
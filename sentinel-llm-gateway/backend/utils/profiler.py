@@ -0,0 +1,135 @@
+"""
+Sentinel Slow-Request Profiler
+Opt-in sampling profiler that only looks at requests already running slow.
+
+Every request is bracketed by start() / stop(), which costs a dict insert
+and pop. A daemon thread wakes every `interval_ms` and, for each request in
+flight for longer than `threshold_ms`, samples the current stack of the
+thread the request started on (the event loop thread — where detection
+runs with the inline executor). When such a request ends, its samples are
+collapsed into "module:function;…" stacks (root first, the format flame
+graph tools read) and the profile is kept in a ring of the last `keep`.
+
+Samples show what the thread was doing while the request was slow, which on
+an event loop may be another request's work; off-loop executor modes show up
+as the loop waiting.
+"""
+
+from __future__ import annotations
+
+import itertools
+import logging
+import sys
+import threading
+import time
+from collections import Counter as _Tally
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional
+
+__all__ = [
+    "SlowRequestProfiler",
+]
+
+logger = logging.getLogger("sentinel")
+
+_TOP_STACKS = 10                # stacks reported per profile
+
+
+class _InFlight:
+    __slots__ = ("route", "started", "thread_id", "samples")
+
+    def __init__(self, route: str, thread_id: int):
+        self.route = route
+        self.started = time.perf_counter()
+        self.thread_id = thread_id
+        self.samples: Optional[_Tally] = None      # created on the first sample
+
+
+class SlowRequestProfiler:
+    def __init__(self, threshold_ms: float, interval_ms: float = 5.0, keep: int = 20, max_depth: int = 48):
+        if threshold_ms <= 0 or interval_ms <= 0:
+            raise ValueError("threshold_ms and interval_ms must be positive")
+        self.threshold = threshold_ms / 1000.0
+        self.interval = interval_ms / 1000.0
+        self.max_depth = max_depth
+        self.profiles: Deque[Dict[str, Any]] = deque(maxlen=keep)
+        self.slow_requests = 0
+
+        self._active: Dict[int, _InFlight] = {}
+        self._ids = itertools.count()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ---------------- request path ----------------
+
+    def start(self, route: str) -> int:
+        if self._thread is None:
+            self._start_sampler()
+        token = next(self._ids)
+        self._active[token] = _InFlight(route, threading.get_ident())
+        return token
+
+    def stop(self, token: int) -> None:
+        req = self._active.pop(token, None)
+        if req is None or req.samples is None:
+            return
+        duration_ms = (time.perf_counter() - req.started) * 1000.0
+        total = sum(req.samples.values())
+        self.slow_requests += 1
+        self.profiles.append({
+            "route": req.route,
+            "duration_ms": round(duration_ms, 3),
+            "samples": total,
+            "interval_ms": self.interval * 1000.0,
+            "stacks": [{"stack": s, "samples": n} for s, n in req.samples.most_common(_TOP_STACKS)],
+        })
+        logger.warning(
+            f"[Sentinel] SLOW REQUEST {req.route} | {duration_ms:.1f} ms | "
+            f"top: {req.samples.most_common(1)[0][0].rsplit(';', 1)[-1]}"
+        )
+
+    # ---------------- sampler ----------------
+
+    def _start_sampler(self) -> None:
+        self._thread = threading.Thread(target=self._run, name="sentinel-profiler", daemon=True)
+        self._thread.start()
+
+    def _run(self) -> None:
+        me = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            if not self._active:
+                continue
+            cutoff = time.perf_counter() - self.threshold
+            slow = [r for r in list(self._active.values()) if r.started <= cutoff and r.thread_id != me]
+            if not slow:
+                continue
+            frames = sys._current_frames()
+            stacks: Dict[int, str] = {}
+            for req in slow:
+                if req.thread_id not in stacks:
+                    frame = frames.get(req.thread_id)
+                    stacks[req.thread_id] = self._collapse(frame) if frame is not None else "<idle>"
+                if req.samples is None:
+                    req.samples = _Tally()
+                req.samples[stacks[req.thread_id]] += 1
+            del frames
+
+    def _collapse(self, frame) -> str:
+        names: List[str] = []
+        while frame is not None and len(names) < self.max_depth:
+            code = frame.f_code
+            names.append(f"{frame.f_globals.get('__name__', '?')}:{code.co_name}")
+            frame = frame.f_back
+        return ";".join(reversed(names))
+
+    def close(self) -> None:
+        self._stop.set()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "threshold_ms": self.threshold * 1000.0,
+            "interval_ms": self.interval * 1000.0,
+            "in_flight": len(self._active),
+            "slow_requests": self.slow_requests,
+            "profiles": list(self.profiles),
+        }
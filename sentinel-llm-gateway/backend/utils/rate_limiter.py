@@ -0,0 +1,181 @@
+"""
+Sentinel Rate Limiter
+Sliding-window counter with O(1) memory and work per key.
+
+Instead of a list of timestamps per client, each key keeps three integers:
+the current fixed window, its count, and the previous window's count. The
+request rate is estimated as
+
+    prev × (1 − elapsed fraction of current window) + current
+
+which tracks a true sliding log closely without storing individual requests.
+Idle keys are swept periodically, so a spread of one-off source IPs cannot
+grow the table without bound.
+
+Backends:
+    • memory — per-process dict of `__slots__` counters
+    • redis  — same algorithm in a Lua script against any Redis-compatible
+               server (Redis, Valkey, KeyDB …), shared by all workers; uses
+               redis.asyncio (optional dependency, `pip install redis`), so
+               `hit` is a coroutine and never blocks the event loop
+
+If the Redis server is down or slow, `hit` does not raise: after `timeout`
+seconds the request is allowed (fail="open") or rejected (fail="closed"),
+the error is counted, and `on_error` is told once per outage — with the
+exception when it starts and with None when the server answers again.
+"""
+
+from __future__ import annotations
+
+import time
+from typing import Callable, Dict, Optional
+
+__all__ = [
+    "RATE_LIMIT_BACKENDS",
+    "RATE_LIMIT_FAIL_POLICIES",
+    "SlidingWindowLimiter",
+    "RedisSlidingWindowLimiter",
+    "make_rate_limiter",
+]
+
+RATE_LIMIT_BACKENDS = ("memory", "redis")
+RATE_LIMIT_FAIL_POLICIES = ("open", "closed")
+
+
+class _Counter:
+    __slots__ = ("window", "count", "prev")
+
+    def __init__(self, window: int):
+        self.window = window
+        self.count = 0
+        self.prev = 0
+
+
+class SlidingWindowLimiter:
+    asynchronous = False
+
+    def __init__(self, limit: int, window: float, sweep_interval: Optional[float] = None):
+        self.limit = limit
+        self.window = float(window)
+        self.sweep_interval = sweep_interval if sweep_interval is not None else self.window
+        self._counters: Dict[str, _Counter] = {}
+        self._last_sweep = 0.0
+
+    def hit(self, key: str, now: Optional[float] = None) -> bool:
+        """Count one request for `key`; False if it would exceed the limit."""
+        now = time.time() if now is None else now
+        pos = now / self.window
+        w = int(pos)
+
+        c = self._counters.get(key)
+        if c is None:
+            c = self._counters[key] = _Counter(w)
+        elif c.window != w:
+            c.prev = c.count if c.window == w - 1 else 0
+            c.count = 0
+            c.window = w
+
+        if now - self._last_sweep >= self.sweep_interval:
+            self._sweep(w, now)
+
+        if c.prev * (1.0 - (pos - w)) + c.count >= self.limit:
+            return False
+        c.count += 1
+        return True
+
+    def _sweep(self, w: int, now: float) -> None:
+        # A key idle for a whole window carries no state worth keeping
+        self._last_sweep = now
+        stale = [k for k, c in self._counters.items() if c.window < w - 1]
+        for k in stale:
+            del self._counters[k]
+
+    def __len__(self) -> int:
+        return len(self._counters)
+
+    async def aclose(self) -> None:
+        pass
+
+
+# Same estimate as SlidingWindowLimiter, evaluated atomically server-side.
+_REDIS_SCRIPT = """
+local cur = tonumber(redis.call('GET', KEYS[1]) or '0')
+local prev = tonumber(redis.call('GET', KEYS[2]) or '0')
+if prev * tonumber(ARGV[2]) + cur >= tonumber(ARGV[1]) then
+    return 0
+end
+redis.call('INCR', KEYS[1])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+
+class RedisSlidingWindowLimiter:
+    """Shared limiter; keys expire on their own after two windows."""
+
+    asynchronous = True
+
+    def __init__(
+        self,
+        limit: int,
+        window: float,
+        url: str,
+        prefix: str = "sentinel:rl",
+        timeout: float = 0.1,
+        fail: str = "open",
+        on_error: Optional[Callable[[Optional[BaseException]], None]] = None,
+    ):
+        try:
+            import redis.asyncio as aioredis  # optional dependency
+            from redis import RedisError
+        except ImportError as e:  # pragma: no cover - depends on environment
+            raise RuntimeError("The redis rate-limit backend requires `pip install redis`") from e
+        if fail not in RATE_LIMIT_FAIL_POLICIES:
+            raise ValueError(f"Unknown rate-limit fail policy {fail!r}; expected one of {RATE_LIMIT_FAIL_POLICIES}")
+        self.limit = limit
+        self.window = float(window)
+        self.prefix = prefix
+        self.fail_open = fail == "open"
+        self.on_error = on_error
+        self.errors = 0
+        self.failing = False
+        self._errors = (RedisError, OSError)
+        self._client = aioredis.Redis.from_url(url, socket_timeout=timeout, socket_connect_timeout=timeout)
+        self._script = self._client.register_script(_REDIS_SCRIPT)
+        self._ttl = max(1, int(2 * self.window + 1))
+
+    async def hit(self, key: str, now: Optional[float] = None) -> bool:
+        now = time.time() if now is None else now
+        pos = now / self.window
+        w = int(pos)
+        keys = [f"{self.prefix}:{key}:{w}", f"{self.prefix}:{key}:{w - 1}"]
+        try:
+            allowed = bool(await self._script(keys=keys, args=[self.limit, 1.0 - (pos - w), self._ttl]))
+        except self._errors as e:
+            self.errors += 1
+            if not self.failing:
+                self.failing = True
+                self._notify(e)
+            return self.fail_open
+        if self.failing:
+            self.failing = False
+            self._notify(None)
+        return allowed
+
+    def _notify(self, error: Optional[BaseException]) -> None:
+        if self.on_error is not None:
+            try:
+                self.on_error(error)
+            except Exception:
+                pass
+
+    async def aclose(self) -> None:
+        await self._client.aclose()
+
+
+def make_rate_limiter(backend: str, limit: int, window: float, redis_url: str = "", **redis_options):
+    if backend == "memory":
+        return SlidingWindowLimiter(limit, window)
+    if backend == "redis":
+        return RedisSlidingWindowLimiter(limit, window, redis_url or "redis://localhost:6379/0", **redis_options)
+    raise ValueError(f"Unknown rate-limit backend {backend!r}; expected one of {RATE_LIMIT_BACKENDS}")
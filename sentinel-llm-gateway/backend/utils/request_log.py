@@ -0,0 +1,225 @@
+"""
+Sentinel Request Log
+Per-request log records, off the event loop.
+
+Two modes:
+    • text — records go straight to the "sentinel" logger as one
+             "[Sentinel] EVENT | key=value …" line; the line is only built
+             if the logger is enabled for that level
+    • json — the request path appends a (time, level, event, fields) tuple
+             to a bounded in-memory queue and returns; a writer thread
+             drains it every `flush_ms`, renders one JSON object per line
+             and writes each batch with a single write(). `handler()` sends
+             ordinary logging records through the same queue, so nothing on
+             the loop blocks on the stream
+
+In both modes ALLOW decisions are sampled: a fraction `allow_sample` of them
+is logged (evenly spaced, no RNG), with the rate in the record so counts can
+be scaled back up. BLOCK and SANITIZE decisions are always logged.
+
+A full queue drops the new record and counts it rather than make the
+request wait; records still queued at close() are written out.
+"""
+
+from __future__ import annotations
+
+import atexit
+import json
+import logging
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, TextIO, Tuple
+
+__all__ = [
+    "LOG_MODES",
+    "RequestLog",
+]
+
+LOG_MODES = ("text", "json")
+
+_DECISION_LEVELS = {"allow": logging.INFO, "sanitize": logging.INFO, "block": logging.WARNING}
+
+
+class _Fields:
+    """key=value rendering of a record's fields, built only when the line is."""
+
+    __slots__ = ("fields",)
+
+    def __init__(self, fields: Dict[str, Any]):
+        self.fields = fields
+
+    def __str__(self) -> str:
+        parts = []
+        for key, value in self.fields.items():
+            if isinstance(value, float):
+                value = f"{value:.2f}"
+            elif isinstance(value, (list, tuple)):
+                value = "; ".join(map(str, value)) or "none"
+            parts.append(f"{key}={value}")
+        return " ".join(parts)
+
+
+class _QueueHandler(logging.Handler):
+    """Hands logging records to the writer thread unformatted."""
+
+    def __init__(self, log: RequestLog):
+        super().__init__()
+        self._log = log
+
+    def emit(self, record: logging.LogRecord) -> None:
+        self._log._put((record.created, record.levelno, None, record))
+
+
+class RequestLog:
+    def __init__(
+        self,
+        mode: str = "text",
+        allow_sample: float = 1.0,
+        max_queue: int = 10000,
+        flush_ms: float = 50.0,
+        batch: int = 512,
+        stream: Optional[TextIO] = None,
+        logger: Optional[logging.Logger] = None,
+        level: int = logging.INFO,
+    ):
+        if mode not in LOG_MODES:
+            raise ValueError(f"Unknown log mode {mode!r} (expected one of {LOG_MODES})")
+        if not 0.0 <= allow_sample <= 1.0:
+            raise ValueError("allow_sample must be between 0 and 1")
+        self.mode = mode
+        self.allow_sample = allow_sample
+        self.max_queue = max_queue
+        self.flush_interval = flush_ms / 1000.0
+        self.batch = batch
+        self.level = level
+        self._stream = stream
+        self._logger = logger or logging.getLogger("sentinel")
+        self._formatter = logging.Formatter()
+
+        self._credit = 0.0
+        self._queue: Deque[Tuple[float, int, Optional[str], Any]] = deque()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()       # one batch write at a time (writer vs close)
+        self.logged = 0
+        self.sampled_out = 0
+        self.dropped = 0
+        self.written = 0
+        self.batches = 0
+
+        if hasattr(os, "register_at_fork"):
+            # A forked worker has a copy of the queue but no writer thread
+            os.register_at_fork(after_in_child=self._after_fork)
+
+    # ---------------- request path ----------------
+
+    def event(self, level: int, event: str, **fields: Any) -> None:
+        if level < self.level:
+            return
+        self.logged += 1
+        if self.mode == "json":
+            self._put((time.time(), level, event, fields))
+        else:
+            self._logger.log(level, "[Sentinel] %s | %s", event.upper(), _Fields(fields))
+
+    def decision(self, status: str, **fields: Any) -> None:
+        """One moderation verdict; ALLOW is sampled at `allow_sample`."""
+        if status == "allow" and self.allow_sample < 1.0:
+            self._credit += self.allow_sample
+            if self._credit < 1.0:
+                self.sampled_out += 1
+                return
+            self._credit -= 1.0
+            fields["sample_rate"] = self.allow_sample
+        self.event(_DECISION_LEVELS.get(status, logging.INFO), status, **fields)
+
+    def _put(self, item: Tuple[float, int, Optional[str], Any]) -> None:
+        if len(self._queue) >= self.max_queue:
+            self.dropped += 1
+            return
+        self._queue.append(item)
+        if self._thread is None:
+            self._start_writer()
+
+    # ---------------- writer ----------------
+
+    def handler(self) -> logging.Handler:
+        """A logging handler that routes ordinary records through the queue (json mode)."""
+        return _QueueHandler(self)
+
+    def _start_writer(self) -> None:
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(target=self._run, name="sentinel-log-writer", daemon=True)
+            self._thread.start()
+        atexit.register(self.close)
+
+    def _after_fork(self) -> None:
+        self._queue = deque()
+        self._thread = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.flush_interval):
+            self._drain()
+
+    def _drain(self) -> None:
+        with self._lock:
+            queue = self._queue
+            stream = self._stream or sys.stderr
+            while queue:
+                lines: List[str] = []
+                for _ in range(min(len(queue), self.batch)):
+                    lines.append(self._render(*queue.popleft()))
+                try:
+                    stream.write("".join(lines))
+                    stream.flush()
+                except (OSError, ValueError):
+                    # Closed or broken stream: lose the batch, keep serving
+                    self.dropped += len(lines)
+                    continue
+                self.written += len(lines)
+                self.batches += 1
+
+    def _render(self, created: float, level: int, event: Optional[str], payload: Any) -> str:
+        record = {
+            "ts": round(created, 6),
+            "level": logging.getLevelName(level),
+        }
+        if event is not None:
+            record["event"] = event
+            record.update(payload)
+        else:
+            record["logger"] = payload.name
+            try:
+                record["message"] = payload.getMessage()
+            except Exception as e:
+                record["message"] = f"{payload.msg!r} (unformattable: {e!r})"
+            if payload.exc_info:
+                record["exc"] = self._formatter.formatException(payload.exc_info)
+        return json.dumps(record, default=str, separators=(",", ":")) + "\n"
+
+    def close(self) -> None:
+        """Stop the writer and write out what is still queued."""
+        self._stop.set()
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5)
+        self._drain()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "mode": self.mode,
+            "allow_sample": self.allow_sample,
+            "logged": self.logged,
+            "sampled_out": self.sampled_out,
+            "queued": len(self._queue),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+        }
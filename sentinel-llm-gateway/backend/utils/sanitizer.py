@@ -14,7 +14,7 @@ from __future__ import annotations
 
 import re
 from typing import List
-from engine.sentinel_heuristics import REGEX_RULES     # reuse compiled patterns
+from engine import sentinel_heuristics     # reuse compiled patterns
 
 
 # ========================= CONFIG ========================= #
@@ -44,7 +44,7 @@ def sanitize_prompt(prompt: str) -> str:
     cleaned = prompt
 
     # 2) Apply regex mask for every dangerous rule
-    for rule in REGEX_RULES:
+    for rule in sentinel_heuristics.current_rules().regex_rules:
         try:
             cleaned = rule.compiled.sub(MASK_TEXT, cleaned)
         except Exception:
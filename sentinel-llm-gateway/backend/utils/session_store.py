@@ -0,0 +1,230 @@
+"""
+Sentinel Session Store
+Per-conversation state for incremental multi-turn moderation.
+
+Chat clients re-send the whole history on every turn. Rather than rescanning
+it, a session remembers for each turn it has seen:
+    • a 16-byte BLAKE2b digest of (role, content)
+    • the verdict status and risk score
+plus the carry — the tail of the scanned text, needed to catch rule phrases
+that straddle a turn boundary. A request's digests are compared with the
+stored ones and only the turns after the common prefix need scanning.
+
+State is checked out as a detached copy and checked back in whole, so two
+overlapping requests for one conversation never interleave their updates —
+the last one to finish wins, and both copies are consistent.
+
+Sessions expire after `ttl` seconds idle, are dropped when the model or the
+decision policy changes (their verdicts would be stale), and are evicted
+least recently used beyond `max_sessions` or `max_bytes` (approximate).
+Every check-in moves its session to the back, so the store is in expiry
+order and expired sessions are swept from the front. A state larger than
+`max_bytes` on its own is not stored (the conversation is rescanned).
+"""
+
+from __future__ import annotations
+
+import hashlib
+import threading
+import time
+from array import array
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+__all__ = [
+    "STATUSES",
+    "turn_digest",
+    "SessionState",
+    "SessionStore",
+]
+
+STATUSES = ("allow", "sanitize", "block")
+
+_DIGEST_SIZE = 16
+_NOT_SCANNED = 255          # status code of turns outside the scanned roles
+_SESSION_OVERHEAD = 256     # rough fixed cost of one session (objects, key, LRU slot)
+
+
+def turn_digest(role: str, content: str) -> bytes:
+    h = hashlib.blake2b(digest_size=_DIGEST_SIZE)
+    h.update(role.encode("utf-8", "surrogatepass"))
+    h.update(b"\0")
+    h.update(content.encode("utf-8", "surrogatepass"))
+    return h.digest()
+
+
+class SessionState:
+    __slots__ = ("version", "digests", "statuses", "risks", "carry")
+
+    def __init__(self, version: str):
+        self.version = version                  # model hash + policy the verdicts were made under
+        self.digests = bytearray()              # _DIGEST_SIZE bytes per turn
+        self.statuses = bytearray()             # index into STATUSES, or _NOT_SCANNED
+        self.risks = array("d")
+        self.carry: Optional[str] = ""          # None → must be rebuilt from the history
+
+    @property
+    def turns(self) -> int:
+        return len(self.statuses)
+
+    @property
+    def nbytes(self) -> int:
+        return (
+            _SESSION_OVERHEAD
+            + len(self.digests)
+            + len(self.statuses)
+            + self.risks.itemsize * len(self.risks)
+            + len(self.carry or "")
+        )
+
+    def common_prefix(self, digests: bytes) -> int:
+        """Number of leading turns `digests` shares with this session."""
+        if digests.startswith(self.digests):
+            return self.turns
+        n = min(len(self.digests), len(digests)) // _DIGEST_SIZE
+        for i in range(n):
+            lo = i * _DIGEST_SIZE
+            if self.digests[lo:lo + _DIGEST_SIZE] != digests[lo:lo + _DIGEST_SIZE]:
+                return i
+        return n
+
+    def prefix(self, turns: int) -> "SessionState":
+        """Copy holding the first `turns` turns; the carry is kept only if nothing was cut."""
+        copy = SessionState(self.version)
+        copy.digests = self.digests[:turns * _DIGEST_SIZE]
+        copy.statuses = self.statuses[:turns]
+        copy.risks = self.risks[:turns]
+        copy.carry = self.carry if turns == self.turns else None
+        return copy
+
+    def append(self, digest: bytes, status: Optional[str], risk: float = 0.0) -> None:
+        """Record one turn; `status` None for a turn that is not scanned."""
+        self.digests += digest
+        self.statuses.append(_NOT_SCANNED if status is None else STATUSES.index(status))
+        self.risks.append(risk)
+
+    # ---------------- summary ----------------
+
+    def status(self) -> str:
+        """Worst verdict over every scanned turn."""
+        scanned = [s for s in self.statuses if s != _NOT_SCANNED]
+        return STATUSES[max(scanned)] if scanned else STATUSES[0]
+
+    def max_risk(self) -> float:
+        return max(self.risks, default=0.0)
+
+    def flagged(self) -> List[int]:
+        """Indices of the turns whose verdict was not "allow"."""
+        return [i for i, s in enumerate(self.statuses) if s != _NOT_SCANNED and s > 0]
+
+
+class SessionStore:
+    def __init__(
+        self,
+        ttl: float = 1800.0,
+        max_sessions: int = 10_000,
+        max_bytes: int = 32 * 1024 * 1024,
+    ):
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.max_bytes = max_bytes
+
+        # key → (expires_at, size, state)
+        self._sessions: "OrderedDict[str, Tuple[float, int, SessionState]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.resumed = 0
+        self.created = 0
+        self.resets = 0             # history edited, or model / policy changed
+        self.evictions = 0
+        self.expirations = 0
+        self.too_large = 0          # states over max_bytes, not stored
+        self.turns_reused = 0
+        self.turns_scanned = 0
+
+    def _drop(self, key: str) -> None:
+        _, size, _ = self._sessions.pop(key)
+        self._bytes -= size
+
+    def _expire(self, now: float) -> None:
+        # Front = least recently checked in = first to expire (one ttl for all)
+        while self._sessions:
+            key, (expires, _, _) = next(iter(self._sessions.items()))
+            if expires >= now:
+                return
+            self._drop(key)
+            self.expirations += 1
+
+    def checkout(self, key: str, version: str, digests: bytes) -> SessionState:
+        """
+        Detached copy of the session, cut back to the turns it shares with a
+        request whose turn digests are `digests` (a fresh state if none).
+        """
+        now = time.time()
+        with self._lock:
+            entry = self._sessions.get(key)
+            if entry is not None and entry[0] < now:
+                self._drop(key)
+                self.expirations += 1
+                entry = None
+            if entry is None:
+                self.created += 1
+                return SessionState(version)
+            state = entry[2]
+            if state.version != version:
+                self.resets += 1
+                return SessionState(version)
+            turns = state.common_prefix(digests)
+            if turns < state.turns:
+                self.resets += 1
+            else:
+                self.resumed += 1
+            self.turns_reused += turns
+            return state.prefix(turns)
+
+    def checkin(self, key: str, state: SessionState, scanned: int = 0) -> None:
+        size = state.nbytes
+        now = time.time()
+        with self._lock:
+            self._expire(now)
+            if key in self._sessions:
+                self._drop(key)
+            self.turns_scanned += scanned
+            if size > self.max_bytes:
+                # Storing it would evict every other session and then itself
+                self.too_large += 1
+                return
+            self._sessions[key] = (now + self.ttl, size, state)
+            self._bytes += size
+            while self._sessions and (
+                len(self._sessions) > self.max_sessions or self._bytes > self.max_bytes
+            ):
+                _, (_, evicted_size, _) = self._sessions.popitem(last=False)
+                self._bytes -= evicted_size
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._sessions.clear()
+            self._bytes = 0
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            self._expire(time.time())
+        seen = self.turns_reused + self.turns_scanned
+        return {
+            "sessions": len(self._sessions),
+            "bytes": self._bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "created": self.created,
+            "resumed": self.resumed,
+            "resets": self.resets,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "too_large": self.too_large,
+            "turns_reused": self.turns_reused,
+            "turns_scanned": self.turns_scanned,
+            "reuse_rate": self.turns_reused / seen if seen else 0.0,
+        }
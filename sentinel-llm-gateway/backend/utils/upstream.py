@@ -0,0 +1,122 @@
+"""
+Sentinel Upstream Client
+Pooled keep-alive HTTP client for the inline proxy mode.
+
+One `httpx.AsyncClient` is shared by every proxied request, so connections to
+the upstream LLM API (TCP + TLS) are opened once and reused instead of per
+request. The client is created on first use — a gateway that never proxies,
+or only rejects, opens no connection at all (and never imports httpx).
+
+    • send()   — forward a JSON body; the response is returned unread so
+                 the caller can relay it (e.g. an SSE token stream) chunk by
+                 chunk without buffering; transport failures are raised as
+                 UpstreamError, so callers need not import httpx
+    • aclose() — release the pool on shutdown
+"""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Mapping, Optional
+
+if TYPE_CHECKING:
+    import httpx
+
+__all__ = [
+    "FORWARDED_HEADERS",
+    "UpstreamError",
+    "UpstreamClient",
+]
+
+# Request headers passed through to the upstream; everything else (host,
+# content-length, hop-by-hop headers, cookies) is dropped
+FORWARDED_HEADERS = (
+    "authorization",
+    "openai-organization",
+    "openai-project",
+    "anthropic-version",
+    "accept",
+)
+
+
+class UpstreamError(Exception):
+    """The upstream could not be reached or did not answer in time."""
+
+
+class UpstreamClient:
+    def __init__(
+        self,
+        base_url: str,
+        api_key: str = "",
+        timeout: float = 60.0,
+        max_connections: int = 100,
+        max_keepalive: int = 20,
+        keepalive_expiry: float = 30.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self.api_key = api_key
+        self.timeout = timeout
+        self.max_connections = max_connections
+        self.max_keepalive = max_keepalive
+        self.keepalive_expiry = keepalive_expiry
+        self._client: Optional[httpx.AsyncClient] = None
+
+        self.requests = 0
+        self.errors = 0
+
+    @property
+    def configured(self) -> bool:
+        return bool(self.base_url)
+
+    def _get_client(self) -> httpx.AsyncClient:
+        if self._client is None:
+            import httpx
+
+            self._client = httpx.AsyncClient(
+                base_url=self.base_url,
+                limits=httpx.Limits(
+                    max_connections=self.max_connections,
+                    max_keepalive_connections=self.max_keepalive,
+                    keepalive_expiry=self.keepalive_expiry,
+                ),
+                # Connect fails fast; reads may wait on a slow first token
+                timeout=httpx.Timeout(self.timeout, connect=min(self.timeout, 10.0)),
+            )
+        return self._client
+
+    def _headers(self, incoming: Mapping[str, str]) -> Dict[str, str]:
+        headers = {k: incoming[k] for k in FORWARDED_HEADERS if k in incoming}
+        if self.api_key:
+            headers["authorization"] = f"Bearer {self.api_key}"
+        return headers
+
+    async def send(self, path: str, body: Dict[str, Any], incoming: Mapping[str, str]) -> httpx.Response:
+        """
+        POST `body` as JSON to `path` on the upstream. The response body is
+        not read: iterate it (aiter_raw) or read it, then call aclose().
+        """
+        import httpx
+
+        client = self._get_client()
+        request = client.build_request("POST", path, json=body, headers=self._headers(incoming))
+        self.requests += 1
+        try:
+            return await client.send(request, stream=True)
+        except httpx.HTTPError as e:
+            self.errors += 1
+            raise UpstreamError(repr(e)) from e
+
+    async def aclose(self) -> None:
+        if self._client is not None:
+            await self._client.aclose()
+            self._client = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "configured": self.configured,
+            "base_url": self.base_url,
+            "connected": self._client is not None,
+            "requests": self.requests,
+            "errors": self.errors,
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+        }
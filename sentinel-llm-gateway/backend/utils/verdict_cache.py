@@ -0,0 +1,248 @@
+"""
+Sentinel Verdict Cache
+Content-addressed cache of final moderation verdicts.
+
+Keys are a SHA-256 over the normalized prompt, the active model hash and the
+decision policy (thresholds etc.), so a model reload or policy change simply
+stops matching old entries — no explicit invalidation needed.
+
+Tiers:
+    • memory — LRU with TTL, bounded by entry count and by approximate bytes
+    • disk   — optional SQLite file, so a restart is warm: read into memory
+               once at open, then written behind by a background thread
+               (puts are queued, committed in batches every `flush_ms`,
+               expired / surplus rows pruned on that thread); lookups and
+               puts never touch SQLite. A full queue drops the disk write
+               (counted), never the request; close() writes out the rest
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict, deque
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, List, Optional, Tuple
+
+__all__ = [
+    "VerdictCache",
+    "make_key",
+]
+
+_DISK_PRUNE_EVERY = 1000        # rows written between disk expiry/trim passes
+
+
+def make_key(prompt: str, model_hash: Optional[str], policy: Iterable[Any]) -> str:
+    h = hashlib.sha256()
+    h.update(prompt.encode("utf-8", "surrogatepass"))
+    h.update(b"\0")
+    h.update(str(model_hash).encode())
+    h.update(b"\0")
+    h.update(repr(tuple(policy)).encode())
+    return h.hexdigest()
+
+
+class VerdictCache:
+    def __init__(
+        self,
+        capacity: int = 10_000,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl: float = 3600.0,
+        db_path: Optional[Path] = None,
+        disk_capacity: Optional[int] = None,
+        max_queue: int = 10_000,
+        flush_ms: float = 200.0,
+    ):
+        self.capacity = capacity
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.disk_capacity = disk_capacity or capacity
+        self.max_queue = max_queue
+        self.flush_interval = flush_ms / 1000.0
+
+        # key → (expires_at, size, value)
+        self._entries: "OrderedDict[str, Tuple[float, int, Dict[str, Any]]]" = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+        self._db: Optional[sqlite3.Connection] = None
+        # (key, expires, blob) rows waiting for the writer; None → delete every row
+        self._pending: Deque[Optional[Tuple[str, float, str]]] = deque()
+        self._writer: Optional[threading.Thread] = None
+        self._writer_stop = threading.Event()
+        self._db_lock = threading.Lock()    # one batch at a time (writer vs close)
+        self._db_rows = 0
+        self.disk_loaded = 0
+        self.disk_written = 0
+        self.disk_dropped = 0
+        if db_path:
+            self._open_db(Path(db_path))
+
+    # ---------------- disk tier ----------------
+
+    def _open_db(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        db = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS verdicts ("
+            " key TEXT PRIMARY KEY, expires REAL NOT NULL, value TEXT NOT NULL)"
+        )
+        now = time.time()
+        db.execute("DELETE FROM verdicts WHERE expires < ?", (now,))
+        # Warm start: the entries expiring last, oldest first so LRU order matches
+        rows = db.execute(
+            "SELECT key, expires, value FROM verdicts ORDER BY expires DESC LIMIT ?", (self.capacity,)
+        ).fetchall()
+        for key, expires, blob in reversed(rows):
+            self._store(key, expires, len(blob), json.loads(blob))
+        self.disk_loaded = len(self._entries)
+        self._db = db
+
+    def _disk_put(self, row: Optional[Tuple[str, float, str]]) -> None:
+        if len(self._pending) >= self.max_queue:
+            self.disk_dropped += 1
+            return
+        self._pending.append(row)
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._run, name="sentinel-cache-writer", daemon=True)
+            self._writer.start()
+
+    def _run(self) -> None:
+        while not self._writer_stop.wait(self.flush_interval):
+            self._flush()
+
+    def _flush(self) -> None:
+        with self._db_lock:
+            if self._db is None:
+                return
+            pending = self._pending
+            while pending:
+                rows: List[Tuple[str, float, str]] = []
+                clear = False
+                while pending and len(rows) < 512:
+                    row = pending.popleft()
+                    if row is None:
+                        rows.clear()
+                        clear = True
+                    else:
+                        rows.append(row)
+                try:
+                    # One transaction per batch (the connection is in autocommit mode)
+                    self._db.execute("BEGIN")
+                    try:
+                        if clear:
+                            self._db.execute("DELETE FROM verdicts")
+                        self._db.executemany(
+                            "INSERT OR REPLACE INTO verdicts (key, expires, value) VALUES (?, ?, ?)", rows
+                        )
+                        self._db.execute("COMMIT")
+                    except sqlite3.Error:
+                        self._db.execute("ROLLBACK")
+                        raise
+                except sqlite3.Error:
+                    # Full disk, locked or corrupt file: the memory tier keeps serving
+                    self.disk_dropped += len(rows)
+                    continue
+                self.disk_written += len(rows)
+                before = self._db_rows
+                self._db_rows += len(rows)
+                if self._db_rows // _DISK_PRUNE_EVERY != before // _DISK_PRUNE_EVERY:
+                    self._prune()
+
+    def _prune(self) -> None:
+        self._db.execute("DELETE FROM verdicts WHERE expires < ?", (time.time(),))
+        self._db.execute(
+            "DELETE FROM verdicts WHERE key IN ("
+            " SELECT key FROM verdicts ORDER BY expires DESC LIMIT -1 OFFSET ?)",
+            (self.disk_capacity,),
+        )
+
+    # ---------------- memory tier ----------------
+
+    def _store(self, key: str, expires: float, size: int, value: Dict[str, Any]) -> None:
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._bytes -= old[1]
+        self._entries[key] = (expires, size, value)
+        self._bytes += size
+        while self._entries and (len(self._entries) > self.capacity or self._bytes > self.max_bytes):
+            _, (_, evicted_size, _) = self._entries.popitem(last=False)
+            self._bytes -= evicted_size
+            self.evictions += 1
+
+    # ---------------- public API ----------------
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                if entry[0] >= now:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry[2]
+                del self._entries[key]
+                self._bytes -= entry[1]
+                self.expirations += 1
+            self.misses += 1
+            return None
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        blob = json.dumps(value, separators=(",", ":"))
+        expires = time.time() + self.ttl
+        with self._lock:
+            self._store(key, expires, len(blob), value)
+            if self._db is not None:
+                self._disk_put((key, expires, blob))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+            if self._db is not None:
+                self._disk_put(None)
+
+    def close(self) -> None:
+        """Stop the disk writer, write out what is still queued and close the file."""
+        self._writer_stop.set()
+        writer = self._writer
+        if writer is not None:
+            writer.join(timeout=5)
+        self._flush()
+        with self._db_lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        stats = {
+            "entries": len(self._entries),
+            "bytes": self._bytes,
+            "capacity": self.capacity,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "disk": self._db is not None,
+        }
+        if self._db is not None:
+            stats.update(
+                disk_loaded=self.disk_loaded,
+                disk_queued=len(self._pending),
+                disk_written=self.disk_written,
+                disk_dropped=self.disk_dropped,
+            )
+        return stats
@@ -0,0 +1,112 @@
+"""
+Audit benchmark: sentinel_audit.py over a synthetic JSONL log.
+
+A log of distinct prompts (dataset prompts with random filler, some of them
+malformed lines) is written under tmp and audited in fresh processes:
+    • per-prompt — a plain loop of DetectionPipeline.run per line, one
+                   threshold pair: what replaying the log through the
+                   gateway's own per-request path costs, minus HTTP
+    • audit      — sentinel_audit.py, inline (--workers 0) and with
+                   --workers N, sweeping 1 and 3 SAFE/BLOCK pairs
+    • resume     — an audit killed part-way and resumed with --resume; its
+                   output must be byte-identical to an uninterrupted run
+Wall time includes interpreter start-up, imports and model load.
+
+    python benchmarks/bench_audit.py [prompts] [workers]
+"""
+
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent.parent
+BACKEND = BASE / "backend"
+
+PER_PROMPT = r"""
+import json, sys
+from engine import sentinel_ml_detector
+from pipeline import DetectionPipeline, verdict_status
+pipeline = DetectionPipeline(0.35, 0.8)
+sentinel_ml_detector.load_model()
+with open(sys.argv[1], "rb") as f, open(sys.argv[2], "w") as out:
+    for line in f:
+        try:
+            text = json.loads(line)["prompt"]
+        except (ValueError, KeyError, TypeError):
+            continue
+        r = pipeline.run(text.strip())
+        out.write(json.dumps({"risk": r.risk_score, "status": verdict_status(r.reasons, r.risk_score, r.safe, 0.35, 0.8)}) + "\n")
+"""
+
+
+def make_log(path: Path, n: int) -> None:
+    rng = random.Random(0)
+    benign = (BASE / "datasets" / "benign.txt").read_text().splitlines()
+    malicious = (BASE / "datasets" / "malicious.txt").read_text().splitlines()
+    words = sorted({w.lower() for line in benign + malicious for w in line.split()}) + [f"w{i}" for i in range(2000)]
+    with open(path, "w") as f:
+        for i in range(n):
+            if i % 1000 == 999:
+                f.write("{truncated\n")
+                continue
+            filler = " ".join(rng.choice(words) for _ in range(rng.randint(3, 30)))
+            f.write(json.dumps({"id": i, "user": f"u{i % 97}", "prompt": f"{rng.choice(benign + malicious)} {filler}"}) + "\n")
+
+
+def timed(args) -> float:
+    t = time.perf_counter()
+    subprocess.run(args, cwd=BACKEND, check=True, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - t
+
+
+def audit(log: Path, out: Path, *extra) -> list:
+    return [sys.executable, "sentinel_audit.py", str(log), "-o", str(out), "--keep", "id,user", *extra]
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    workers = int(sys.argv[2]) if len(sys.argv) > 2 else os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory(prefix="sentinel-audit-") as tmp:
+        tmp = Path(tmp)
+        log = tmp / "log.jsonl"
+        make_log(log, n)
+        print(f"{n} log lines ({log.stat().st_size / 1e6:.1f} MB), {os.cpu_count()} CPU(s)\n")
+
+        sweep = "0.35:0.8,0.3:0.7,0.4:0.9"
+        runs = [
+            ("per-prompt loop, 1 pair", [sys.executable, "-c", PER_PROMPT, str(log), str(tmp / "loop.jsonl")]),
+            ("audit, inline, 1 pair", audit(log, tmp / "a.jsonl", "--workers", "0")),
+            ("audit, inline, 3 pairs", audit(log, tmp / "b.jsonl", "--workers", "0", "--thresholds", sweep)),
+            (f"audit, {workers} worker(s), 1 pair", audit(log, tmp / "c.jsonl", "--workers", str(workers))),
+            (f"audit, {workers} worker(s), 3 pairs", audit(log, tmp / "d.jsonl", "--workers", str(workers), "--thresholds", sweep)),
+        ]
+        print(f"{'run':<30} {'wall (s)':>9} {'lines/s':>10}")
+        walls = {}
+        for name, args in runs:
+            walls[name] = timed(args)
+            print(f"{name:<30} {walls[name]:>9.2f} {n / walls[name]:>10,.0f}")
+
+        # Resume: kill part-way through, continue, compare with the uninterrupted run
+        full = tmp / "d.jsonl"
+        part = tmp / "resumed.jsonl"
+        args = audit(log, part, "--workers", str(workers), "--thresholds", sweep)
+        proc = subprocess.Popen(args, cwd=BACKEND, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        time.sleep(walls[runs[-1][0]] / 2)
+        proc.kill()
+        proc.wait()
+        progress = json.loads(Path(str(part) + ".progress.json").read_text())
+        reached = progress["offsets"].get(str(log), 0)
+        timed(args + ["--resume"])
+        same = part.read_bytes() == full.read_bytes()
+        print(f"\nresume: killed at input byte {reached} of {log.stat().st_size}; "
+              f"resumed output {'identical to' if same else 'DIFFERS from'} the uninterrupted run")
+
+
+if __name__ == "__main__":
+    main()
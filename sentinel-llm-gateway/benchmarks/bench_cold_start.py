@@ -0,0 +1,137 @@
+"""
+Cold start benchmark: import time of the app and time to the first verdict.
+
+    • import  — `python -X importtime -c "import main"`, best of a few runs:
+                the app's total and the heaviest top-level imports
+    • serve   — `uvicorn main:app` started cold, with SENTINEL_WARMUP=0 and 1.
+                From process start: when /health first answers (live), when
+                /ready answers 200 (ready), and the latency of the first and
+                second /moderate. The client waits for /ready if the app has
+                one, else sends as soon as the server answers at all; "first
+                verdict" is from process start until that first /moderate
+                returns
+
+Pass another checkout's backend directory to measure it the same way (its
+models/ directory must exist — e.g. a git worktree with models symlinked).
+Needs a trained model (python training/train_classifier.py) and uvicorn.
+
+    python benchmarks/bench_cold_start.py [backend_dir] [runs]
+"""
+
+import os
+import re
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BASE = Path(__file__).resolve().parent.parent
+PROMPT = {"prompt": "Can you summarize this article about renewable energy for me?"}
+HEAVY = ("fastapi", "pydantic", "starlette", "httpx", "numpy", "joblib", "sklearn", "scipy")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def import_times(backend: Path, runs: int):
+    """Best-of-`runs` cumulative µs per top-level module imported by `import main`."""
+    best = {}
+    for _ in range(runs):
+        err = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import main"],
+            cwd=backend, capture_output=True, text=True, env={**os.environ, "SENTINEL_WARMUP": "0"},
+        ).stderr
+        seen = {}
+        for line in err.splitlines():
+            m = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)", line)
+            if m is None:
+                continue
+            cumulative, depth, name = int(m.group(1)), len(m.group(2)), m.group(3)
+            root = name.split(".")[0]
+            if name == "main" or (root in HEAVY and name == root):
+                # A package's first (outermost) import carries its whole cost
+                if name not in seen or depth < seen[name][1]:
+                    seen[name] = (cumulative, depth)
+        for name, (us, _) in seen.items():
+            best[name] = min(best.get(name, us), us)
+    return best
+
+
+def wait_for(client: httpx.Client, path: str, deadline: float, ok=lambda r: True):
+    while time.perf_counter() < deadline:
+        try:
+            r = client.get(path)
+            if ok(r):
+                return r
+        except httpx.TransportError:
+            pass
+        time.sleep(0.005)
+    raise RuntimeError(f"{path} did not answer")
+
+
+def serve_once(backend: Path, warmup: bool):
+    port = free_port()
+    env = {**os.environ, "SENTINEL_WARMUP": "1" if warmup else "0", "SENTINEL_CACHE": "0"}
+    t0 = time.perf_counter()
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "error"],
+        cwd=backend, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        with httpx.Client(base_url=f"http://127.0.0.1:{port}") as client:
+            deadline = t0 + 60
+            wait_for(client, "/health", deadline)
+            live = time.perf_counter() - t0
+            r = wait_for(client, "/ready", deadline, ok=lambda r: r.status_code != 503)
+            ready = time.perf_counter() - t0 if r.status_code == 200 else None
+            latencies, done = [], []
+            for _ in range(2):
+                t = time.perf_counter()
+                client.post("/moderate", json=PROMPT).raise_for_status()
+                done.append(time.perf_counter())
+                latencies.append(done[-1] - t)
+            return live, ready, latencies[0], latencies[1], done[0] - t0
+    finally:
+        proc.terminate()
+        proc.wait()
+
+
+def ms(value):
+    return f"{value * 1e3:.0f}" if value is not None else "—"
+
+
+def main():
+    backend = Path(sys.argv[1]).resolve() if len(sys.argv) > 1 else BASE / "backend"
+    runs = int(sys.argv[2]) if len(sys.argv) > 2 else 5
+
+    times = import_times(backend, runs)
+    print(f"backend: {backend}\n")
+    print(f"import main (best of {runs}): {times.get('main', 0) / 1e3:.0f} ms")
+    for name in HEAVY:
+        if name in times:
+            print(f"    {name:<10} {times[name] / 1e3:>6.0f} ms")
+    missing = [name for name in HEAVY if name not in times]
+    print(f"    not imported: {', '.join(missing) or 'none'}\n")
+
+    print(f"{'warmup':<7} {'live (ms)':>10} {'ready (ms)':>11} {'1st req (ms)':>13} "
+          f"{'2nd req (ms)':>13} {'1st verdict (ms)':>17}   (median of {runs})")
+    for warmup in (False, True):
+        rows = [serve_once(backend, warmup) for _ in range(runs)]
+        cols = []
+        for i in range(5):
+            values = [r[i] for r in rows if r[i] is not None]
+            cols.append(statistics.median(values) if values else None)
+        live, ready, first, second, verdict = cols
+        print(f"{'on' if warmup else 'off':<7} {ms(live):>10} {ms(ready):>11} {first * 1e3:>13.1f} "
+              f"{second * 1e3:>13.1f} {ms(verdict):>17}")
+
+
+if __name__ == "__main__":
+    main()
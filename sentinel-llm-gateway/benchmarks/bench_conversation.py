@@ -0,0 +1,99 @@
+"""
+Multi-turn moderation benchmark: per-turn latency over a 100-turn conversation.
+
+The chat client re-sends the whole history on every turn. Two ways to
+moderate it:
+    • rescan      — every user turn of the history through the pipeline
+                    (run_batch, one vectorized ML call), as /moderate forces
+    • incremental — the /moderate/conversation path minus HTTP: turn digests
+                    checked against the SessionStore, only the new turn scanned
+                    (run_turns with the carried-over tail)
+
+Latency of the rescan grows with the turn number; the incremental path
+should stay flat. Verdict parity is checked on the last turn (rescan's risk
+per turn == the stored per-turn risk); the script exits non-zero if not.
+Needs a trained model (python training/train_classifier.py).
+
+    python benchmarks/bench_conversation.py
+"""
+
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE / "backend"))
+
+from pipeline import DetectionPipeline  # noqa: E402
+from utils.session_store import SessionStore, turn_digest  # noqa: E402
+
+TURNS = 100
+REPEAT = 5
+REPORT_AT = (1, 10, 25, 50, 75, 100)
+
+
+def conversation(rng: random.Random):
+    benign = (BASE / "datasets" / "benign.txt").read_text().splitlines()
+    messages = []
+    for _ in range(TURNS):
+        messages.append({"role": "user", "content": " ".join(rng.choice(benign) for _ in range(3))})
+        messages.append({"role": "assistant", "content": " ".join(rng.choice(benign) for _ in range(6))})
+    return messages
+
+
+def rescan(pipeline, history):
+    return pipeline.run_batch([m["content"] for m in history if m["role"] == "user"])
+
+
+def incremental(pipeline, store, history):
+    digests = [turn_digest(m["role"], m["content"]) for m in history]
+    state = store.checkout("bench", "v1", b"".join(digests))
+    known = state.turns
+    scan = [i for i in range(known, len(history)) if history[i]["role"] == "user"]
+    results, carry = pipeline.run_turns([history[i]["content"] for i in scan], state.carry or "")
+    risks = dict(zip(scan, (r.risk_score for r in results)))
+    for i in range(known, len(history)):
+        state.append(digests[i], "allow" if i in risks else None, risks.get(i, 0.0))
+    state.carry = carry
+    store.checkin("bench", state, scanned=len(scan))
+    return state
+
+
+def main():
+    pipeline = DetectionPipeline(0.35, 0.8, heuristic_block=None)
+    pipeline.run("warm up")                 # model load outside the measurements
+    messages = conversation(random.Random(0))
+
+    timings = {"rescan": [[] for _ in range(TURNS)], "incremental": [[] for _ in range(TURNS)]}
+    for _ in range(REPEAT):
+        store = SessionStore()
+        for turn in range(TURNS):
+            # History as re-sent after the user's turn-th message
+            history = messages[: 2 * turn + 1]
+            t0 = time.perf_counter()
+            full = rescan(pipeline, history)
+            timings["rescan"][turn].append(time.perf_counter() - t0)
+            t0 = time.perf_counter()
+            state = incremental(pipeline, store, history)
+            timings["incremental"][turn].append(time.perf_counter() - t0)
+
+    stored = [r for r, s in zip(state.risks, state.statuses) if s != 255]
+    if [round(r.risk_score, 9) for r in full] != [round(r, 9) for r in stored]:
+        print("MISMATCH between rescan and stored per-turn risk")
+        sys.exit(1)
+
+    print(f"{'turn':>5} {'rescan (ms)':>12} {'incremental (ms)':>17}")
+    for turn in REPORT_AT:
+        old = statistics.median(timings["rescan"][turn - 1]) * 1e3
+        new = statistics.median(timings["incremental"][turn - 1]) * 1e3
+        print(f"{turn:>5} {old:>12.2f} {new:>17.2f}")
+    total_old = sum(statistics.median(t) for t in timings["rescan"]) * 1e3
+    total_new = sum(statistics.median(t) for t in timings["incremental"]) * 1e3
+    print(f"\nwhole conversation: rescan {total_old:.0f} ms, incremental {total_new:.0f} ms "
+          f"({total_old / total_new:.1f}x); session state {store.stats()['bytes']} bytes")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+"""
+Load test for the detection execution backends (SENTINEL_EXECUTOR).
+
+Starts `uvicorn main:app` once per mode and drives it over HTTP with a mixed
+workload — mostly short prompts plus a share of MAX_PROMPT_CHARS-sized ones —
+from many concurrent clients. Reports throughput and p50/p99 latency per
+prompt class, which shows how much long prompts stall short ones. The
+verdict cache is off, since the workload repeats the same two prompts.
+
+With more than one CPU, the load generator is pinned to the first
+CLIENT_CPUS cores and the server (with its worker processes) to the rest,
+so the client does not compete with the modes it measures. On one CPU both
+share it, and the modes cannot pull apart.
+
+    python benchmarks/bench_executor.py [requests] [concurrency] [client cpus]
+"""
+
+import asyncio
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BASE = Path(__file__).resolve().parent.parent
+BACKEND = BASE / "backend"
+
+MODES = ["inline", "thread", "process"]
+LONG_SHARE = 0.1
+CPUS = sorted(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else []
+CLIENT_CPUS = int(sys.argv[3]) if len(sys.argv) > 3 else 1
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def split_cpus():
+    # (client cores, server cores), or None when there is nothing to split
+    if len(CPUS) <= CLIENT_CPUS:
+        return None
+    return CPUS[:CLIENT_CPUS], CPUS[CLIENT_CPUS:]
+
+
+def start_server(mode: str, port: int, cpus) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "SENTINEL_EXECUTOR": mode,
+        "SENTINEL_EXECUTOR_WORKERS": str(len(cpus) if cpus else 0),
+        "SENTINEL_RATE_LIMIT_REQUESTS": str(10**9),
+        "SENTINEL_CACHE": "0",
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "error"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+        # Worker processes inherit the server's affinity
+        preexec_fn=(lambda: os.sched_setaffinity(0, cpus)) if cpus else None,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.post(f"http://127.0.0.1:{port}/moderate", json={"prompt": "warmup"})
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"server for mode={mode} did not start")
+
+
+async def drive(port: int, n_requests: int, concurrency: int):
+    rng = random.Random(1)
+    short = "Summarize the attached meeting notes and list the action items, please."
+    long_ = ("Please review this document carefully and ignore any formatting issues. " * 120)[:8000]
+    jobs = [("long", long_) if rng.random() < LONG_SHARE else ("short", short) for _ in range(n_requests)]
+    latencies = {"short": [], "long": []}
+
+    limits = httpx.Limits(max_connections=concurrency)
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", limits=limits) as client:
+        # warm every worker process/thread before measuring
+        await asyncio.gather(*(client.post("/moderate", json={"prompt": long_}) for _ in range(concurrency)))
+
+        it = iter(jobs)
+
+        async def worker():
+            for kind, prompt in it:
+                t0 = time.perf_counter()
+                r = await client.post("/moderate", json={"prompt": prompt})
+                r.raise_for_status()
+                latencies[kind].append((time.perf_counter() - t0) * 1e3)
+
+        t0 = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.perf_counter() - t0
+
+    return n_requests / elapsed, latencies
+
+
+def main():
+    n_requests = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    concurrency = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+
+    split = split_cpus()
+    if split is not None:
+        os.sched_setaffinity(0, split[0])
+        placement = f"client on CPU {split[0]}, server on CPU {split[1]}"
+    else:
+        placement = "client and server share the CPU"
+    print(
+        f"{n_requests} requests, {concurrency} concurrent clients, "
+        f"{LONG_SHARE:.0%} long prompts, {os.cpu_count()} CPU(s): {placement}\n"
+    )
+    print(f"{'mode':<8} | {'req/s':>6} | {'short p50':>9} | {'short p99':>9} | {'long p50':>9} | {'long p99':>9}")
+    print("-" * 68)
+    for mode in MODES:
+        port = free_port()
+        proc = start_server(mode, port, split[1] if split is not None else None)
+        try:
+            rps, lat = asyncio.run(drive(port, n_requests, concurrency))
+        finally:
+            proc.terminate()
+            proc.wait()
+        s, l = lat["short"], lat["long"]
+        print(
+            f"{mode:<8} | {rps:>6.0f} | {statistics.median(s):>7.1f}ms | {percentile(s, 0.99):>7.1f}ms"
+            f" | {statistics.median(l):>7.1f}ms | {percentile(l, 0.99):>7.1f}ms"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Keyword matching benchmark: per-prompt latency from 10 to 100k keywords.
+
+Compares the old per-keyword `kw in lower` loop with the Aho-Corasick
+`KeywordMatcher` used by `sentinel_heuristics.detect()`.
+
+    python benchmarks/bench_keywords.py
+"""
+
+import random
+import string
+import sys
+import time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE / "backend"))
+
+from engine.keyword_matcher import KeywordMatcher  # noqa: E402
+
+SIZES = [10, 100, 1_000, 10_000, 100_000]
+PROMPT_CHARS = 2000
+REPEAT = 20
+
+
+def make_keywords(n: int, rng: random.Random):
+    words = set()
+    while len(words) < n:
+        parts = [
+            "".join(rng.choice(string.ascii_lowercase) for _ in range(rng.randint(3, 9)))
+            for _ in range(rng.randint(1, 3))
+        ]
+        words.add(" ".join(parts))
+    return list(words)
+
+
+def make_prompt(rng: random.Random) -> str:
+    base = (BASE / "datasets" / "benign.txt").read_text().lower().split()
+    out = []
+    while sum(len(w) + 1 for w in out) < PROMPT_CHARS:
+        out.append(rng.choice(base))
+    return " ".join(out)[:PROMPT_CHARS]
+
+
+def per_call_us(fn, arg) -> float:
+    fn(arg)
+    start = time.perf_counter()
+    for _ in range(REPEAT):
+        fn(arg)
+    return (time.perf_counter() - start) / REPEAT * 1e6
+
+
+def main():
+    rng = random.Random(42)
+    prompt = make_prompt(rng)
+
+    print(f"prompt: {len(prompt)} chars, {REPEAT} runs per point\n")
+    print(f"{'keywords':>10} | {'naive loop (us)':>16} | {'automaton (us)':>15} | {'build (ms)':>10}")
+    print("-" * 62)
+    for n in SIZES:
+        keywords = make_keywords(n, rng)
+        naive = KeywordMatcher(keywords, use_automaton=False)
+
+        t0 = time.perf_counter()
+        automaton = KeywordMatcher(keywords, use_automaton=True)
+        build_ms = (time.perf_counter() - t0) * 1e3
+
+        assert naive.find(prompt) == automaton.find(prompt)
+        print(
+            f"{n:>10} | {per_call_us(naive.find, prompt):>16.1f} | "
+            f"{per_call_us(automaton.find, prompt):>15.1f} | {build_ms:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""
+Request logging benchmark: what one verdict's logging costs the request path.
+
+Verdicts are a production-like mix (90% ALLOW, 7% SANITIZE, 3% BLOCK); the
+SANITIZE / BLOCK reasons are the real rule matches of dataset attacks, regex
+sources included. Each is logged to a file under tmp by:
+    • before   — the three f-string logger calls the gateway used to make
+                 per /moderate (incoming, risk + joined reasons, verdict),
+                 through a blocking StreamHandler
+    • text     — RequestLog in text mode: one lazily formatted call, still
+                 written inline by the StreamHandler
+    • json     — RequestLog in json mode: a tuple appended to the queue,
+                 rendered and written in batches by the writer thread
+    • json 1%  — the same with SENTINEL_LOG_ALLOW_SAMPLE=0.01
+Per call: mean and p99 caller time (what the event loop pays). Total: process
+CPU per record until everything is on disk, writer thread included — it
+shares the GIL, so this is the cost the process still pays overall.
+
+    python benchmarks/bench_logging.py [records]
+"""
+
+import logging
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE / "backend"))
+
+from pipeline import DetectionPipeline  # noqa: E402
+from utils.request_log import RequestLog  # noqa: E402
+
+FORMAT = "%(asctime)s | %(levelname)s | %(message)s"
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def verdicts(n: int):
+    rng = random.Random(0)
+    pipeline = DetectionPipeline(0.35, 0.8, skip_ml_when_clean=True)
+    malicious = (BASE / "datasets" / "malicious.txt").read_text().splitlines()
+    flagged = [r for r in (pipeline.screen(p).reasons for p in malicious[:2000]) if r]
+    out = []
+    for _ in range(n):
+        r = rng.random()
+        ip, user = f"10.0.{rng.randrange(256)}.{rng.randrange(256)}", f"user-{rng.randrange(1000)}"
+        if r < 0.90:
+            out.append(("allow", rng.uniform(0.0, 0.3), ["Low risk score; no dangerous patterns detected"], ip, user))
+        elif r < 0.97:
+            out.append(("sanitize", rng.uniform(0.35, 0.8), rng.choice(flagged), ip, user))
+        else:
+            out.append(("block", rng.uniform(0.8, 1.0), rng.choice(flagged), ip, user))
+    return out
+
+
+def stream_logger(name: str, path: str) -> logging.Logger:
+    handler = logging.StreamHandler(open(path, "a"))
+    handler.setFormatter(logging.Formatter(FORMAT))
+    log = logging.getLogger(f"bench.{name}")
+    log.handlers[:] = [handler]
+    log.setLevel(logging.INFO)
+    log.propagate = False
+    return log
+
+
+def before(log: logging.Logger):
+    def emit(status, risk, reasons, ip, user):
+        log.info(f"[Sentinel] Incoming prompt from IP={ip} | user_id={user}")
+        log.info(f"[Sentinel] Risk score={risk:.2f} | reasons={'; '.join(reasons) or 'none'}")
+        if status == "block":
+            log.warning(f"[Sentinel] BLOCK | risk={risk:.2f}")
+        else:
+            log.info(f"[Sentinel] {status.upper()} | risk={risk:.2f}")
+    return emit
+
+
+def request_log(rlog: RequestLog):
+    def emit(status, risk, reasons, ip, user):
+        rlog.decision(status, route="/moderate", ip=ip, user_id=user, risk=risk, reasons=reasons)
+    return emit
+
+
+def run(name, emit, data, close):
+    times = []
+    cpu0 = time.process_time()
+    for v in data:
+        t0 = time.perf_counter_ns()
+        emit(*v)
+        times.append(time.perf_counter_ns() - t0)
+    close()
+    cpu = time.process_time() - cpu0
+    return name, statistics.mean(times) / 1e3, percentile(times, 0.99) / 1e3, cpu / len(data) * 1e6
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    data = verdicts(n)
+    tmp = tempfile.mkdtemp(prefix="sentinel-log-")
+    rows = []
+
+    log = stream_logger("before", os.path.join(tmp, "before.log"))
+    rows.append(run("before", before(log), data, log.handlers[0].flush))
+
+    log = stream_logger("text", os.path.join(tmp, "text.log"))
+    rlog = RequestLog("text", logger=log)
+    rows.append(run("text", request_log(rlog), data, log.handlers[0].flush))
+
+    for name, rate in (("json", 1.0), ("json 1%", 0.01)):
+        out = open(os.path.join(tmp, name.replace(" ", "_").replace("%", "") + ".jsonl"), "w")
+        rlog = RequestLog("json", allow_sample=rate, max_queue=n, stream=out)
+        rows.append(run(name, request_log(rlog), data, rlog.close))
+        stats = rlog.stats()
+        assert stats["written"] + stats["sampled_out"] == n and not stats["dropped"], stats
+
+    sizes = {f: os.path.getsize(os.path.join(tmp, f)) for f in sorted(os.listdir(tmp))}
+    print(f"{n} verdicts (90% allow / 7% sanitize / 3% block), logged to files in {tmp}\n")
+    print(f"{'mode':<9} {'caller mean (µs)':>17} {'caller p99 (µs)':>16} {'CPU / verdict (µs)':>19}")
+    for name, mean, p99, cpu in rows:
+        print(f"{name:<9} {mean:>17.2f} {p99:>16.2f} {cpu:>19.2f}")
+    print("\n" + ", ".join(f"{f} {size / 1e6:.1f} MB" for f, size in sizes.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,239 @@
+"""
+Instrumentation overhead benchmark: /moderate with metrics on vs off.
+
+Every measurement alternates the two settings in blocks of requests, so
+machine noise hits both alike. The verdict cache is off, so every request
+runs the pipeline.
+    • served     — two `uvicorn main:app` processes, SENTINEL_METRICS=1 and
+                   0, driven over loopback HTTP: the production path, and
+                   the number held to the 2% budget (exit status)
+    • in-process — the same app through httpx ASGITransport, no sockets or
+                   HTTP server, with the RequestMetrics middleware swapped
+                   out of the stack, the on_inference hook removed and
+                   METRICS_ENABLED cleared; the worst case, since the request
+                   itself is as cheap as it gets
+    • isolated   — the recording calls one request makes (rate-limit timer,
+                   pipeline stages, decision counter, on_inference with its
+                   event dict) and the RequestMetrics layer around an empty
+                   ASGI app, timed alone
+Needs a trained model (python training/train_classifier.py) and uvicorn.
+
+    python benchmarks/bench_metrics.py [requests] [block]
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent.parent
+BACKEND = BASE / "backend"
+sys.path.insert(0, str(BACKEND))
+
+os.environ.update({
+    "SENTINEL_METRICS": "1",
+    "SENTINEL_CACHE": "0",
+    "SENTINEL_RATE_LIMIT_REQUESTS": str(10**9),
+})
+
+import httpx  # noqa: E402
+
+import main  # noqa: E402
+from engine import sentinel_ml_detector  # noqa: E402
+from utils.metrics import RequestMetrics  # noqa: E402
+
+BUDGET = 0.02
+
+
+def prompts(n: int):
+    rng = random.Random(0)
+    benign = (BASE / "datasets" / "benign.txt").read_text().splitlines()
+    malicious = (BASE / "datasets" / "malicious.txt").read_text().splitlines()
+    return [rng.choice(malicious) if rng.random() < 0.2 else rng.choice(benign) for _ in range(n)]
+
+
+def paired_overhead(times):
+    t_on, t_off = statistics.mean(times[True]), statistics.mean(times[False])
+    paired = [(a - b) / b for a, b in zip(times[True], times[False])]
+    return t_on, t_off, (t_on - t_off) / t_off, statistics.median(paired)
+
+
+# ---------------- served: two uvicorn processes ----------------
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(enabled: bool, port: int) -> subprocess.Popen:
+    env = {**os.environ, "SENTINEL_METRICS": "1" if enabled else "0"}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--log-level", "error", "--no-access-log"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        try:
+            httpx.post(f"http://127.0.0.1:{port}/moderate", json={"prompt": "warmup"})
+            return proc
+        except httpx.TransportError:
+            time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError("sentinel did not start")
+
+
+def served(n: int, block: int):
+    data = prompts(n)
+    procs, clients = [], {}
+    try:
+        for enabled in (True, False):
+            port = free_port()
+            procs.append(start_server(enabled, port))
+            clients[enabled] = httpx.Client(base_url=f"http://127.0.0.1:{port}")
+        for client in clients.values():
+            for p in data[:200]:
+                client.post("/moderate", json={"prompt": p})
+        times = {True: [], False: []}
+        for lo in range(0, n, block):
+            chunk = data[lo:lo + block]
+            for enabled in ((True, False) if (lo // block) % 2 == 0 else (False, True)):
+                client = clients[enabled]
+                t0 = time.perf_counter()
+                for p in chunk:
+                    client.post("/moderate", json={"prompt": p}).raise_for_status()
+                times[enabled].append((time.perf_counter() - t0) / len(chunk))
+        return times
+    finally:
+        for client in clients.values():
+            client.close()
+        for proc in procs:
+            proc.terminate()
+            proc.wait()
+
+
+# ---------------- in-process ----------------
+
+def stacks():
+    # Starlette builds the middleware stack from app.user_middleware; build it
+    # once with and once without RequestMetrics and swap between them
+    app = main.app
+    on = app.build_middleware_stack()
+    kept = app.user_middleware
+    app.user_middleware = [m for m in kept if m.cls is not RequestMetrics]
+    off = app.build_middleware_stack()
+    app.user_middleware = kept
+    return on, off
+
+
+def set_metrics(enabled: bool, stack) -> None:
+    main.app.middleware_stack = stack
+    main.METRICS_ENABLED = enabled
+    sentinel_ml_detector.on_inference = main._on_inference if enabled else None
+
+
+def isolated(n: int) -> float:
+    """Per-request cost of the metric updates alone (record_result minus its PipelineStats part)."""
+    timers = main._STAGE_TIMERS
+    result = main.PipelineResult([], 0.1, None, None, (120_000, 50_000, None))
+    response = main.ModerateResponse(status="allow", risk_score=0.1, reasons=[])
+
+    main.METRICS_ENABLED = True
+    t0 = time.perf_counter()
+    for _ in range(n):
+        t = time.perf_counter_ns()
+        timers["rate_limit"].observe_ns(time.perf_counter_ns() - t)
+        main.record_result(result, response)
+        main._on_inference({"n": 1, "vectorize_ns": 41_000, "predict_ns": 9_000, "source": "linear"})
+    with_metrics = time.perf_counter() - t0
+
+    # record_result also feeds /stats/pipeline, which runs with metrics off too
+    t0 = time.perf_counter()
+    for _ in range(n):
+        main._pipeline_stats.record(result)
+    return max(0.0, with_metrics - (time.perf_counter() - t0)) / n
+
+
+async def middleware(n: int) -> float:
+    """Per-request cost of the RequestMetrics layer around an empty ASGI app."""
+    async def empty(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        pass
+
+    scope = {"type": "http", "path": "/moderate"}
+    wrapped = RequestMetrics(empty, main._request_seconds, main._responses, ["/moderate"])
+    elapsed = {}
+    for name, app in (("empty", empty), ("wrapped", wrapped), ("empty", empty)):
+        t0 = time.perf_counter()
+        for _ in range(n):
+            await app(scope, receive, send)
+        elapsed[name] = min(elapsed.get(name, float("inf")), time.perf_counter() - t0)
+    return max(0.0, elapsed["wrapped"] - elapsed["empty"]) / n
+
+
+async def in_process(n: int, block: int):
+    data = prompts(n)
+    on_stack, off_stack = stacks()
+    times = {True: [], False: []}
+    async with httpx.AsyncClient(transport=httpx.ASGITransport(app=main.app), base_url="http://bench") as client:
+        for enabled, stack in ((True, on_stack), (False, off_stack)):
+            set_metrics(enabled, stack)
+            for p in data[:200]:                   # model load, feature-hash cache
+                await client.post("/moderate", json={"prompt": p})
+
+        for lo in range(0, n, block):
+            chunk = data[lo:lo + block]
+            # Alternate which setting goes first, so neither always follows the other
+            order = (True, False) if (lo // block) % 2 == 0 else (False, True)
+            for enabled in order:
+                set_metrics(enabled, on_stack if enabled else off_stack)
+                t0 = time.perf_counter()
+                for p in chunk:
+                    r = await client.post("/moderate", json={"prompt": p})
+                    r.raise_for_status()
+                times[enabled].append((time.perf_counter() - t0) / len(chunk))
+    set_metrics(True, on_stack)
+    return times
+
+
+def main_():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+    block = int(sys.argv[2]) if len(sys.argv) > 2 else 100
+    logging.disable(logging.CRITICAL)
+
+    results = {
+        "served": paired_overhead(served(n, block)),
+        "in-process": paired_overhead(asyncio.run(in_process(n, block))),
+    }
+    recording = isolated(200_000)
+    layer = asyncio.run(middleware(200_000))
+
+    print(f"{n} /moderate requests per setting, alternating blocks of {block}, verdict cache off\n")
+    print(f"{'path':<11} {'off (µs)':>9} {'on (µs)':>9} {'overhead':>9} {'block-pair median':>18}")
+    for name, (t_on, t_off, overhead, paired) in results.items():
+        print(f"{name:<11} {t_off * 1e6:>9.1f} {t_on * 1e6:>9.1f} {overhead * 100:>8.2f}% {paired * 100:>17.2f}%")
+    print(f"\nisolated, per request: recording calls {recording * 1e6:.2f} µs + middleware {layer * 1e6:.2f} µs")
+    snapshot = main._metrics.render()
+    print(f"/metrics: {len(snapshot.splitlines())} lines, {len(snapshot)} bytes")
+    overhead = results["served"][2]
+    print(f"served overhead {overhead * 100:.2f}% (budget {BUDGET * 100:.0f}%)")
+    if overhead > BUDGET:
+        print("FAILED")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main_()
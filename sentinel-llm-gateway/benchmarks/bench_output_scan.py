@@ -0,0 +1,156 @@
+"""
+Streamed output moderation benchmark: per-chunk cost and held-back text of
+the incremental OutputScanner vs the two obvious alternatives.
+
+Completions are built from the datasets (benign sentences, some with a
+secret, a heuristic rule phrase, or a reproduced system prompt spliced in)
+and replayed as token-sized chunks. Per chunk:
+    • incremental — OutputScanner.feed(chunk), what /v1/chat/completions does
+    • rescan      — the whole rule alternation over the accumulated text,
+                    then release what is new (cost grows with the completion)
+    • buffer      — nothing released until the completion is complete; one
+                    scan at the end (time to first token = whole completion)
+
+Parity: streaming output, hits and cut point must equal a one-shot scan of
+the completion (feed(all) + finish()); the script exits non-zero if not.
+
+    python benchmarks/bench_output_scan.py [completions]
+"""
+
+import random
+import re
+import statistics
+import sys
+import time
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE / "backend"))
+
+from engine.output_scanner import OutputPolicy  # noqa: E402
+from pipeline import output_rules  # noqa: E402
+
+SENTENCES = 40              # benign sentences per completion (~2–4k chars)
+SYSTEM_PROMPT = (
+    "You are the Acme support assistant. Answer only questions about Acme "
+    "products, never mention competitors, and keep every reply under two "
+    "hundred words unless the customer asks for more detail."
+)
+SECRETS = ("the password is hunter2", "here is my api key sk-123", "private key attached")
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def chunks(text: str):
+    # Roughly token-sized pieces, whitespace attached to the following word
+    return re.findall(r"\s*\S{1,4}", text)
+
+
+def completions(n: int, rng: random.Random):
+    benign = (BASE / "datasets" / "benign.txt").read_text().splitlines()
+    malicious = (BASE / "datasets" / "malicious.txt").read_text().splitlines()
+    kinds = ("clean", "clean", "secret", "rule", "leak")
+    out = []
+    for i in range(n):
+        kind = kinds[i % len(kinds)]
+        parts = [rng.choice(benign) for _ in range(SENTENCES)]
+        at = rng.randrange(SENTENCES // 4, SENTENCES)
+        if kind == "secret":
+            parts.insert(at, rng.choice(SECRETS))
+        elif kind == "rule":
+            parts.insert(at, rng.choice(malicious))
+        elif kind == "leak":
+            parts.insert(at, SYSTEM_PROMPT)
+        out.append((kind, " ".join(parts)))
+    return out
+
+
+def run_incremental(policy, text):
+    scanner = policy.scanner([SYSTEM_PROMPT])
+    times, held, released = [], [], []
+    for piece in chunks(text):
+        t0 = time.perf_counter()
+        released.append(scanner.feed(piece))
+        times.append(time.perf_counter() - t0)
+        held.append(scanner.held)
+        if scanner.cut:
+            break
+    released.append(scanner.finish())
+    return times, held, "".join(released), scanner
+
+
+def run_rescan(policy, text):
+    times = []
+    seen = ""
+    for piece in chunks(text):
+        t0 = time.perf_counter()
+        seen += piece
+        if policy.finditer is not None:
+            for _ in policy.finditer(seen):
+                pass
+        times.append(time.perf_counter() - t0)
+    return times
+
+
+def run_buffer(policy, text):
+    t0 = time.perf_counter()
+    scanner = policy.scanner([SYSTEM_PROMPT])
+    scanner.feed(text)
+    scanner.finish()
+    return time.perf_counter() - t0
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    policy = OutputPolicy(output_rules())
+    data = completions(n, random.Random(0))
+
+    inc_times, rescan_times, buffer_times, held_all = [], [], [], []
+    mismatches = 0
+    outcome = {}
+    for kind, text in data:
+        times, held, streamed, scanner = run_incremental(policy, text)
+        inc_times += times
+        held_all += held
+        rescan_times += run_rescan(policy, text)
+        buffer_times.append(run_buffer(policy, text))
+
+        one = policy.scanner([SYSTEM_PROMPT])
+        whole = one.feed(text) + one.finish()
+        if kind == "leak":
+            # A one-shot scan withholds everything; compare what each one caught
+            same = scanner.cut and one.cut and scanner.hits == one.hits
+        else:
+            same = streamed == whole and scanner.hits == one.hits and scanner.cut == one.cut
+        mismatches += not same
+
+        counts = outcome.setdefault(kind, [0, 0, 0])
+        counts[0] += 1
+        counts[1] += bool(scanner.hits)
+        counts[2] += scanner.cut
+
+    n_chunks = len(inc_times)
+    print(f"{n} completions, {n_chunks} chunks ({sum(len(t) for _, t in data) / n:.0f} chars each), "
+          f"{len(policy.rules)} output rules, horizon {policy.horizon} chars\n")
+    print(f"{'per chunk':<14} {'mean (µs)':>10} {'p99 (µs)':>10}")
+    for name, values in (("incremental", inc_times), ("rescan", rescan_times)):
+        print(f"{name:<14} {statistics.mean(values) * 1e6:>10.1f} {percentile(values, 0.99) * 1e6:>10.1f}")
+    per_completion = statistics.mean(buffer_times) * 1e3
+    print(f"{'buffer':<14} {per_completion:>9.2f} ms once, after the last token")
+
+    print(f"\nheld back per chunk: mean {statistics.mean(held_all):.1f} chars, "
+          f"p99 {percentile(held_all, 0.99)} chars, max {max(held_all)}")
+    print(f"{'completion':<10} {'count':>6} {'with hits':>10} {'cut':>5}")
+    for kind, (count, hits, cut) in outcome.items():
+        print(f"{kind:<10} {count:>6} {hits:>10} {cut:>5}")
+    print(f"\nstreaming vs one-shot mismatches: {mismatches}")
+    if mismatches:
+        print("FAILED")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+"""
+Overload benchmark: /moderate past capacity, with admission control off and on.
+
+Starts `uvicorn main:app` (SENTINEL_SHED=0, then 1) and measures its
+closed-loop capacity, then drives it open-loop — requests are sent on a fixed
+schedule whether or not earlier ones have returned, the way independent
+clients arrive — in three phases:
+    • before   — 50% of capacity
+    • overload — OVERLOAD x capacity
+    • after    — 50% of capacity again
+Requests go out over CONNECTIONS keep-alive connections, as from a calling
+service's pool, written as pre-built bytes so the generator stays cheap next
+to the server. Latency is measured from each request's scheduled send time,
+so time spent waiting for a free connection counts too. Reported per phase: p50/p99 latency
+of the answered (200) requests, 503s, and how many were answered degraded (no
+ML stage, from the x-sentinel-mode header). Then the server's /stats/load
+once the run has drained (mode changes, time in each mode), and recovery: how
+long after the overload ends until the p99 of a one-second window is back
+under 2x the "before" p99.
+
+The load generator shares the machine with the server; on few cores the
+absolute rates are low, the comparison between the two runs is the point.
+
+    python benchmarks/bench_overload.py [seconds per phase] [overload factor]
+"""
+
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+import httpx
+
+BASE = Path(__file__).resolve().parent.parent
+BACKEND = BASE / "backend"
+
+PHASE_S = float(sys.argv[1]) if len(sys.argv) > 1 else 8.0
+OVERLOAD = float(sys.argv[2]) if len(sys.argv) > 2 else 1.5
+CONNECTIONS = 64      # the callers' keep-alive pool; requests beyond it queue client-side
+PHASES = [("before", 0.5), ("overload", OVERLOAD), ("after", 0.5)]
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))] if values else float("nan")
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_server(shed: bool, port: int) -> subprocess.Popen:
+    env = {
+        **os.environ,
+        "SENTINEL_SHED": "1" if shed else "0",
+        "SENTINEL_CACHE": "0",
+        "SENTINEL_RATE_LIMIT_REQUESTS": str(10**9),
+    }
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port),
+         "--log-level", "error", "--no-access-log", "--backlog", "4096"],
+        cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 60
+    while time.time() < deadline:
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/ready").status_code == 200:
+                return proc
+        except httpx.TransportError:
+            pass
+        time.sleep(0.2)
+    proc.kill()
+    raise RuntimeError(f"server (shed={shed}) did not become ready")
+
+
+def make_prompts(n: int):
+    rng = random.Random(0)
+    benign = (BASE / "datasets" / "benign.txt").read_text().splitlines()
+    malicious = (BASE / "datasets" / "malicious.txt").read_text().splitlines()
+    # ~9,000 characters each, so detection dominates both the server's HTTP
+    # handling and the load generator's own work
+    return [
+        " ".join(rng.choice(malicious if rng.random() < 0.2 else benign) for _ in range(240))
+        for _ in range(n)
+    ]
+
+
+def encode(prompts):
+    # Pre-built HTTP/1.1 requests: the generator only writes bytes and parses a status line
+    out = []
+    for prompt in prompts:
+        body = json.dumps({"prompt": prompt}).encode()
+        out.append(
+            b"POST /moderate HTTP/1.1\r\nhost: 127.0.0.1\r\ncontent-type: application/json\r\n"
+            + f"content-length: {len(body)}\r\n\r\n".encode() + body
+        )
+    return out
+
+
+async def connection(port: int, jobs: asyncio.Queue, records: list, requests):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    while True:
+        job = await jobs.get()
+        if job is None:
+            break
+        scheduled, i, phase = job
+        writer.write(requests[i % len(requests)])
+        head = await reader.readuntil(b"\r\n\r\n")
+        lines = head.decode("latin-1").split("\r\n")
+        headers = dict(line.lower().split(": ", 1) for line in lines[1:] if ": " in line)
+        await reader.readexactly(int(headers.get("content-length", 0)))
+        records.append((scheduled, phase, int(lines[0].split()[1]), time.perf_counter() - scheduled,
+                        headers.get("x-sentinel-mode", "-")))
+    writer.close()
+
+
+async def capacity(port: int, requests, seconds: float = 3.0) -> float:
+    records, jobs = [], asyncio.Queue()
+    workers = [asyncio.create_task(connection(port, jobs, records, requests)) for _ in range(8)]
+    for i in range(100_000):
+        jobs.put_nowait((0.0, i, "capacity"))
+    t0 = time.perf_counter()
+    await asyncio.sleep(seconds)
+    while not jobs.empty():
+        jobs.get_nowait()
+    for _ in workers:
+        jobs.put_nowait(None)
+    await asyncio.gather(*workers)
+    return len(records) / (time.perf_counter() - t0)
+
+
+async def drive(port: int, rate: float, requests):
+    records = []          # (scheduled at, phase, status, latency s, mode)
+    if rate <= 0:
+        rate = await capacity(port, requests)
+    jobs: asyncio.Queue = asyncio.Queue()
+    workers = [asyncio.create_task(connection(port, jobs, records, requests)) for _ in range(CONNECTIONS)]
+    await asyncio.sleep(0.5)
+    start = time.perf_counter()
+    i, t = 0, 0.0
+    for phase, factor in PHASES:
+        interval = 1.0 / (rate * factor)
+        end = t + PHASE_S
+        while t < end:
+            delay = start + t - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            jobs.put_nowait((start + t, i, phase))
+            i += 1
+            t += interval
+    for _ in workers:
+        jobs.put_nowait(None)
+    await asyncio.gather(*workers)
+    records = [(sent - start, *rest) for sent, *rest in records]
+    async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}") as client:
+        load = (await client.get("/stats/load")).json()
+    return rate, records, load
+
+
+def recovery(records, baseline_p99: float) -> float:
+    # First one-second window after the overload whose p99 is back under 2x baseline
+    overload_end = 2 * PHASE_S
+    after = [(sent, lat) for sent, phase, status, lat, _ in records if phase == "after" and status == 200]
+    second = 0
+    while overload_end + second < 3 * PHASE_S:
+        window = [lat for sent, lat in after if overload_end + second <= sent < overload_end + second + 1]
+        if window and percentile(window, 0.99) < 2 * baseline_p99:
+            return float(second)
+        second += 1
+    return float("inf")
+
+
+def main():
+    requests = encode(make_prompts(500))
+    print(f"{PHASE_S:g} s per phase, overload {OVERLOAD:g}x capacity, {os.cpu_count()} CPU(s)\n")
+    rate = 0.0
+    for shed in (False, True):
+        port = free_port()
+        proc = start_server(shed, port)
+        try:
+            rate, records, load = asyncio.run(drive(port, rate, requests))
+        finally:
+            proc.terminate()
+            proc.wait()
+        if not shed:
+            print(f"capacity ≈ {rate:.0f} req/s (closed loop, 8 clients)\n")
+        print(f"SENTINEL_SHED={int(shed)}")
+        print(f"  {'phase':<9} {'req/s':>6} {'sent':>6} {'200':>6} {'503':>6} {'degraded':>9} {'p50 ms':>8} {'p99 ms':>8}")
+        base_p99 = None
+        for phase, factor in PHASES:
+            rows = [r for r in records if r[1] == phase]
+            ok = [lat * 1e3 for _, _, status, lat, _ in rows if status == 200]
+            shed_n = sum(1 for r in rows if r[2] == 503)
+            degraded = sum(1 for r in rows if r[2] == 200 and r[4] == "degraded")
+            if phase == "before":
+                base_p99 = percentile(ok, 0.99) / 1e3
+            print(f"  {phase:<9} {rate * factor:>6.0f} {len(rows):>6} {len(ok):>6} {shed_n:>6} {degraded:>9} "
+                  f"{statistics.median(ok) if ok else float('nan'):>8.1f} {percentile(ok, 0.99):>8.1f}")
+        if load.get("enabled"):
+            print(f"  /stats/load: {load['mode_changes']} changes, {load['rejected']} rejected, "
+                  f"peak in flight {load['peak_in_flight']}, seconds in mode {load['seconds_in_mode']}")
+        took = recovery(records, base_p99)
+        print(f"  recovered {took:g} s after the overload ended\n" if took != float("inf")
+              else f"  not recovered within the {PHASE_S:g} s after the overload\n")
+
+
+if __name__ == "__main__":
+    main()
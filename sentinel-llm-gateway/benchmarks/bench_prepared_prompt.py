@@ -0,0 +1,92 @@
+"""
+PreparedPrompt benchmark: allocation profile (tracemalloc) and latency.
+
+Runs every detection stage — gateway rules, heuristics, ML score, sanitizer —
+on the same prompt twice: once handing each stage the raw string (each one
+truncates / lowercases / splits / tokenizes on its own), once handing all of
+them one PreparedPrompt. For each stage the tracemalloc peak above the
+starting level is recorded; their sum is the transient memory one request
+churns through. Needs a trained model (python training/train_classifier.py).
+
+    python benchmarks/bench_prepared_prompt.py
+"""
+
+import random
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE / "backend"))
+
+from engine import sentinel_heuristics  # noqa: E402
+from engine.prepared_prompt import PreparedPrompt  # noqa: E402
+from engine.sentinel_ml_detector import ml_injection_score  # noqa: E402
+from pipeline import detect_rule_violations, sanitize_prompt  # noqa: E402
+
+SIZES = (200, 2000, 8000)
+REPEAT = 200
+
+STAGES = (
+    ("rules", detect_rule_violations),
+    ("heuristics", sentinel_heuristics.detect),
+    ("ml", ml_injection_score),
+    ("sanitizer", sanitize_prompt),
+)
+
+
+def make_prompt(chars: int) -> str:
+    rng = random.Random(chars)
+    lines = (BASE / "datasets" / "benign.txt").read_text().splitlines()
+    lines += (BASE / "datasets" / "malicious.txt").read_text().splitlines()
+    lines += ["my api key is sk-123 and the password is hunter2"]
+    out = []
+    while sum(len(line) + 1 for line in out) < chars:
+        out.append(rng.choice(lines))
+    return "\n".join(out)[:chars]
+
+
+def profile(prompt: str, prepared: bool):
+    """Per-stage tracemalloc peaks (bytes) for one request."""
+    peaks = {}
+    tracemalloc.start()
+    arg = PreparedPrompt(prompt) if prepared else prompt
+    for name, fn in STAGES:
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        fn(arg)
+        peaks[name] = tracemalloc.get_traced_memory()[1] - base
+    tracemalloc.stop()
+    return peaks
+
+
+def latency(prompt: str, prepared: bool) -> float:
+    t0 = time.perf_counter()
+    for _ in range(REPEAT):
+        arg = PreparedPrompt(prompt) if prepared else prompt
+        for _, fn in STAGES:
+            fn(arg)
+    return (time.perf_counter() - t0) / REPEAT * 1e6
+
+
+def main():
+    ml_injection_score("warm up")       # model load outside the measurements
+    print(f"{'chars':>6} {'mode':<9} " + " ".join(f"{n:>11}" for n, _ in STAGES)
+          + f" {'total':>9} {'µs/req':>8}")
+    for size in SIZES:
+        prompt = make_prompt(size)
+        for prepared in (False, True):
+            profile(prompt, prepared)           # warm caches (regex, feature hashes)
+            peaks = profile(prompt, prepared)
+            us = latency(prompt, prepared)
+            mode = "prepared" if prepared else "strings"
+            print(
+                f"{size:>6} {mode:<9} "
+                + " ".join(f"{peaks[n] / 1024:9.1f}KB" for n, _ in STAGES)
+                + f" {sum(peaks.values()) / 1024:7.1f}KB {us:8.1f}"
+            )
+
+
+if __name__ == "__main__":
+    main()
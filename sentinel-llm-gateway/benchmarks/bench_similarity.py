@@ -0,0 +1,164 @@
+"""
+Similarity index benchmark: near-duplicate lookup against a corpus of known attacks.
+
+A synthetic attack corpus (jailbreak-shaped prompts of 200–1,500 characters:
+lines of datasets/malicious.txt interleaved with random sentences) is
+MinHashed and written with write_index, then:
+    • build / open — signature + write time, size on disk, and the time to
+                     open (memory-map) the directory
+    • lookup       — query latency (p50 / p99) of the LSH index, split into
+                     the prompt's MinHash and the bucket lookup, vs a
+                     brute-force comparison with every signature, and the
+                     ML stage on the same prompts for scale
+    • accuracy     — for copies of corpus entries with 1, 3, 6 and 12 word
+                     edits (swap / insert / delete) plus case and punctuation
+                     noise: share found with the right entry at ≥ each
+                     block threshold; for unrelated prompts (benign dataset
+                     lines with random filler): share at ≥ each threshold
+    • inserts      — add() through the journal: time per insert, and the
+                     time for a second process-local index to see them
+
+    python benchmarks/bench_similarity.py [corpus size] [queries]
+"""
+
+import random
+import statistics
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+import numpy as np
+
+BASE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE / "backend"))
+
+from engine import sentinel_ml_detector  # noqa: E402
+from engine.similarity_index import SimilarityIndex, minhash, write_index  # noqa: E402
+
+N_CORPUS = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+N_QUERIES = int(sys.argv[2]) if len(sys.argv) > 2 else 2000
+EDITS = (1, 3, 6, 12)
+THRESHOLDS = (0.5, 0.6, 0.7, 0.8)
+
+
+def words_of(rng: random.Random, vocab, n: int) -> str:
+    return " ".join(rng.choice(vocab) for _ in range(n))
+
+
+def make_corpus(rng: random.Random, malicious, vocab, n: int):
+    corpus = []
+    for _ in range(n):
+        parts = []
+        while sum(len(p) for p in parts) < rng.randint(200, 1500):
+            parts.append(rng.choice(malicious) if rng.random() < 0.3 else words_of(rng, vocab, rng.randint(6, 18)) + ".")
+        corpus.append(" ".join(parts))
+    return corpus
+
+
+def edit(rng: random.Random, text: str, vocab, n: int) -> str:
+    words = text.split()
+    for _ in range(n):
+        op, i = rng.random(), rng.randrange(len(words))
+        if op < 0.4:
+            words[i] = rng.choice(vocab)
+        elif op < 0.7:
+            words.insert(i, rng.choice(vocab))
+        elif len(words) > 1:
+            del words[i]
+    out = " ".join(words)
+    # Case and punctuation noise is normalized away
+    return out.upper() if rng.random() < 0.2 else out.replace(".", "!").replace(" ", "  ", 3)
+
+
+def percentile(values, q):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(round(q * (len(values) - 1))))]
+
+
+def timed_us(fn, items):
+    times, out = [], []
+    for x in items:
+        t = time.perf_counter()
+        out.append(fn(x))
+        times.append((time.perf_counter() - t) * 1e6)
+    return times, out
+
+
+def main():
+    rng = random.Random(0)
+    benign = (BASE / "datasets" / "benign.txt").read_text().splitlines()
+    malicious = (BASE / "datasets" / "malicious.txt").read_text().splitlines()
+    vocab = sorted({w.lower().strip(".,?!'") for line in benign + malicious for w in line.split()} |
+                   {"".join(rng.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(rng.randint(3, 9)))
+                    for _ in range(5000)})
+    corpus = make_corpus(rng, malicious, vocab, N_CORPUS)
+    print(f"{N_CORPUS} known attacks (mean {statistics.mean(map(len, corpus)):.0f} chars), {N_QUERIES} queries\n")
+
+    with tempfile.TemporaryDirectory(prefix="sentinel-similarity-") as tmp:
+        directory = Path(tmp) / "similarity"
+        t = time.perf_counter()
+        signatures = [minhash(text) for text in corpus]
+        sig_s = time.perf_counter() - t
+        t = time.perf_counter()
+        write_index(directory, signatures, [0] * N_CORPUS, corpus)
+        write_s = time.perf_counter() - t
+        size = sum(f.stat().st_size for f in directory.iterdir())
+        t = time.perf_counter()
+        index = SimilarityIndex(directory)
+        open_ms = (time.perf_counter() - t) * 1e3
+        print(f"build: signatures {sig_s:.1f} s ({sig_s / N_CORPUS * 1e6:.0f} µs each), write {write_s:.2f} s, "
+              f"{size / 1e6:.1f} MB on disk; open {open_ms:.1f} ms\n")
+
+        targets = [rng.randrange(N_CORPUS) for _ in range(N_QUERIES)]
+        edited = {k: [edit(rng, corpus[i], vocab, k) for i in targets] for k in EDITS}
+        unrelated = [f"{rng.choice(benign)} {words_of(rng, vocab, rng.randint(20, 200))}" for _ in range(N_QUERIES)]
+
+        # Lookup latency: LSH vs brute force vs the ML stage
+        queries = edited[3][: N_QUERIES // 2] + unrelated[: N_QUERIES // 2]
+        matrix = np.asarray(np.load(directory / "signatures.npy", mmap_mode="r"))
+
+        def brute(text):
+            sig = minhash(text)
+            equal = np.count_nonzero(matrix == sig, axis=1)
+            return int(equal.argmax())
+
+        sentinel_ml_detector.load_model()
+        lsh_us, _ = timed_us(index.query, queries)
+        sig_us, sigs = timed_us(minhash, queries)
+        near_us, _ = timed_us(index.nearest, sigs)
+        brute_us, _ = timed_us(brute, queries[:200])
+        ml_us, _ = timed_us(sentinel_ml_detector.ml_injection_score, queries)
+        print(f"{'lookup':<24} {'p50 µs':>9} {'p99 µs':>9}")
+        for name, times in (("LSH index", lsh_us), ("  MinHash", sig_us), ("  bucket lookup", near_us),
+                            ("brute force (200)", brute_us), ("ML stage", ml_us)):
+            print(f"{name:<24} {percentile(times, 0.5):>9.0f} {percentile(times, 0.99):>9.0f}")
+
+        # Accuracy per edit count and threshold
+        print(f"\n{'queries':<24} " + " ".join(f"{'≥ ' + format(th, '.1f'):>7}" for th in THRESHOLDS)
+              + f" {'mean sim':>9}")
+        for k in EDITS:
+            matches = [index.query(q) for q in edited[k]]
+            sims = [m.similarity if m is not None and m.id == i else 0.0 for m, i in zip(matches, targets)]
+            print(f"{f'{k} word edit(s)':<24} " + " ".join(
+                f"{sum(s >= th for s in sims) / len(sims):>7.1%}" for th in THRESHOLDS) + f" {statistics.mean(sims):>9.2f}")
+        sims = [m.similarity if m is not None else 0.0 for m in map(index.query, unrelated)]
+        print(f"{'unrelated':<24} " + " ".join(
+            f"{sum(s >= th for s in sims) / len(sims):>7.1%}" for th in THRESHOLDS) + f" {statistics.mean(sims):>9.2f}")
+
+        # Inserts through the journal, seen by another instance on its next poll
+        fresh = make_corpus(rng, malicious, vocab, 200)
+        t = time.perf_counter()
+        for text in fresh:
+            index.add(text)
+        add_us = (time.perf_counter() - t) / len(fresh) * 1e6
+        other = SimilarityIndex(directory, poll_s=0.0)
+        t = time.perf_counter()
+        other.refresh(force=True)
+        seen = sum(1 for text in fresh if (m := other.query(text)) is not None and m.similarity == 1.0)
+        print(f"\ninserts: {add_us:.0f} µs each via the journal; a second instance sees {seen}/{len(fresh)} "
+              f"(version {other.version})")
+
+
+if __name__ == "__main__":
+    main()
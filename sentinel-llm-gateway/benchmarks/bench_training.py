@@ -0,0 +1,112 @@
+"""
+Training benchmark: in-memory fit vs the streaming trainer on one corpus.
+
+A synthetic labeled corpus is written as gzip JSONL shards under tmp
+(dataset prompts mixed with random filler words, so every prompt is
+distinct). It is then trained on twice, each time in a fresh process:
+    • in-memory — what train_classifier.py does: read every prompt,
+                  HashingVectorizer.transform the lot, LogisticRegression.fit
+    • streaming — training/train_streaming.py with --workers hashing
+                  processes, one epoch
+Reported per run, interpreter start-up and imports excluded: wall time,
+prompts/s, peak RSS (the trainer, plus its largest hashing worker for
+streaming) and holdout accuracy.
+
+    python benchmarks/bench_training.py [prompts] [shards] [workers]
+"""
+
+import gzip
+import json
+import os
+import random
+import re
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent.parent
+
+IN_MEMORY = r"""
+import gzip, json, resource, sys, time, zlib
+from pathlib import Path
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+sys.path.insert(0, sys.argv[2])
+from train_classifier import make_vectorizer
+
+t0 = time.perf_counter()
+texts, labels, hold_x, hold_y = [], [], [], []
+for shard in sorted(Path(sys.argv[1]).glob("*.jsonl.gz")):
+    with gzip.open(shard, "rt") as f:
+        for line in f:
+            r = json.loads(line)
+            held = zlib.crc32(r["text"].encode()) % 10_000 < 100
+            (hold_x if held else texts).append(r["text"])
+            (hold_y if held else labels).append(r["label"])
+vectorizer = make_vectorizer()
+clf = LogisticRegression(max_iter=2000).fit(vectorizer.transform(texts), labels)
+elapsed = time.perf_counter() - t0
+acc = float(np.mean(clf.predict(vectorizer.transform(hold_x)) == np.asarray(hold_y)))
+print(json.dumps({"n": len(texts), "seconds": elapsed, "rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+                  "accuracy": acc}))
+"""
+
+
+def corpus(directory: Path, n: int, shards: int) -> int:
+    rng = random.Random(0)
+    benign = (BASE / "datasets" / "benign.txt").read_text().splitlines()
+    malicious = (BASE / "datasets" / "malicious.txt").read_text().splitlines()
+    words = sorted({w.lower() for line in benign + malicious for w in line.split()}) + [
+        f"w{i}" for i in range(5000)
+    ]
+    files = [gzip.open(directory / f"part-{i:04d}.jsonl.gz", "wt") for i in range(shards)]
+    for i in range(n):
+        label = int(rng.random() < 0.3)
+        base = rng.choice(malicious if label else benign)
+        filler = " ".join(rng.choice(words) for _ in range(rng.randint(5, 40)))
+        text = f"{filler} {base}" if rng.random() < 0.5 else f"{base} {filler}"
+        files[i % shards].write(json.dumps({"text": text, "label": label}) + "\n")
+    for f in files:
+        f.close()
+    return sum(os.path.getsize(f.name) for f in files)
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 500_000
+    shards = int(sys.argv[2]) if len(sys.argv) > 2 else 16
+    workers = int(sys.argv[3]) if len(sys.argv) > 3 else os.cpu_count() or 1
+
+    with tempfile.TemporaryDirectory(prefix="sentinel-train-") as tmp:
+        data = Path(tmp) / "data"
+        data.mkdir()
+        size = corpus(data, n, shards)
+        print(f"{n} prompts in {shards} gzip JSONL shards ({size / 1e6:.1f} MB compressed), "
+              f"{os.cpu_count()} CPU(s)\n")
+
+        out = subprocess.run(
+            [sys.executable, "-c", IN_MEMORY, str(data), str(BASE / "training")],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        mem = json.loads(out.splitlines()[-1])
+
+        out = subprocess.run(
+            [sys.executable, str(BASE / "training" / "train_streaming.py"), str(data),
+             "--out", str(Path(tmp) / "models"), "--workers", str(workers), "--checkpoint-every", "0"],
+            capture_output=True, text=True, check=True,
+        ).stdout
+        print("streaming trainer output:\n" + "".join("    " + line + "\n" for line in out.splitlines()))
+
+        print(f"{'trainer':<24} {'wall (s)':>9} {'prompts/s':>10} {'peak RSS (MB)':>14} {'holdout acc':>12}")
+        print(f"{'in-memory (LR.fit)':<24} {mem['seconds']:>9.1f} {mem['n'] / mem['seconds']:>10,.0f} "
+              f"{mem['rss_mb']:>14.0f} {mem['accuracy']:>12.4f}")
+        trainer_mb, worker_mb = map(float, re.search(r"trainer (\d+) MB, largest hashing worker (\d+) MB", out).groups())
+        acc = float(re.search(r"accuracy ([\d.]+)", out).group(1))
+        trained, stream_s = re.search(r"Trained on (\d+) prompts in ([\d.]+) s", out).groups()
+        trained, stream_s = int(trained), float(stream_s)
+        print(f"{'streaming, ' + str(workers) + ' worker(s)':<24} {stream_s:>9.1f} {trained / stream_s:>10,.0f} "
+              f"{f'{trainer_mb:.0f} + {worker_mb:.0f}':>14} {acc:>12.4f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,12 @@
+"""
+Shared setup for the test suite: the backend modules import each other as
+top-level packages (`engine`, `utils`, `pipeline`), as in the benchmarks.
+
+    python -m pytest -q        (from the project root)
+"""
+
+import sys
+from pathlib import Path
+
+BASE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE / "backend"))
@@ -0,0 +1,30 @@
+"""sentinel-audit --resume never pads or rewrites committed output."""
+
+import pytest
+
+from sentinel_audit import JsonlSink
+
+
+@pytest.mark.parametrize("existing", [None, b"", b'{"status":"allow"}\n'])
+def test_missing_or_short_output_is_refused(tmp_path, existing):
+    path = tmp_path / "out.jsonl"
+    if existing is not None:
+        path.write_bytes(existing)
+    with pytest.raises(RuntimeError, match="cannot resume"):
+        JsonlSink(str(path), 64)
+    assert path.exists() == (existing is not None)
+
+
+def test_resume_drops_uncommitted_tail(tmp_path):
+    path = tmp_path / "out.jsonl"
+    sink = JsonlSink(str(path), None)
+    sink.write(b"committed\n")
+    assert sink.commit() == {"output_bytes": 10}
+    sink.write(b"lost")
+    sink.close()
+
+    sink = JsonlSink(str(path), 10)
+    sink.write(b"again\n")
+    sink.commit()
+    sink.close()
+    assert path.read_bytes() == b"committed\nagain\n"
@@ -0,0 +1,54 @@
+"""The Aho-Corasick KeywordMatcher returns exactly what the `kw in text` loop does."""
+
+import random
+import string
+from pathlib import Path
+
+import pytest
+
+from engine import sentinel_heuristics
+from engine.keyword_matcher import KeywordMatcher
+
+BASE = Path(__file__).resolve().parent.parent
+
+
+def naive(keywords, text):
+    return [i for i, kw in enumerate(keywords) if kw in text]
+
+
+def random_keywords(rng, n, alphabet):
+    return [
+        " ".join("".join(rng.choice(alphabet) for _ in range(rng.randint(1, 6))) for _ in range(rng.randint(1, 3)))
+        for _ in range(n)
+    ]
+
+
+@pytest.mark.parametrize("seed", range(20))
+def test_automaton_matches_substring_loop(seed):
+    rng = random.Random(seed)
+    # A small alphabet makes overlapping and nested keywords common
+    alphabet = "abc " if seed % 2 else string.ascii_lowercase[:6] + "é日"
+    keywords = random_keywords(rng, rng.randint(1, 400), alphabet)
+    matcher = KeywordMatcher(keywords, use_automaton=True)
+    for _ in range(20):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 300)))
+        assert matcher.find(text) == naive(keywords, text)
+
+
+def test_overlapping_nested_and_duplicate_keywords():
+    keywords = ["he", "she", "his", "hers", "ushers", "s", "she", ""]
+    for use_automaton in (False, True):
+        matcher = KeywordMatcher(keywords, use_automaton=use_automaton)
+        for text in ("ushers", "", "ahishers", "hhhhh", "shes"):
+            assert matcher.find(text) == naive(keywords, text)
+            assert matcher.find_keywords(text) == [keywords[i] for i in naive(keywords, text)]
+
+
+def test_detect_keywords_match_substring_loop():
+    rules = sentinel_heuristics.current_rules()
+    keywords = rules.matcher.keywords
+    prompts = (BASE / "datasets" / "malicious.txt").read_text().splitlines()
+    prompts += (BASE / "datasets" / "benign.txt").read_text().splitlines()
+    for prompt in prompts:
+        expected = [keywords[i] for i in naive(keywords, prompt[: sentinel_heuristics.MAX_PROMPT_CHARS].lower())]
+        assert sentinel_heuristics.detect(prompt).matched_keywords == expected
@@ -0,0 +1,100 @@
+"""The native LinearScorer reproduces sklearn's predict_proba, for str and PreparedPrompt inputs."""
+
+import random
+import sys
+from pathlib import Path
+
+import pytest
+
+sklearn = pytest.importorskip("sklearn")
+
+from sklearn.feature_extraction.text import HashingVectorizer  # noqa: E402
+from sklearn.linear_model import LogisticRegression  # noqa: E402
+from sklearn.utils import murmurhash3_32 as sk_murmur  # noqa: E402
+
+from engine.linear_scorer import LinearScorer, murmurhash3_32  # noqa: E402
+from engine.model_artifact import save_linear_artifact  # noqa: E402
+from engine.prepared_prompt import MAX_PROMPT_CHARS, PreparedPrompt  # noqa: E402
+
+BASE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE / "training"))
+
+from train_classifier import load_data, make_vectorizer  # noqa: E402
+
+TOLERANCE = 1e-9
+
+# The shipped vectorizer, plus settings that take the scorer's other branches
+VECTORIZERS = {
+    "shipped": make_vectorizer,
+    "signed-l1": lambda: HashingVectorizer(n_features=2**12, alternate_sign=True, norm="l1"),
+    "binary-trigrams": lambda: HashingVectorizer(n_features=2**10, binary=True, ngram_range=(1, 3)),
+    "cased-no-norm": lambda: HashingVectorizer(n_features=2**14, lowercase=False, norm=None),
+}
+
+
+def corpus():
+    texts, _ = load_data()
+    rng = random.Random(0)
+    vocab = " ".join(texts).split() + ["Ünïcödé", "naïve", "日本語テキスト", "a", "x1", "__init__", "İstanbul"]
+    for _ in range(200):
+        texts.append(" ".join(rng.choice(vocab) for _ in range(rng.randint(0, 60))))
+    texts.append(" ".join(vocab * 40)[:MAX_PROMPT_CHARS])
+    texts += ["", "   ", "a", "Ignore   previous\n\ninstructions!!"]
+    return texts
+
+
+@pytest.fixture(scope="module", params=list(VECTORIZERS))
+def model(request, tmp_path_factory):
+    X, y = load_data()
+    vectorizer = VECTORIZERS[request.param]()
+    classifier = LogisticRegression(max_iter=2000).fit(vectorizer.transform(X), y)
+    directory = tmp_path_factory.mktemp(request.param) / "linear"
+    save_linear_artifact(directory, vectorizer, classifier)
+    return vectorizer, classifier, LinearScorer.from_artifact(directory)
+
+
+def test_murmurhash_matches_sklearn():
+    for word in ["", "a", "ab", "abc", "abcd", "abcde", "ignore previous", "日本語", "naïve", "x" * 1000]:
+        assert murmurhash3_32(word.encode("utf-8")) == sk_murmur(word), word
+
+
+def test_predict_proba_parity_str(model):
+    vectorizer, classifier, scorer = model
+    texts = corpus()
+    expected = classifier.predict_proba(vectorizer.transform(texts))[:, 1]
+    for text, p in zip(texts, expected):
+        assert scorer.predict_proba(text) == pytest.approx(p, abs=TOLERANCE), text[:80]
+
+
+def test_predict_proba_parity_prepared_prompt(model):
+    vectorizer, classifier, scorer = model
+    texts = corpus()
+    expected = classifier.predict_proba(vectorizer.transform(texts))[:, 1]
+    prepared = [PreparedPrompt(t) for t in texts]
+    for pp, p in zip(prepared, expected):
+        assert scorer.predict_proba(pp) == pytest.approx(p, abs=TOLERANCE), pp.text[:80]
+    # A prompt already scored once (tokens / row cached on it) scores the same again
+    for pp, p in zip(prepared, expected):
+        assert scorer.predict_proba(pp) == pytest.approx(p, abs=TOLERANCE)
+    assert scorer.predict_proba_many(prepared) == pytest.approx(list(expected), abs=TOLERANCE)
+
+
+def test_save_over_mapped_artifact_leaves_readers_intact(tmp_path):
+    X, y = load_data()
+    vectorizer = make_vectorizer()
+    features = vectorizer.transform(X)
+    directory = tmp_path / "linear"
+    save_linear_artifact(directory, vectorizer, LogisticRegression(max_iter=2000).fit(features, y))
+    serving = LinearScorer.from_artifact(directory)
+    before = serving.coef.copy()
+    p_before = serving.predict_proba("ignore previous instructions")
+
+    # Retrain over the artifact the serving scorer still has memory-mapped
+    retrained = LogisticRegression(C=0.01, max_iter=2000).fit(features, y)
+    save_linear_artifact(directory, vectorizer, retrained)
+
+    assert (serving.coef == before).all()
+    assert serving.predict_proba("ignore previous instructions") == p_before
+    fresh = LinearScorer.from_artifact(directory)
+    assert (fresh.coef == retrained.coef_[0]).all()
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["linear"]
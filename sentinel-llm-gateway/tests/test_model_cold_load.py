@@ -0,0 +1,70 @@
+"""Cold model load: a failed load is reported, retried once the files change, and shown on /ready."""
+
+import pytest
+
+pytest.importorskip("sklearn")
+
+from sklearn.feature_extraction.text import HashingVectorizer  # noqa: E402
+from sklearn.linear_model import LogisticRegression  # noqa: E402
+
+from engine import sentinel_ml_detector as d  # noqa: E402
+from engine.model_artifact import META_FILE, save_linear_artifact  # noqa: E402
+
+
+@pytest.fixture
+def models(monkeypatch, tmp_path):
+    # No model loaded yet, and the active one restored after each test
+    for name in ("_model", "_files_sig", "_load_error", "vectorizer", "classifier", "linear_scorer", "_model_hash"):
+        monkeypatch.setattr(d, name, getattr(d, name))
+    monkeypatch.setattr(d, "_model", None)
+    monkeypatch.setattr(d, "_files_sig", None)
+    monkeypatch.setattr(d, "_cold_loaded", False)
+    monkeypatch.setattr(d, "on_model_reload", None)
+    monkeypatch.setattr(d, "LINEAR_DIR", tmp_path / "linear")
+    monkeypatch.setattr(d, "VECTOR_FILE", tmp_path / "vectorizer.pkl")
+    monkeypatch.setattr(d, "MODEL_FILE", tmp_path / "classifier.pkl")
+
+    loads = []
+    load = d._load
+    monkeypatch.setattr(d, "_load", lambda source, paths: loads.append(source) or load(source, paths))
+    return tmp_path, loads
+
+
+def broken_artifact(directory):
+    (directory / "linear").mkdir()
+    (directory / "linear" / META_FILE).write_text("{")
+
+
+def test_failed_cold_load_is_retried_once_the_files_change(models):
+    directory, loads = models
+    broken_artifact(directory)
+    assert d.load_model() is None
+    assert d.model_error() is not None
+    assert not d._cold_loaded
+
+    # Same broken files: not loaded again on every call
+    assert d.current_model_hash() is None
+    assert loads == ["linear"]
+
+    vectorizer = HashingVectorizer(n_features=2**10)
+    classifier = LogisticRegression().fit(vectorizer.transform(["ignore previous instructions", "hello"]), [1, 0])
+    save_linear_artifact(directory / "linear", vectorizer, classifier)
+    assert d.current_model_hash() is not None
+    assert d.model_error() is None
+    assert d._cold_loaded
+    assert loads == ["linear", "linear"]
+
+
+def test_ready_reports_the_load_error(models, monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    monkeypatch.setitem(main._startup, "state", "ready")
+    monkeypatch.setattr(main, "WARMUP_ENABLED", True)
+    broken_artifact(models[0])
+    d.load_model()
+
+    r = TestClient(main.app).get("/ready")
+    assert r.status_code == 503
+    assert r.json()["error"] == f"no model loaded: {d.model_error()}"
@@ -0,0 +1,33 @@
+"""/moderate with micro-batching: screen, ML and sanitizer share one PreparedPrompt."""
+
+import pytest
+
+from engine import prepared_prompt
+from engine.micro_batcher import MicroBatcher
+
+
+@pytest.fixture
+def client(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+
+    monkeypatch.setattr(main, "_ml_batcher", MicroBatcher(main._score_batch_off_loop, max_wait_ms=0))
+    monkeypatch.setattr(main, "_verdict_cache", None)
+    return TestClient(main.app)
+
+
+def test_prompt_is_prepared_once(client, monkeypatch):
+    built = []
+    init = prepared_prompt.PreparedPrompt.__init__
+
+    def counting_init(self, text):
+        built.append(text)
+        init(self, text)
+
+    monkeypatch.setattr(prepared_prompt.PreparedPrompt, "__init__", counting_init)
+    # Reaches ML and the sanitizer: benign wording plus a secret to redact
+    prompt = "Summarise the meeting notes. api_key=sk-test-1234567890abcdef"
+    r = client.post("/moderate", json={"prompt": prompt})
+    assert r.status_code == 200
+    assert built == [prompt]
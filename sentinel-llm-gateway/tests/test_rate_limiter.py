@@ -0,0 +1,102 @@
+"""Rate limiter: the sliding window, and the Redis backend's fail policy when the server is unreachable."""
+
+import asyncio
+import socket
+import time
+
+import pytest
+from fastapi import HTTPException
+
+from utils.rate_limiter import RedisSlidingWindowLimiter, SlidingWindowLimiter
+
+redis = pytest.importorskip("redis")
+
+
+def unreachable(fail: str, events=None, url: str = "redis://127.0.0.1:1/0") -> RedisSlidingWindowLimiter:
+    limiter = RedisSlidingWindowLimiter(2, 60, url, timeout=0.05, fail=fail,
+                                        on_error=None if events is None else events.append)
+
+    async def script(keys, args):
+        raise redis.ConnectionError("connection refused")
+
+    limiter._script = script
+    return limiter
+
+
+def test_sliding_window_limits_and_recovers():
+    limiter = SlidingWindowLimiter(3, 10)
+    assert [limiter.hit("a", now=100.0) for _ in range(4)] == [True, True, True, False]
+    assert limiter.hit("b", now=100.0)
+    # Half way into the next window the previous one still counts for half
+    assert [limiter.hit("a", now=115.0) for _ in range(3)] == [True, True, False]
+    assert limiter.hit("a", now=130.0)
+
+
+@pytest.mark.parametrize("fail, allowed", [("open", True), ("closed", False)])
+def test_backend_error_applies_fail_policy(fail, allowed):
+    limiter = unreachable(fail)
+    assert asyncio.run(limiter.hit("ip:1")) is allowed
+    assert limiter.errors == 1
+
+
+def test_outage_is_reported_once_until_the_server_answers():
+    events = []
+    limiter = unreachable("open", events)
+
+    async def run():
+        for _ in range(3):
+            await limiter.hit("ip:1")
+
+        async def script(keys, args):
+            return 1
+
+        limiter._script = script
+        await limiter.hit("ip:1")
+
+    asyncio.run(run())
+    assert limiter.errors == 3
+    assert len(events) == 2
+    assert isinstance(events[0], redis.ConnectionError)
+    assert events[1] is None
+    assert not limiter.failing
+
+
+def test_unresponsive_server_times_out():
+    # Accepts connections (in the kernel backlog) but never answers
+    server = socket.socket()
+    server.bind(("127.0.0.1", 0))
+    server.listen(8)
+    port = server.getsockname()[1]
+    try:
+        events = []
+        limiter = RedisSlidingWindowLimiter(2, 60, f"redis://127.0.0.1:{port}/0", timeout=0.05,
+                                            fail="closed", on_error=events.append)
+
+        async def run():
+            try:
+                return await limiter.hit("ip:1")
+            finally:
+                await limiter.aclose()
+
+        t0 = time.perf_counter()
+        assert asyncio.run(run()) is False
+        assert time.perf_counter() - t0 < 1.0
+        assert limiter.errors == 1
+        assert isinstance(events[0], redis.TimeoutError)
+    finally:
+        server.close()
+
+
+@pytest.mark.parametrize("fail, status", [("open", None), ("closed", 429)])
+def test_check_rate_limit_counts_errors_and_applies_policy(monkeypatch, fail, status):
+    import main
+
+    monkeypatch.setattr(main, "_rate_limiter", unreachable(fail))
+    before = main._rate_limit_errors.value
+    if status is None:
+        asyncio.run(main.check_rate_limit("ip:1"))
+    else:
+        with pytest.raises(HTTPException) as e:
+            asyncio.run(main.check_rate_limit("ip:1"))
+        assert e.value.status_code == status
+    assert main._rate_limit_errors.value == before + 1
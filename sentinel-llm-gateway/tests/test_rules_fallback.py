@@ -0,0 +1,51 @@
+"""Import-time rule loading: a failed snapshot or source load names the file and the exception."""
+
+import pytest
+
+from engine import sentinel_heuristics as h
+
+
+@pytest.fixture
+def rules(monkeypatch, tmp_path):
+    # Restore the active rule set after each test
+    for name in ("_rules", "_rules_info", "_files_sig", "_load_error", "REGEX_RULES", "BUILTIN_KEYWORDS"):
+        monkeypatch.setattr(h, name, getattr(h, name))
+    monkeypatch.setattr(h, "on_rules_reload", None)
+    monkeypatch.setattr(h, "RULES_SNAPSHOT_FILE", tmp_path / "rules.snapshot")
+    return tmp_path
+
+
+def load():
+    assert not h.reload_rules(force=True)
+    h._load_fallback()
+    return h.rules_info()
+
+
+def test_corrupt_snapshot_falls_back_to_source_files(rules):
+    (rules / "rules.snapshot").write_bytes(b"not a pickle")
+    info = load()
+    assert info["source"] == "files"
+    assert info["errors"][0].startswith("rules.snapshot: UnpicklingError(")
+
+
+def test_snapshot_of_another_format_names_the_format(rules):
+    h.write_snapshot(h.current_rules(), rules / "rules.snapshot")
+    rules.joinpath("rules.snapshot").write_bytes(
+        rules.joinpath("rules.snapshot").read_bytes().replace(b"format", b"f0rmat"))
+    info = load()
+    assert info["errors"][0].startswith("rules.snapshot: RuleError(")
+    assert "re-run `sentinel_rules.py compile`" in info["errors"][0]
+
+
+def test_failing_source_files_fall_back_to_builtins(rules, monkeypatch):
+    monkeypatch.setattr(h, "EXTRA_RULES_FILE", rules / "extra_regex_rules.json")
+    monkeypatch.setattr(h, "EXTRA_KEYWORDS_FILE", rules / "extra_keywords.txt")
+
+    def broken():
+        raise MemoryError("rule set too large")
+
+    monkeypatch.setattr(h, "read_rule_sources", broken)
+    info = load()
+    assert info["errors"] == ["extra_regex_rules.json, extra_keywords.txt: MemoryError('rule set too large')"]
+    assert info["rules"] == len(h._BUILTIN_REGEX)
+    assert info["keywords"] == len(h._BUILTIN_KEYWORDS)
@@ -0,0 +1,51 @@
+"""SessionStore expiry and size caps."""
+
+from utils import session_store
+from utils.session_store import SessionState, SessionStore, turn_digest
+
+
+def state_with(turns: int, carry: str = "") -> SessionState:
+    state = SessionState("v1")
+    for i in range(turns):
+        state.append(turn_digest("user", str(i)), "allow")
+    state.carry = carry
+    return state
+
+
+def test_expired_sessions_are_swept_on_checkin(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, "time", lambda: now[0])
+    store = SessionStore(ttl=10)
+    for key in ("a", "b", "c"):
+        store.checkin(key, state_with(1))
+        now[0] += 4
+    # a expired at 1010, b at 1014; c (1018) is still live
+    now[0] = 1015.0
+    store.checkin("d", state_with(1))
+    stats = store.stats()
+    assert stats["sessions"] == 2
+    assert stats["expirations"] == 2
+    assert stats["bytes"] == 2 * state_with(1).nbytes
+
+
+def test_stats_do_not_count_expired_sessions(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(session_store.time, "time", lambda: now[0])
+    store = SessionStore(ttl=10)
+    store.checkin("a", state_with(3))
+    now[0] += 11
+    assert store.stats()["sessions"] == 0
+    assert store.stats()["bytes"] == 0
+
+
+def test_oversized_state_is_not_stored():
+    small = state_with(1)
+    store = SessionStore(max_bytes=3 * small.nbytes)
+    store.checkin("a", small)
+    store.checkin("b", small)
+    store.checkin("huge", state_with(1, carry="x" * (3 * small.nbytes)))
+    stats = store.stats()
+    assert stats["sessions"] == 2
+    assert stats["evictions"] == 0
+    assert stats["too_large"] == 1
+    assert store.checkout("huge", "v1", b"").turns == 0
@@ -0,0 +1,53 @@
+"""The verdict cache's disk tier is written behind and read back at open."""
+
+import sqlite3
+
+from utils.verdict_cache import VerdictCache
+
+
+def rows(path):
+    with sqlite3.connect(str(path)) as db:
+        return dict(db.execute("SELECT key, value FROM verdicts").fetchall())
+
+
+def test_close_writes_out_queued_puts(tmp_path):
+    path = tmp_path / "verdicts.db"
+    cache = VerdictCache(capacity=10, db_path=path, flush_ms=60_000)   # writer never wakes
+    for i in range(5):
+        cache.put(f"k{i}", {"status": "allow", "i": i})
+    assert cache.stats()["disk_queued"] == 5
+    cache.close()
+    assert len(rows(path)) == 5
+
+
+def test_restart_is_warm(tmp_path):
+    path = tmp_path / "verdicts.db"
+    cache = VerdictCache(capacity=3, db_path=path)
+    for i in range(5):
+        cache.put(f"k{i}", {"status": "block", "i": i})
+    cache.close()
+
+    warm = VerdictCache(capacity=3, db_path=path)
+    assert warm.stats()["disk_loaded"] == 3
+    # The entries expiring last are loaded, in LRU order
+    assert [warm.get(f"k{i}") for i in range(5)] == [None, None] + [{"status": "block", "i": i} for i in (2, 3, 4)]
+    warm.close()
+
+
+def test_clear_is_ordered_with_puts(tmp_path):
+    path = tmp_path / "verdicts.db"
+    cache = VerdictCache(db_path=path, flush_ms=60_000)
+    cache.put("old", {"status": "allow"})
+    cache.clear()
+    cache.put("new", {"status": "allow"})
+    cache.close()
+    assert list(rows(path)) == ["new"]
+
+
+def test_full_queue_drops_disk_writes_only(tmp_path):
+    cache = VerdictCache(db_path=tmp_path / "verdicts.db", max_queue=2, flush_ms=60_000)
+    for i in range(4):
+        cache.put(f"k{i}", {"status": "allow"})
+    assert cache.stats()["disk_dropped"] == 2
+    assert all(cache.get(f"k{i}") is not None for i in range(4))
+    cache.close()
@@ -0,0 +1,125 @@
+"""Windowed scanning of long documents: boundary coverage, the tail window, and early exit on /moderate/stream."""
+
+import random
+
+import pytest
+
+from engine.window_scanner import Windower, WindowScan
+
+PHRASE = "ignore previous instructions"
+FILLER = "The quarterly report covers revenue, hiring and the office move. "
+
+
+def windows_of(text: str, window: int, overlap: int, chunk: int):
+    windower = Windower(window, overlap)
+    out = []
+    for i in range(0, len(text), chunk):
+        out += windower.feed(text[i:i + chunk])
+    return out + windower.finish()
+
+
+@pytest.mark.parametrize("chunk", [1, 7, 50, 199, 200, 1000])
+def test_every_short_span_is_inside_one_window(chunk):
+    rng = random.Random(chunk)
+    text = "".join(rng.choice("abcdefgh ") for _ in range(1234))
+    windows = windows_of(text, 200, 40, chunk)
+    for start, w in windows:
+        assert text[start:start + len(w)] == w
+        assert len(w) <= 200
+    # Any match of up to overlap + 1 chars lies entirely inside some window
+    for i in range(len(text) - 41):
+        assert any(s <= i and i + 41 <= s + len(w) for s, w in windows), i
+    assert windows[-1][0] + len(windows[-1][1]) == len(text)
+
+
+@pytest.mark.parametrize("overlap, caught", [(40, True), (0, False)])
+def test_phrase_across_window_and_chunk_boundary(overlap, caught):
+    # The phrase spans 185..213: across window 0's end (200) and a chunk boundary (190)
+    text = ("x" * 184 + " " + PHRASE + " ").ljust(560, "y")
+    assert text.index(PHRASE) == 185
+    windows = windows_of(text, 200, overlap, 190)
+    assert any(PHRASE in w for _, w in windows) is caught
+
+
+def test_finish_returns_only_uncovered_tail():
+    windower = Windower(100, 20)
+    assert windower.feed("a" * 99) == []
+    assert windower.finish() == [(0, "a" * 99)]
+
+    windower = Windower(100, 20)
+    assert [s for s, _ in windower.feed("a" * 170)] == [0]
+    # 80..170 is the 20-char overlap plus 70 new chars: a tail window
+    assert windower.finish() == [(80, "a" * 90)]
+
+    windower = Windower(100, 20)
+    assert [s for s, _ in windower.feed("a" * 100)] == [0]
+    # Only the overlap is left, already covered by window 0
+    assert windower.finish() == []
+
+
+def test_window_scan_stops_at_first_blocking_window():
+    scan = WindowScan("max", block_threshold=0.8)
+    assert not scan.add(0, 100, 0.2, [])
+    assert scan.add(80, 180, 0.9, ["r"])
+    assert scan.blocked and scan.max_score == 0.9
+    assert scan.flagged(1) == [{"start": 80, "end": 180, "risk_score": 0.9}]
+
+
+# ---------------- /moderate/stream ----------------
+
+@pytest.fixture
+def client(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    import main
+    from routes import stream
+
+    monkeypatch.setattr(stream, "STREAM_WINDOW_CHARS", 200)
+    monkeypatch.setattr(stream, "STREAM_BATCH_WINDOWS", 1)
+    return TestClient(main.app), stream
+
+
+def post(client, text: str, chunk: int = 50):
+    body = (text[i:i + chunk].encode() for i in range(0, len(text), chunk))
+    r = client.post("/moderate/stream", content=body, headers={"content-type": "text/plain"})
+    assert r.status_code == 200
+    return r.json()
+
+
+def matched(result) -> bool:
+    return any("ignore" in reason for reason in result["reasons"])
+
+
+@pytest.mark.parametrize("overlap, caught", [(40, True), (0, False)])
+def test_route_catches_phrase_across_window_boundary(client, monkeypatch, overlap, caught):
+    client, stream = client
+    monkeypatch.setattr(stream, "STREAM_OVERLAP_CHARS", overlap)
+    text = ("x" * 184 + " " + PHRASE + " ").ljust(560, "y")
+    result = post(client, text)
+    assert matched(result) is caught
+    if caught:
+        assert result["status"] != "allow"
+        assert any(w["start"] <= 185 and 213 <= w["end"] for w in result["flagged_windows"])
+
+
+def test_tail_window_is_scanned(client, monkeypatch):
+    client, stream = client
+    monkeypatch.setattr(stream, "STREAM_OVERLAP_CHARS", 40)
+    text = FILLER * 6 + PHRASE
+    result = post(client, text)
+    assert matched(result)
+    assert result["chars_scanned"] == len(text)
+    last = max(w["end"] for w in result["flagged_windows"])
+    assert last == len(text)
+
+
+def test_reading_stops_once_a_window_blocks(client, monkeypatch):
+    client, stream = client
+    monkeypatch.setattr(stream, "STREAM_OVERLAP_CHARS", 40)
+    monkeypatch.setattr(stream, "BLOCK_THRESHOLD", 0.0)
+    text = FILLER * 40
+    result = post(client, text)
+    assert result["status"] == "block"
+    assert result["early_exit"]
+    # 2,600 chars make 16 windows; the first one blocks and nothing after it is scored
+    assert result["windows_scanned"] == 1
@@ -1,9 +1,30 @@
+import sys
 import joblib
 from pathlib import Path
 from sklearn.feature_extraction.text import HashingVectorizer
 from sklearn.linear_model import LogisticRegression
 
 BASE = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BASE / "backend"))
+
+from engine.model_artifact import save_linear_artifact  # noqa: E402
+
+MODELS_DIR = BASE / "backend" / "models"
+
+def make_vectorizer() -> HashingVectorizer:
+    # Stateless: the streaming trainer and the gateway rebuild the same one
+    return HashingVectorizer(
+        n_features=2**16,
+        alternate_sign=False,
+        ngram_range=(1, 2),
+    )
+
+def save_models(vectorizer, clf, models_dir: Path = MODELS_DIR):
+    models_dir.mkdir(parents=True, exist_ok=True)
+    joblib.dump(vectorizer, models_dir / "vectorizer.pkl")
+    joblib.dump(clf, models_dir / "classifier.pkl")
+    # mmap-able copy of the weights, shared read-only across gateway workers
+    save_linear_artifact(models_dir / "linear", vectorizer, clf)
 
 def load_data():
     benign = (BASE / "datasets" / "benign.txt").read_text().splitlines()
@@ -17,22 +38,14 @@ def main():
     X, y = load_data()
 
     print("🔢 Vectorizing text...")
-    vectorizer = HashingVectorizer(
-        n_features=2**16,
-        alternate_sign=False,
-        ngram_range=(1, 2),
-    )
+    vectorizer = make_vectorizer()
     X_vec = vectorizer.transform(X)
 
     print("🤖 Training Logistic Regression classifier...")
     clf = LogisticRegression(max_iter=2000)
     clf.fit(X_vec, y)
 
-    models_dir = BASE / "backend" / "models"
-    models_dir.mkdir(exist_ok=True)
-
-    joblib.dump(vectorizer, models_dir / "vectorizer.pkl")
-    joblib.dump(clf, models_dir / "classifier.pkl")
+    save_models(vectorizer, clf)
 
     print("✅ Training complete, models saved to backend/models/")
 
@@ -0,0 +1,289 @@
+"""
+Out-of-core trainer for the injection classifier.
+
+train_classifier.py holds the whole corpus and its feature matrix in memory.
+This one streams it: the same HashingVectorizer is stateless, so prompts are
+read lazily, hashed in mini-batches on a process pool and fed to an
+SGDClassifier (logistic loss) with partial_fit. Memory is bounded by the
+shuffle buffer and the batches in flight, not by the corpus.
+
+Inputs (files, directories or globs; .gz / .bz2 / .xz read transparently):
+    • *.txt[.gz]    one prompt per line, label from the file name
+                    ("benign…" → 0, "malicious…" → 1)
+    • *.jsonl[.gz]  {"text" or "prompt": …, "label": 0 | 1 | "benign" | "malicious"}
+Shards are interleaved and passed through a shuffle buffer, so class-sorted
+files do not reach SGD as long single-class runs.
+
+Checkpoints (model + position in the stream) are written every
+--checkpoint-every prompts; --resume continues from the last one. The output
+is the artifact set the detector loads (vectorizer.pkl, classifier.pkl,
+linear/). Throughput and peak RSS are reported at the end.
+
+    python training/train_streaming.py [paths…] [--workers N] [--batch-size N] [--epochs N]
+"""
+
+import argparse
+import bz2
+import glob
+import gzip
+import itertools
+import json
+import lzma
+import os
+import random
+import resource
+import sys
+import time
+import zlib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import joblib
+import numpy as np
+from sklearn.linear_model import SGDClassifier
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from train_classifier import BASE, MODELS_DIR, make_vectorizer, save_models  # noqa: E402
+
+CHECKPOINT_FILE = "checkpoint.joblib"
+_OPENERS = {".gz": gzip.open, ".bz2": bz2.open, ".xz": lzma.open}
+_LABELS = {"0": 0, "1": 1, "benign": 0, "malicious": 1, "false": 0, "true": 1}
+
+
+# ---------------- reading ----------------
+
+def expand(paths):
+    files = []
+    for p in paths:
+        path = Path(p)
+        if path.is_dir():
+            files += sorted(f for f in path.rglob("*") if f.is_file() and _kind(f) is not None)
+        elif any(c in p for c in "*?["):
+            files += sorted(Path(f) for f in glob.glob(p, recursive=True))
+        else:
+            files.append(path)
+    for f in files:
+        if _kind(f) is None:
+            raise SystemExit(f"Unsupported dataset file: {f}")
+    return files
+
+
+def _kind(path: Path):
+    suffixes = [s for s in path.suffixes if s not in _OPENERS]
+    return {".txt": "txt", ".jsonl": "jsonl"}.get(suffixes[-1] if suffixes else "")
+
+
+def _label(value, where):
+    label = _LABELS.get(str(value).strip().lower())
+    if label is None:
+        raise ValueError(f"{where}: unknown label {value!r}")
+    return label
+
+
+def read_shard(path: Path):
+    """(text, label) pairs of one shard, lazily."""
+    opener = _OPENERS.get(path.suffix, open)
+    kind = _kind(path)
+    if kind == "txt":
+        name = path.name.lower()
+        label = 1 if "malicious" in name else 0 if "benign" in name else None
+        if label is None:
+            raise SystemExit(f"{path}: text shards need 'benign' or 'malicious' in the file name")
+    with opener(path, "rt", encoding="utf-8", errors="replace") as f:
+        for n, line in enumerate(f, 1):
+            line = line.strip()
+            if not line:
+                continue
+            if kind == "txt":
+                yield line, label
+                continue
+            record = json.loads(line)
+            text = record.get("text", record.get("prompt"))
+            if isinstance(text, str) and text.strip():
+                yield text.strip(), _label(record.get("label"), f"{path}:{n}")
+
+
+def interleave(files, width: int):
+    """Round-robin over up to `width` open shards; the next shard opens as one ends."""
+    pending = deque(files)
+    active = deque()
+    while pending or active:
+        while pending and len(active) < width:
+            active.append(read_shard(pending.popleft()))
+        shard = active.popleft()
+        item = next(shard, None)
+        if item is not None:
+            yield item
+            active.append(shard)
+
+
+def shuffled(items, size: int, rng: random.Random):
+    buffer = []
+    for item in items:
+        if len(buffer) < size:
+            buffer.append(item)
+            continue
+        i = rng.randrange(size)
+        yield buffer[i]
+        buffer[i] = item
+    rng.shuffle(buffer)
+    yield from buffer
+
+
+def batches(items, size: int):
+    it = iter(items)
+    while True:
+        batch = list(itertools.islice(it, size))
+        if not batch:
+            return
+        yield batch
+
+
+# ---------------- hashing ----------------
+
+_vectorizer = None
+
+
+def hash_batch(texts):
+    # One vectorizer per worker process
+    global _vectorizer
+    if _vectorizer is None:
+        _vectorizer = make_vectorizer()
+    return _vectorizer.transform(texts)
+
+
+def hashed(stream, pool, in_flight: int):
+    """(matrix, labels) per batch, in order; at most `in_flight` batches queued on the pool."""
+    futures = deque()
+    for batch in stream:
+        texts, labels = zip(*batch)
+        if pool is None:
+            yield hash_batch(texts), np.asarray(labels)
+            continue
+        futures.append((pool.submit(hash_batch, texts), np.asarray(labels)))
+        if len(futures) >= in_flight:
+            future, labels = futures.popleft()
+            yield future.result(), labels
+    while futures:
+        future, labels = futures.popleft()
+        yield future.result(), labels
+
+
+# ---------------- training ----------------
+
+def in_holdout(text: str, fraction: float) -> bool:
+    # Stable across runs and epochs: decided by the text itself
+    return fraction > 0 and zlib.crc32(text.encode()) % 10_000 < fraction * 10_000
+
+
+def save_checkpoint(path: Path, state) -> None:
+    tmp = path.with_suffix(".tmp")
+    joblib.dump(state, tmp)
+    os.replace(tmp, path)
+
+
+def evaluate(clf, holdout):
+    if not holdout:
+        return None
+    texts, labels = zip(*holdout)
+    proba = clf.predict_proba(hash_batch(texts))[:, 1]
+    y = np.asarray(labels)
+    eps = 1e-12
+    log_loss = float(-np.mean(y * np.log(proba + eps) + (1 - y) * np.log(1 - proba + eps)))
+    return {"n": len(y), "accuracy": float(np.mean((proba >= 0.5) == y)), "log_loss": log_loss}
+
+
+def peak_rss_mb(who) -> float:
+    return resource.getrusage(who).ru_maxrss / 1024.0     # Linux reports KiB
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Out-of-core training of the injection classifier.")
+    parser.add_argument("paths", nargs="*", default=[str(BASE / "datasets")])
+    parser.add_argument("--out", type=Path, default=MODELS_DIR)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="hashing processes (0 → inline)")
+    parser.add_argument("--batch-size", type=int, default=8192)
+    parser.add_argument("--epochs", type=int, default=1)
+    parser.add_argument("--alpha", type=float, default=1e-5, help="L2 regularization of SGDClassifier")
+    parser.add_argument("--shuffle-buffer", type=int, default=100_000)
+    parser.add_argument("--interleave", type=int, default=16, help="shards read at once")
+    parser.add_argument("--holdout", type=float, default=0.01, help="fraction kept out for evaluation")
+    parser.add_argument("--holdout-max", type=int, default=50_000)
+    parser.add_argument("--checkpoint-every", type=int, default=1_000_000, help="prompts; 0 → never")
+    parser.add_argument("--resume", action="store_true")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    files = expand(args.paths)
+    if not files:
+        raise SystemExit("No dataset files found.")
+    args.out.mkdir(parents=True, exist_ok=True)
+    checkpoint = args.out / CHECKPOINT_FILE
+
+    clf = SGDClassifier(loss="log_loss", alpha=args.alpha, average=True, random_state=args.seed)
+    start_epoch, skip = 0, 0
+    if args.resume and checkpoint.exists():
+        state = joblib.load(checkpoint)
+        clf, start_epoch, skip = state["clf"], state["epoch"], state["seen"]
+        print(f"↩️  Resuming at epoch {start_epoch + 1}, prompt {skip}")
+
+    print(f"📚 Streaming {len(files)} shard(s), {args.workers or 'no'} hashing worker(s), "
+          f"batches of {args.batch_size}")
+    pool = ProcessPoolExecutor(args.workers) if args.workers > 0 else None
+    holdout, trained, t0 = [], 0, time.perf_counter()
+    fit_s = 0.0
+    try:
+        for epoch in range(start_epoch, args.epochs):
+            rng = random.Random(args.seed + epoch)
+            stream = shuffled(interleave(files, args.interleave), args.shuffle_buffer, rng)
+
+            def train_items(stream=stream, collect=epoch == start_epoch, skip=skip):
+                for text, label in stream:
+                    if in_holdout(text, args.holdout):
+                        if collect and len(holdout) < args.holdout_max:
+                            holdout.append((text, label))
+                        continue
+                    if skip:
+                        # Same seed → same order; pass over what the checkpoint already saw
+                        skip -= 1
+                        continue
+                    yield text, label
+
+            seen, next_checkpoint = skip, skip + args.checkpoint_every
+            for X, y in hashed(batches(train_items(), args.batch_size), pool, 2 * max(args.workers, 1)):
+                t = time.perf_counter()
+                clf.partial_fit(X, y, classes=np.array([0, 1]))
+                fit_s += time.perf_counter() - t
+                seen += len(y)
+                trained += len(y)
+                if args.checkpoint_every and seen >= next_checkpoint:
+                    save_checkpoint(checkpoint, {"clf": clf, "epoch": epoch, "seen": seen})
+                    next_checkpoint = seen + args.checkpoint_every
+                    rate = trained / (time.perf_counter() - t0)
+                    print(f"💾 epoch {epoch + 1}: {seen} prompts ({rate:,.0f}/s), checkpoint saved")
+            skip = 0
+            save_checkpoint(checkpoint, {"clf": clf, "epoch": epoch + 1, "seen": 0})
+    finally:
+        if pool is not None:
+            pool.shutdown()
+    elapsed = time.perf_counter() - t0
+
+    if not trained and not hasattr(clf, "coef_"):
+        raise SystemExit("No training data was read.")
+    save_models(make_vectorizer(), clf, args.out)
+
+    print(f"✅ Trained on {trained} prompts in {elapsed:.1f} s → {trained / elapsed:,.0f} prompts/s "
+          f"(partial_fit {fit_s:.1f} s)")
+    print(f"   peak RSS: trainer {peak_rss_mb(resource.RUSAGE_SELF):.0f} MB, "
+          f"largest hashing worker {peak_rss_mb(resource.RUSAGE_CHILDREN):.0f} MB")
+    scores = evaluate(clf, holdout)
+    if scores is not None:
+        print(f"   holdout ({scores['n']} prompts): accuracy {scores['accuracy']:.4f}, "
+              f"log loss {scores['log_loss']:.4f}")
+    print(f"   models saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()